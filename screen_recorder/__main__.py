@@ -0,0 +1,6 @@
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from cli import main
+
+sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+Headless capture benchmark.
+
+Drives VideoRecorder with a SyntheticSource (no display needed) for every
+combination of size and content pattern, each in its own subprocess so CPU
+time and peak RSS belong to that case alone, and writes the results as JSON.
+
+    python screen_recorder/benchmarks/bench_capture.py --output bench.json
+    python screen_recorder/benchmarks/bench_capture.py --sizes 1080p --patterns typing --seconds 3
+    python screen_recorder/benchmarks/bench_capture.py --output new.json --compare old.json
+"""
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from recorder.frame_sources import SyntheticSource
+from recorder.metrics import machine_info
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SIZES = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+PATTERNS = SyntheticSource.PATTERNS
+
+
+class NullWriter:
+    """Discards frames, to measure the pipeline without the codec."""
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        pass
+
+    def release(self):
+        pass
+
+
+def _cpu_seconds():
+    if resource is None:
+        times = os.times()
+        return times.user + times.system
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1048576 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(size, pattern, seconds=5.0, fps=30.0, writer="xvid", resolution=None):
+    """
+    Records `seconds` of synthetic content and returns the measurements.
+    :param writer: "xvid" for the real cv2 writer, "null" to skip encoding
+    """
+    from recorder.video_capture import VideoRecorder
+
+    width, height = SIZES[size]
+    screen = SyntheticSource(width, height, pattern)
+    folder = tempfile.mkdtemp(prefix="bench_capture_")
+    try:
+        recorder = VideoRecorder(filename=os.path.join(folder, "bench.avi"), fps=fps, resolution=resolution,
+                                 show_cursor=False, sink=NullWriter() if writer == "null" else None,
+                                 source=screen)
+        cpu_start = _cpu_seconds()
+        wall_start = time.perf_counter()
+        recorder.start()
+        time.sleep(seconds)
+        recorder.stop()
+        wall = time.perf_counter() - wall_start
+        cpu = _cpu_seconds() - cpu_start
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    frames = recorder.frame_stats()
+    stages = recorder.get_stats(histograms=True)
+    return {
+        "size": size,
+        "pattern": pattern,
+        "writer": writer,
+        "resolution": resolution,
+        "seconds": round(wall, 3),
+        "target_fps": fps,
+        "grabs": screen.grabs,
+        "grab_fps": round(screen.grabs / wall, 2),
+        "unique_fps": round(frames["unique"] / wall, 2),
+        "frames": frames,
+        "stages": {name: {key: value for key, value in stage.get("latency", {}).items() if key != "buckets"}
+                   for name, stage in stages.items() if "latency" in stage},
+        "change": stages.get("change"),
+        "cpu_percent": round(cpu / wall * 100, 1),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_isolated(size, pattern, args):
+    """Runs one case in a fresh interpreter and returns its result dict."""
+    cmd = [sys.executable, os.path.abspath(__file__), "--case", f"{size}:{pattern}",
+           "--seconds", str(args.seconds), "--fps", str(args.fps), "--writer", args.writer]
+    if args.resolution:
+        cmd.extend(["--resolution", args.resolution])
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"size": size, "pattern": pattern, "error": result.stderr.strip()[-2000:] or f"exit {result.returncode}"}
+
+
+def compare(results, baseline):
+    """Prints fps and latency changes against an earlier results file."""
+    old = {(case["size"], case["pattern"]): case for case in baseline.get("cases", []) if "error" not in case}
+    print(f"\nCompared with {baseline.get('commit')}:")
+    for case in results["cases"]:
+        before = old.get((case["size"], case["pattern"]))
+        if before is None or "error" in case:
+            continue
+        p99 = case["stages"].get("encode", {}).get("p99_ms", 0.0)
+        p99_before = before["stages"].get("encode", {}).get("p99_ms", 0.0)
+        print(f"  {case['size']:>5} {case['pattern']:<6} "
+              f"unique fps {before['unique_fps']:7.2f} -> {case['unique_fps']:7.2f}  "
+              f"cpu {before['cpu_percent']:6.1f}% -> {case['cpu_percent']:6.1f}%  "
+              f"encode p99 {p99_before:7.2f} -> {p99:7.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless VideoRecorder throughput benchmark")
+    parser.add_argument("--sizes", default="720p,1080p,1440p,4k", help="comma-separated: " + ",".join(SIZES))
+    parser.add_argument("--patterns", default=",".join(PATTERNS), help="comma-separated: " + ",".join(PATTERNS))
+    parser.add_argument("--seconds", type=float, default=5.0, help="recording length per case")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--writer", choices=("xvid", "null"), default="xvid")
+    parser.add_argument("--resolution", default=None, help="output resolution setting, e.g. 1080p")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # size:pattern, run in this process
+    args = parser.parse_args(argv)
+
+    if args.case:
+        size, pattern = args.case.split(":")
+        print(json.dumps(run_case(size, pattern, args.seconds, args.fps, args.writer, args.resolution)))
+        return 0
+
+    results = {"commit": _git_commit(), "machine": machine_info(), "cases": []}
+    for size in args.sizes.split(","):
+        for pattern in args.patterns.split(","):
+            case = run_isolated(size, pattern, args)
+            results["cases"].append(case)
+            if "error" in case:
+                print(f"{size:>5} {pattern:<6} FAILED: {case['error']}")
+                continue
+            stages = case["stages"]
+            print(f"{size:>5} {pattern:<6} unique {case['unique_fps']:6.2f} fps  grabs {case['grab_fps']:6.2f} fps  "
+                  f"skipped {case['frames']['skipped']:4d}  dropped {case['frames']['dropped']:4d}  "
+                  f"grab p99 {stages['grab']['p99_ms']:6.2f} ms  encode p99 {stages['encode']['p99_ms']:6.2f} ms  "
+                  f"cpu {case['cpu_percent']:5.1f}%  rss {case['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Headless recording, for servers, Xvfb sessions and CI. Imports no GUI toolkit.
+
+    python -m screen_recorder record --duration 10 --out demo.mp4
+    python -m screen_recorder record --region 0,0,1280,720 --fps 15 --audio Microphone --out demo.mp4
+    python -m screen_recorder record --source synthetic:1280x720:typing --duration 3 --out smoke.mp4
+    python -m screen_recorder devices
+
+Recording stops after --duration, on SIGINT/SIGTERM, or when the frame
+source runs out. Progress messages go to stderr; stdout gets one JSON line
+with the session's stats when the command exits.
+"""
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+import argparse
+import contextlib
+import datetime
+import json
+import re
+import signal
+import tempfile
+import threading
+import time
+
+from recorder.merger import get_merge_plan_stats, get_temp_dir, cleanup_temp_files, merge_audio_video
+from recorder.metrics import machine_info
+from recorder.quality import AUTO, PROFILES, CalibrationCache, resolve_profile
+from recorder.session_clock import SessionClock
+
+AUDIO_SOURCES = ("None", "Microphone", "System Audio", "Both")
+
+
+def parse_region(text):
+    """
+    "left,top,width,height" or X11-style "WIDTHxHEIGHT+LEFT+TOP".
+    :return: (left, top, width, height)
+    """
+    match = re.fullmatch(r"(\d+)x(\d+)([+-]\d+)([+-]\d+)", text.strip())
+    if match:
+        width, height, left, top = (int(group) for group in match.groups())
+        return left, top, width, height
+    parts = [part.strip() for part in text.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError(f"region must be left,top,width,height or WxH+X+Y, not {text!r}")
+    try:
+        left, top, width, height = (int(part) for part in parts)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"region values must be integers: {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("region width and height must be positive")
+    return left, top, width, height
+
+
+def make_source(spec):
+    """
+    FrameSource for --source: "screen" (None, the VideoRecorder default),
+    "synthetic[:WxH[:pattern]]" or "file:PATH".
+    """
+    if spec in (None, "screen"):
+        return None
+    from recorder.frame_sources import SyntheticSource, VideoFileSource
+    kind, _, rest = spec.partition(":")
+    if kind == "synthetic":
+        size, _, pattern = rest.partition(":")
+        width, height = (int(part) for part in (size or "1280x720").lower().split("x"))
+        return SyntheticSource(width, height, pattern or "typing")
+    if kind == "file" and rest:
+        return VideoFileSource(rest)
+    raise ValueError(f"Unknown source: {spec}")
+
+
+class StopSignal:
+    """Turns SIGINT/SIGTERM into an event, so the recording loop can stop cleanly."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.received = None
+        self._previous = {}
+
+    def install(self):
+        for name in ("SIGINT", "SIGTERM"):
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                self._previous[signum] = signal.signal(signum, self._handle)
+
+    def restore(self):
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous = {}
+
+    def _handle(self, signum, frame):
+        self.received = signal.Signals(signum).name
+        self.event.set()
+
+
+def record(args, stop):
+    """
+    Records until args.duration, a stop signal or the end of the source, then merges.
+    :return: stats dict ("success" tells whether the output was written)
+    """
+    from recorder.cursor import CursorSampler, position_reader
+    from recorder.video_capture import VideoRecorder
+
+    output = os.path.abspath(args.out or datetime.datetime.now().strftime("recording_%Y%m%d_%H%M%S.mp4"))
+    session_dir = tempfile.mkdtemp(prefix="cli_session_", dir=get_temp_dir())
+    video_path = os.path.join(session_dir, "temp_video.avi")
+    audio_path = os.path.join(session_dir, "temp_audio.wav")
+
+    source = make_source(args.source)
+    # The cursor is read without pyautogui, which would import tkinter
+    cursor = None
+    if not args.no_cursor and source is None:
+        position = position_reader(gui=False)
+        if position is not None:
+            cursor = CursorSampler(position=position)
+        else:
+            print("Cursor position is not available, recording without the cursor")
+
+    clock = SessionClock()
+    clock.start()
+    video = VideoRecorder(
+        filename=video_path,
+        fps=args.fps,
+        resolution=args.resolution,
+        region=args.region,
+        show_cursor=cursor is not None,
+        cursor=cursor,
+        clock=clock,
+        monitor=args.monitor,
+        source=source,
+    )
+    audio = None
+    if args.audio != "None":
+        from recorder.audio_capture import AudioRecorder
+        from recorder.audio_devices import get_registry
+        get_registry().refresh()  # one enumeration, before the clock matters
+        audio = AudioRecorder(filename=audio_path, source_type=args.audio, device_index=args.mic,
+                              system_device_index=args.system_device, clock=clock)
+    profile = resolve_profile(args.quality, video.output_width, video.output_height, video.fps, CalibrationCache())
+    # Encoded with the profile while recording (when ffmpeg is available), so the merge only remuxes
+    video.video_args = profile.video_args()
+    print(f"Recording {video.width}x{video.height} -> {video.output_width}x{video.output_height} "
+          f"at {video.fps:g} fps ({profile}) to {output}")
+
+    started = time.perf_counter()
+    video.start()
+    if audio:
+        audio.start()
+
+    reason = "duration"
+    while True:
+        elapsed = time.perf_counter() - started
+        if stop.event.is_set():
+            reason = stop.received or "signal"
+            break
+        if video.stop_event.is_set():
+            reason = "source_exhausted"
+            break
+        if args.duration and elapsed >= args.duration:
+            break
+        remaining = args.duration - elapsed if args.duration else 0.25
+        stop.event.wait(min(0.25, remaining))
+
+    if audio:
+        audio.stop()
+    video.stop()
+    recorded = time.perf_counter() - started
+    print(f"Stopped ({reason}) after {recorded:.2f}s, merging...")
+
+    merge_started = time.perf_counter()
+    duration = video.frame_stats().get("written", 0) / video.fps or None
+    success = merge_audio_video(video.filename, audio_path, output, audio_offset=clock.audio_offset(),
+                                video_args=profile.video_args(), duration=duration)
+    if success:
+        cleanup_temp_files(session_dir)
+    else:
+        print(f"Temporary files kept in: {session_dir}")
+
+    return {
+        "success": success,
+        "output": output if success else None,
+        "stop_reason": reason,
+        "recorded_seconds": round(recorded, 3),
+        "merge_seconds": round(time.perf_counter() - merge_started, 3),
+        "settings": {"fps": video.fps, "size": [video.width, video.height],
+                     "output_size": [video.output_width, video.output_height], "region": args.region,
+                     "monitor": video.monitor_index, "source": args.source, "audio": args.audio},
+        "encoder": profile.as_dict(),
+        "clock": clock.as_dict(),
+        "video": {"frames": video.frame_stats(), "stages": video.get_stats()},
+        "audio": audio.get_stats() if audio else None,
+        "merge_plans": get_merge_plan_stats(),
+        "machine": machine_info(),
+    }
+
+
+def list_devices():
+    """Monitors and audio devices, as JSON-friendly dicts."""
+    from recorder.frame_sources import list_monitors
+    from recorder.audio_devices import get_registry
+    try:
+        monitors = list_monitors()
+    except Exception as e:
+        print(f"Error listing monitors: {e}")
+        monitors = []
+    registry = get_registry()
+    registry.refresh()
+    return {"monitors": monitors, "audio": [device.as_dict() for device in registry.devices()]}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m screen_recorder", description="Headless screen recording")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record the screen to a file")
+    rec.add_argument("--out", help="output file (default: recording_<timestamp>.mp4)")
+    rec.add_argument("--duration", type=float, default=0.0, help="seconds to record; 0 records until SIGINT/SIGTERM")
+    rec.add_argument("--fps", type=float, default=30.0)
+    rec.add_argument("--region", type=parse_region, help="left,top,width,height or WxH+X+Y")
+    rec.add_argument("--monitor", type=int, default=1, help="mss monitor index, 0 for all monitors")
+    rec.add_argument("--resolution", default=None, help="output resolution, e.g. 1080p, 720p or 1280x720")
+    rec.add_argument("--quality", default="Medium", choices=list(PROFILES) + [AUTO])
+    rec.add_argument("--audio", default="None", choices=AUDIO_SOURCES)
+    rec.add_argument("--mic", help="microphone device name (see the devices command)")
+    rec.add_argument("--system-device", help="loopback device name")
+    rec.add_argument("--no-cursor", action="store_true", help="do not draw the cursor (never drawn on test sources)")
+    rec.add_argument("--source", default="screen",
+                     help="screen, synthetic[:WxH[:pattern]] or file:PATH (for tests without a display)")
+    rec.add_argument("--stats", help="also write the stats JSON to this file")
+
+    commands.add_parser("devices", help="list monitors and audio devices")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    stop = StopSignal()
+    stop.install()
+    try:
+        # Recorder messages go to stderr so stdout carries only the JSON result
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.command == "devices":
+                result = list_devices()
+            else:
+                result = record(args, stop)
+    finally:
+        stop.restore()
+
+    text = json.dumps(result, default=str)
+    if getattr(args, "stats", None):
+        with open(args.stats, 'w') as f:
+            json.dump(result, f, indent=4, default=str)
+    out.write(text + "\n")
+    out.flush()
+    return 0 if result.get("success", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,61 @@
+import time
+LAUNCHED = time.perf_counter()  # before any other import, for the startup report
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 import threading
-import time
 import os
 import datetime
 import shutil
 import tkinter as tk
 from tkinter import messagebox
 import sys
-import pystray
-from PIL import Image, ImageDraw
 
-# Import components (using direct local imports to avoid pip package conflict)
+# Import components (using direct local imports to avoid pip package conflict).
+# Only modules that are cheap to import are loaded here; the capture modules
+# pull in numpy, cv2, mss and PortAudio and are imported where they are used,
+# after the window is up (see _startup_tasks).
 from ui.main_window import MainWindow
 from ui.region_selection import RegionSelectionWindow
-from recorder.video_capture import VideoRecorder
-from recorder.audio_capture import AudioRecorder
+from recorder.live_muxer import LiveMuxer
+from recorder.session_clock import SessionClock
+from recorder.segments import SegmentController
+from recorder.finalizer import FinalizeJob, FinalizeQueue
+from recorder.quality import AUTO, CalibrationCache, EncodeWatchdog, calibration_key, resolve_profile
+from recorder.metrics import machine_info, write_session_metrics
 from recorder.merger import merge_audio_video, get_temp_dir, cleanup_temp_files, check_ffmpeg
 from utils.config import load_config, save_config
-
-try:
-    import keyboard
-except ImportError:
-    keyboard = None
+from utils.startup import StartupTimer, report_target
 
 class ScreenRecorderApp:
-    def __init__(self):
+    def __init__(self, startup=None):
+        """
+        :param startup: StartupTimer for the --startup-report milestones
+        """
+        self.startup = startup or StartupTimer()
         self.config = load_config()
         self.window = MainWindow(
             start_callback=self.start_recording,
             stop_callback=self.stop_recording,
             pause_callback=self.pause_recording,
             resume_callback=self.resume_recording,
-            config=self.config
+            config=self.config,
+            refresh_devices_callback=self.refresh_audio_devices
         )
         self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.startup.mark("window_created")
         
         self.video_recorder = None
+        self.video_recorders = []  # primary first, then one per extra monitor
         self.audio_recorder = None
+        self.muxer = None
+        self.encoder_profile = None
+        self.encode_watchdog = None
+        self.calibration = CalibrationCache()
+        
+        # Instant replay: an in-memory ring fed by the recording, or by its own capture while idle
+        self.replay = None
+        self.replay_recorders = []
+        self.replay_profile = None
         
         self.is_recording = False
         self.is_paused = False
@@ -49,15 +67,20 @@ class ScreenRecorderApp:
         self.stop_event = threading.Event()
         
         self.temp_dir = get_temp_dir()
+        self.session_dir = self.temp_dir
         self.temp_video_path = os.path.join(self.temp_dir, "temp_video.avi")
         self.temp_audio_path = os.path.join(self.temp_dir, "temp_audio.wav")
         
+        # Merging/encoding runs here so the UI never waits for ffmpeg
+        self.finalizer = FinalizeQueue(on_progress=self._on_finalize_progress, on_done=self._on_finalize_done)
+        
+        # Created by _startup_tasks once the window is shown
         self.tray_icon = None
-        self._setup_tray()
-        self.setup_hotkeys()
         
     def _setup_tray(self):
         try:
+            import pystray
+            from PIL import Image, ImageDraw
             # Create a simple icon
             image = Image.new('RGB', (64, 64), color=(74, 144, 226))
             d = ImageDraw.Draw(image)
@@ -67,6 +90,7 @@ class ScreenRecorderApp:
                 pystray.MenuItem("Show", self.show_window),
                 pystray.MenuItem("Start Recording", self.start_recording),
                 pystray.MenuItem("Stop Recording", self.stop_recording),
+                pystray.MenuItem("Save Replay", self.save_replay),
                 pystray.MenuItem("Exit", self.quit_app)
             )
             
@@ -96,11 +120,16 @@ class ScreenRecorderApp:
         self.on_close(force=True)
 
     def setup_hotkeys(self):
+        try:
+            import keyboard
+        except ImportError:
+            keyboard = None
         if keyboard:
             try:
                 keyboard.add_hotkey('f9', self.start_recording_hotkey)
                 keyboard.add_hotkey('f10', self.toggle_pause_hotkey)
                 keyboard.add_hotkey('f11', self.stop_recording_hotkey)
+                keyboard.add_hotkey('f12', self.save_replay_hotkey)
             except Exception as e:
                 print(f"Failed to setup global hotkeys: {e}")
 
@@ -119,12 +148,110 @@ class ScreenRecorderApp:
         if self.is_recording:
             self.window.after(0, self.stop_recording)
 
+    def save_replay_hotkey(self):
+        if self.replay:
+            self.window.after(0, self.save_replay)
+
+    def start_replay(self):
+        """
+        Starts the replay buffer if enabled in the config. Recordings feed it
+        directly; while nothing is being recorded, a capture of the configured
+        monitor runs just for the ring.
+        """
+        if self.replay or not self.config.get("replay_buffer"):
+            return
+        self._replay_ring(float(self.config.get("fps", 30)))
+        if not self.is_recording:
+            self._start_replay_capture()
+        print(f"Replay buffer running: last {self.replay.seconds:.0f}s, F12 to save")
+
+    def _replay_ring(self, fps):
+        """The replay ring for a capture at `fps`; replaced if it was filled at another rate."""
+        from recorder.replay_buffer import ReplayBuffer
+        if self.replay is None or self.replay.fps != fps:
+            if self.replay is not None:
+                self.replay.close()
+            self.replay = ReplayBuffer(
+                seconds=float(self.config.get("replay_seconds", 30)),
+                max_bytes=float(self.config.get("replay_max_mb", 512)) * 1024 * 1024,
+                fps=fps
+            )
+        return self.replay
+
+    def _start_replay_capture(self):
+        """Captures into the replay ring only, while no recording is running."""
+        if not self.replay or self.replay_recorders or self.is_recording:
+            return
+        from recorder.video_capture import VideoRecorder
+        from recorder.audio_capture import AudioRecorder
+        fps = float(self.config.get("fps", 30))
+        replay = self._replay_ring(fps)
+        mic_idx, sys_idx = self.window.get_selected_audio_devices()
+        clock = SessionClock()
+        clock.start()
+        
+        video = VideoRecorder(
+            fps=fps,
+            resolution=self.config.get("resolution"),
+            show_cursor=self.config.get("show_cursor", True),
+            cursor_rate=float(self.config.get("cursor_rate", 120)),
+            highlight_clicks=self.config.get("highlight_clicks", True),
+            skip_unchanged=self.config.get("skip_unchanged", True),
+            sink=replay.video,
+            clock=clock,
+            monitor=int(self.config.get("monitor", 1))
+        )
+        audio = AudioRecorder(
+            source_type=self.config.get("audio_source", "Microphone"),
+            device_index=mic_idx,
+            system_device_index=sys_idx,
+            samplerate=replay.samplerate,
+            channels=replay.channels,
+            mic_volume=float(self.config.get("mic_volume", 100)),
+            system_volume=float(self.config.get("system_volume", 100)),
+            sink=replay.audio,
+            clock=clock
+        )
+        self.replay_profile = self._encoder_profile(video.output_width, video.output_height, fps)
+        replay.begin_session()
+        self.replay_recorders = [video, audio]
+        for recorder in self.replay_recorders:
+            recorder.start()
+
+    def _stop_replay_capture(self):
+        """Stops the replay-only capture (and its audio streams); the ring is kept."""
+        for recorder in self.replay_recorders:
+            recorder.stop()
+        self.replay_recorders = []
+
+    def stop_replay(self):
+        self._stop_replay_capture()
+        if self.replay:
+            self.replay.close()
+        self.replay = None
+
+    def save_replay(self, icon=None, item=None):
+        """Saves the last N seconds of the replay buffer without interrupting it."""
+        if not self.replay:
+            return
+        print(f"Replay buffer: {self.replay.as_dict()}")
+        # Include the few frames still waiting for the ring's JPEG encoder
+        self.replay.flush(0.5)
+        snapshot = self.replay.snapshot()
+        if snapshot is None:
+            print("Replay buffer is empty")
+            return
+        output_file = self._make_output_path(suffix="_replay")
+        video_args = self.replay_profile.video_args()
+        self.finalizer.submit(FinalizeJob(output_file, lambda progress: snapshot.save(output_file, video_args)))
+        self._show_finalize_status(f"Saving replay {os.path.basename(output_file)}...")
+
     def start_recording(self, icon=None, item=None):
         if self.is_recording:
             return
             
-        # Get selected device indices from UI
-        self.mic_idx, self.sys_idx = self.window.get_selected_audio_indices()
+        # Get selected devices (stable names) from UI
+        self.mic_idx, self.sys_idx = self.window.get_selected_audio_devices()
             
         # Check Region
         mode = self.window.record_mode.get()
@@ -178,32 +305,125 @@ class ScreenRecorderApp:
         top.after(1000, update)
 
     def _initiate_rec(self, region):
+        from recorder.video_capture import VideoRecorder
+        from recorder.audio_capture import AudioRecorder, HAS_SOUNDDEVICE
         fps = float(self.config.get("fps", 30))
         codec = self.config.get("codec", "MP4V")
         show_cursor = self.config.get("show_cursor", True)
         audio_source = self.config.get("audio_source", "Microphone")
         
-        cleanup_temp_files(self.temp_dir)
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Each session gets its own temp folder, earlier ones may still be finalizing
+        self.session_dir = os.path.join(self.temp_dir, datetime.datetime.now().strftime("session_%Y%m%d_%H%M%S_%f"))
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.temp_video_path = os.path.join(self.session_dir, "temp_video.avi")
+        self.temp_audio_path = os.path.join(self.session_dir, "temp_audio.wav")
         
-        self.video_recorder = VideoRecorder(
-            filename=self.temp_video_path,
-            fps=fps,
-            region=region,
-            codec=codec,
-            show_cursor=show_cursor
-        )
+        # The recording feeds the replay ring itself: no second capture of the same screen and devices
+        self._stop_replay_capture()
+        replay = self._replay_ring(fps) if self.replay else None
+        
+        # Time zero for both recorders, so the audio can be placed on the video timeline
+        self.session_clock = SessionClock()
+        self.session_clock.start()
+
+        # Extra monitors are recorded as separate streams on the same clock
+        monitor = int(self.config.get("monitor", 1))
+        extra_monitors = [] if region else [int(m) for m in self.config.get("extra_monitors", []) if int(m) != monitor]
+        live_mux = self.config.get("live_mux") and not extra_monitors
+        if extra_monitors and self.config.get("live_mux"):
+            print("Live mux is not used when recording several monitors")
+
+        # Rolling segments: each closed segment is merged while recording continues
+        self.segments = None
+        segment_seconds = float(self.config.get("segment_seconds", 0) or 0)
+        segment_mb = float(self.config.get("segment_mb", 0) or 0)
+        if (segment_seconds or segment_mb) and not self.config.get("live_mux"):
+            if extra_monitors:
+                print("Rolling segments are not used when recording several monitors")
+            else:
+                self.segments = SegmentController(seconds=segment_seconds, max_bytes=segment_mb * 1024 * 1024)
+
+        self.video_recorders = []
+        for index in [monitor] + extra_monitors:
+            filename = self.temp_video_path
+            if self.video_recorders:
+                filename = os.path.join(self.session_dir, f"temp_video_monitor{index}.avi")
+            self.video_recorders.append(VideoRecorder(
+                filename=filename,
+                fps=fps,
+                resolution=self.config.get("resolution"),
+                region=region,
+                codec=codec,
+                show_cursor=show_cursor,
+                # One cursor sampler thread serves every monitor
+                cursor=self.video_recorders[0].cursor if self.video_recorders else None,
+                cursor_rate=float(self.config.get("cursor_rate", 120)),
+                highlight_clicks=self.config.get("highlight_clicks", True),
+                capture_queue_size=int(self.config.get("capture_queue_size", 4)),
+                encode_queue_size=int(self.config.get("encode_queue_size", 8)),
+                convert_workers=int(self.config.get("convert_workers", 2)),
+                drop_policy=self.config.get("drop_policy", "drop_oldest"),
+                skip_unchanged=self.config.get("skip_unchanged", True),
+                clock=self.session_clock,
+                segments=self.segments,
+                monitor=index,
+                taps=[replay.video] if replay and not self.video_recorders else None
+            ))
+        self.video_recorder = self.video_recorders[0]
+        
+        # Encoder settings for the live mux or the final transcode
+        self.encoder_profile = self._encoder_profile(self.video_recorder.output_width,
+                                                     self.video_recorder.output_height, fps)
+        print(f"Encoder profile: {self.encoder_profile}")
+        # The primary monitor is encoded with the profile while recording, so the merge only remuxes it
+        self.video_recorder.video_args = self.encoder_profile.video_args()
+        if self.segments:
+            self.segments.video_args = self.encoder_profile.video_args()
         
         self.audio_recorder = AudioRecorder(
             filename=self.temp_audio_path,
             source_type=audio_source,
             device_index=self.mic_idx,
-            system_device_index=self.sys_idx
+            system_device_index=self.sys_idx,
+            mic_volume=float(self.config.get("mic_volume", 100)),
+            system_volume=float(self.config.get("system_volume", 100)),
+            mic_boost_db=float(self.config.get("mic_boost_db", 34.0)),
+            highpass_hz=self.config.get("highpass_hz", 80.0),
+            noise_gate_db=self.config.get("noise_gate_db"),
+            limiter_db=self.config.get("limiter_db", -1.0),
+            clock=self.session_clock,
+            segments=self.segments,
+            taps=[replay.audio] if replay else None
         )
+        if replay:
+            self.replay_profile = self.encoder_profile
+            replay.begin_session()
+
+        # Live mux: feed both streams into one ffmpeg process, no temp files or merge step
+        self.muxer = None
+        if live_mux:
+            self.output_file = self._make_output_path()
+            self.muxer = LiveMuxer(
+                self.output_file,
+                fps=fps,
+                samplerate=self.audio_recorder.samplerate,
+                channels=self.audio_recorder.channels,
+                has_audio=HAS_SOUNDDEVICE and audio_source != "None",
+                video_args=self.encoder_profile.video_args()
+            )
+            self.video_recorder.sink = self.muxer.video
+            self.audio_recorder.sink = self.muxer.audio
         
-        self.video_recorder.start()
+        for recorder in self.video_recorders:
+            recorder.start()
         self.audio_recorder.start()
         
+        # Warn if the x264 encoder running during the recording cannot keep up
+        self.encode_watchdog = None
+        if self.muxer or self.video_recorder.live_encoding:
+            self.encode_watchdog = EncodeWatchdog(self.video_recorder, self._on_encode_backlog)
+            self.encode_watchdog.start()
+        
         self.is_recording = True
         self.is_paused = False
         self.recording_start_time = time.time()
@@ -236,7 +456,8 @@ class ScreenRecorderApp:
         self.is_paused = True
         self.pause_start_time = time.time()
         
-        self.video_recorder.pause()
+        for recorder in self.video_recorders:
+            recorder.pause()
         self.audio_recorder.pause()
         
         self.window.on_pause()
@@ -249,7 +470,8 @@ class ScreenRecorderApp:
         pause_duration = time.time() - self.pause_start_time
         self.total_pause_duration += pause_duration
         
-        self.video_recorder.resume()
+        for recorder in self.video_recorders:
+            recorder.resume()
         self.audio_recorder.resume()
         
         self.window.on_pause()
@@ -267,15 +489,51 @@ class ScreenRecorderApp:
         self.window.set_processing_state()
         self.window.update()
         
-        self.video_recorder.stop()
+        if self.encode_watchdog:
+            self.encode_watchdog.stop()
+        for recorder in self.video_recorders:
+            recorder.stop()
         self.audio_recorder.stop()
+        self._save_session_metrics()
         
-        self.process_output()
+        # Hand the session over to the finalizer and get ready for the next one
+        job = self.finalizer.submit(self._make_finalize_job())
+        self.muxer = None
+        self.segments = None
         
         self.window.set_recording_state(False)
         self.window.timer_label.configure(text="00:00:00")
+        self._show_finalize_status(f"Finalizing {job.name}...")
+        
+        # Back to capturing for the replay ring alone
+        self._start_replay_capture()
+
+    def _save_session_metrics(self):
+        """Dumps this session's pipeline and audio metrics to <metrics_dir>/<session>.json."""
+        folder = self.config.get("metrics_dir") or os.path.join(self.temp_dir, "metrics")
+        path = os.path.join(folder, os.path.basename(self.session_dir) + ".json")
+        settings = ("fps", "resolution", "quality", "monitor", "extra_monitors", "audio_source", "live_mux",
+                    "skip_unchanged", "convert_workers", "segment_seconds", "segment_mb")
+        metrics = {
+            "session": os.path.basename(self.session_dir),
+            "machine": machine_info(),
+            "settings": {key: self.config.get(key) for key in settings},
+            "encoder": self.encoder_profile.as_dict() if self.encoder_profile else None,
+            "clock": self.session_clock.as_dict(),
+            "startup": self.startup.as_dict(),
+            "video": [{
+                "monitor": recorder.monitor_index,
+                "frames": recorder.frame_stats(),
+                "stages": recorder.get_stats(histograms=True),
+            } for recorder in self.video_recorders],
+            "audio": self.audio_recorder.get_stats(histograms=True),
+        }
+        if self.segments:
+            metrics["segments"] = self.segments.as_dict()
+        if write_session_metrics(path, metrics):
+            print(f"Session metrics: {path}")
 
-    def process_output(self):
+    def _make_output_path(self, suffix=""):
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         prefix = self.config.get("filename_prefix", "ScreenRecord")
         output_folder = self.config.get("save_path")
@@ -286,20 +544,151 @@ class ScreenRecorderApp:
             except:
                 output_folder = os.getcwd()
         
-        output_file = os.path.join(output_folder, f"{prefix}_{timestamp}.mp4")
-        
-        # Debug info
-        print(f"Processing output...")
-        print(f"  Temp video: {self.temp_video_path} (exists: {os.path.exists(self.temp_video_path)})")
-        print(f"  Temp audio: {self.temp_audio_path} (exists: {os.path.exists(self.temp_audio_path)})")
-        print(f"  Output: {output_file}")
+        return os.path.join(output_folder, f"{prefix}_{timestamp}{suffix}.mp4")
+
+    def _make_finalize_job(self):
+        """Captures everything the finalizer needs from this session into a job."""
+        session_dir = self.session_dir
+        if self.muxer:
+            muxer = self.muxer
+            output_file = self.output_file
+            print(f"Finalizing live mux: {output_file}")
+            run = lambda progress: muxer.close()
+        elif self.segments:
+            segments = self.segments
+            output_file = self._make_output_path()
+            print(f"Finalizing segments: {segments.as_dict()}")
+            run = lambda progress: segments.finish(output_file)
+        else:
+            output_file = self._make_output_path()
+            # The recorder may have switched the temp file to .mkv to encode it while recording
+            video_path = self.video_recorder.filename
+            audio_path = self.temp_audio_path
+            audio_offset = self.session_clock.audio_offset()
+            video_args = self.encoder_profile.video_args()
+            duration = getattr(self.video_recorder, "written_frames", 0) / self.video_recorder.fps or None
+            
+            # Debug info
+            print(f"Processing output...")
+            print(f"  Temp video: {video_path} (exists: {os.path.exists(video_path)})")
+            print(f"  Temp audio: {audio_path} (exists: {os.path.exists(audio_path)})")
+            print(f"  Output: {output_file}")
+            
+            # Extra monitors get their own file with the same audio track
+            extras = [(recorder.filename, output_file[:-4] + f"_monitor{recorder.monitor_index}.mp4")
+                      for recorder in self.video_recorders[1:]]
+            
+            def run(progress):
+                ok = merge_audio_video(
+                    video_path,
+                    audio_path,
+                    output_file,
+                    keep_temp=bool(extras),
+                    audio_offset=audio_offset,
+                    video_args=video_args,
+                    progress=progress,
+                    duration=duration
+                )
+                for extra_video, extra_output in extras:
+                    print(f"  Monitor output: {extra_output}")
+                    ok = merge_audio_video(extra_video, audio_path, extra_output, keep_temp=True,
+                                           audio_offset=audio_offset, video_args=video_args) and ok
+                return ok
+
+        def cleanup(success):
+            if success:
+                cleanup_temp_files(session_dir)
+            else:
+                print(f"Temporary files kept in: {session_dir}")
+
+        return FinalizeJob(output_file, run, cleanup)
+
+    def _encoder_profile(self, width, height, fps):
+        return resolve_profile(self.config.get("quality", "Medium"), width, height, fps, self.calibration)
+
+    def _on_encode_backlog(self):
+        """Called on the watchdog thread when the live encoder keeps falling behind."""
+        profile = self.encoder_profile
+        print(f"Warning: encoder cannot keep up with {profile}, frames are being dropped")
+        if profile.name == AUTO:
+            key = calibration_key(self.video_recorder.output_width, self.video_recorder.output_height,
+                                  self.video_recorder.fps)
+            preset = self.calibration.downgrade(key, profile.preset)
+            if preset:
+                print(f"Next recordings at {key} will use the '{preset}' preset")
+        else:
+            print("Choose a lower quality or resolution, or set quality to Auto")
+
+    def _calibrate_encoder(self):
+        """Runs the Auto quality calibration for the configured monitor once, in the background."""
+        if self.config.get("quality") != AUTO:
+            return
         
-        success = merge_audio_video(
-            self.temp_video_path,
-            self.temp_audio_path,
-            output_file
-        )
+        def run():
+            from recorder.video_capture import list_monitors
+            from recorder.scaling import output_size
+            try:
+                monitors = list_monitors()
+                index = int(self.config.get("monitor", 1))
+                monitor = monitors[index] if 0 <= index < len(monitors) else monitors[1]
+                fps = float(self.config.get("fps", 30))
+                width, height = output_size(monitor["width"], monitor["height"], self.config.get("resolution"))
+                resolve_profile(AUTO, width, height, fps, self.calibration, calibrate_missing=True)
+            except Exception as e:
+                print(f"Encoder calibration failed: {e}")
         
+        threading.Thread(target=run, name="encoder-calibration", daemon=True).start()
+
+    def refresh_audio_devices(self):
+        """
+        Re-initializes PortAudio so plugged/unplugged devices show up. The
+        replay-only capture is stopped meanwhile to close its streams; during
+        a recording the re-init waits until the recording stops.
+        """
+        from recorder.audio_devices import get_registry
+        restart_replay = bool(self.replay_recorders)
+        self._stop_replay_capture()
+
+        def run():
+            if not get_registry().refresh(reinitialize=True) and self.is_recording:
+                print("Audio devices will be refreshed when the recording stops")
+            if restart_replay:
+                self.window.after(0, self._start_replay_capture)
+
+        threading.Thread(target=run, name="audio-device-refresh", daemon=True).start()
+
+    def _on_audio_devices_changed(self, registry):
+        """Called on the registry thread when devices were enumerated or hotplugged."""
+        inputs = [device.as_dict() for device in registry.devices("input")]
+        devices = [device.as_dict() for device in registry.devices()]
+        self.window.after(0, self.window.populate_audio_devices, inputs, devices)
+
+    def _on_finalize_progress(self, job, progress, queued):
+        """Called on the finalizer thread for every ffmpeg progress update."""
+        text = f"Finalizing {job.name}"
+        if progress["percent"] is not None:
+            text += f": {progress['percent']:.0f}%"
+        if progress["fps"]:
+            text += f" | {progress['fps']:.0f} fps"
+        if progress["eta"] is not None:
+            text += f" | ETA {datetime.timedelta(seconds=int(progress['eta']))}"
+        if queued:
+            text += f" (+{queued} queued)"
+        self.window.after(0, self._show_finalize_status, text)
+
+    def _show_finalize_status(self, text):
+        # A new recording owns the status line
+        if not self.is_recording:
+            self.window.status_label.configure(text=text, text_color="orange")
+
+    def _on_finalize_done(self, job):
+        self.window.after(0, self._report_result, job.success, job.output_path)
+
+    def _report_result(self, success, output_file):
+        if self.is_recording:
+            # Don't interrupt the current recording with a dialog
+            print(f"{'Saved' if success else 'Failed to save'}: {output_file}")
+            return
         if success:
             self.window.status_label.configure(text=f"Saved: {os.path.basename(output_file)}", text_color="green")
             messagebox.showinfo("Recording Finished", f"Saved to:\n{output_file}")
@@ -310,20 +699,75 @@ class ScreenRecorderApp:
     def on_close(self, force=False):
         if not force and self.is_recording:
             if messagebox.askokcancel("Quit", "Recording in progress. Stop and save?"):
+                self.stop_replay()
                 self.stop_recording()
+                self._wait_for_finalizer()
                 self.window.destroy()
         else:
+            self.stop_replay()
+            self._wait_for_finalizer()
             if self.tray_icon:
                 self.tray_icon.stop()
             self.window.destroy()
             sys.exit(0)
 
+    def _wait_for_finalizer(self):
+        if self.finalizer.pending:
+            print(f"Waiting for {self.finalizer.pending} recording(s) to finish saving...")
+            self.finalizer.wait()
+
     def run(self):
-        if not check_ffmpeg():
-            messagebox.showwarning("FFmpeg Missing", "FFmpeg was not found in PATH.\nAudio merging will fail.\nPlease install FFmpeg.")
-            
+        # The window is drawn first; everything it does not need runs after that
+        self.window.after_idle(self._on_window_shown)
         self.window.mainloop()
 
+    def _on_window_shown(self):
+        self.startup.mark("window_shown")
+        threading.Thread(target=self._startup_tasks, name="startup", daemon=True).start()
+
+    def _startup_tasks(self):
+        """
+        Environment probes and heavy imports, on a background thread so they
+        never delay the window. Results are handed to the UI with after().
+        """
+        self.setup_hotkeys()
+        self.startup.mark("hotkeys")
+
+        if not check_ffmpeg():
+            self.window.after(0, messagebox.showwarning, "FFmpeg Missing",
+                              "FFmpeg was not found in PATH.\nAudio merging will fail.\nPlease install FFmpeg.")
+        self.startup.mark("ffmpeg_probed")
+
+        # Importing the capture modules here also warms them up for the first recording
+        try:
+            from recorder.video_capture import list_monitors
+            monitors = list_monitors()
+            self.window.after(0, self.window.set_monitors, monitors)
+        except Exception as e:
+            print(f"Error listing monitors: {e}")
+        self.startup.mark("monitors_probed")
+
+        # Enumerated once here, then re-read by the registry's watcher (re-initialized on request only)
+        import recorder.audio_capture  # warm-up for the first recording
+        from recorder.audio_devices import get_registry
+        registry = get_registry()
+        registry.poll_interval = float(self.config.get("audio_device_poll", 5.0))
+        registry.add_listener(self._on_audio_devices_changed)
+        registry.refresh()
+        registry.start()
+        self.startup.mark("audio_probed")
+
+        self._setup_tray()
+        self.startup.mark("tray")
+
+        self._calibrate_encoder()
+        self.window.after(0, self.start_replay)
+        self.startup.report()
+
 if __name__ == "__main__":
-    app = ScreenRecorderApp()
+    report, report_path = report_target(sys.argv[1:])
+    startup = StartupTimer(LAUNCHED, enabled=report, path=report_path)
+    startup.mark("imports")
+    app = ScreenRecorderApp(startup)
+    startup.mark("app_ready")
     app.run()
@@ -1,10 +1,19 @@
 import numpy as np
-import wave
+import os
+import queue
 import threading
 import time
 import platform
 import sys
 
+from recorder.audio_devices import get_registry
+from recorder.audio_writer import StreamingWavWriter
+from recorder.audio_dsp import build_chain
+from recorder.audio_mixer import AudioMixer
+from recorder.metrics import AudioStatusCounters, Histogram, depth_histogram
+from recorder.session_clock import SessionClock
+from recorder.segments import SegmentedWavWriter
+
 # Handle optional sounddevice dependency
 try:
     import sounddevice as sd
@@ -13,12 +22,41 @@ except OSError:
     HAS_SOUNDDEVICE = False
     sd = None
 
+# Default boost for microphone input (~50x, compensates for low mic levels)
+MIC_BOOST_DB = 34.0
+
 class AudioRecorder:
-    def __init__(self, filename="temp_audio.wav", samplerate=44100, channels=2, source_type="Microphone", device_index=None, system_device_index=None):
+    def __init__(self, filename="temp_audio.wav", samplerate=44100, channels=2, source_type="Microphone", device_index=None, system_device_index=None, sink=None, queue_blocks=256,
+                 mic_volume=100, system_volume=100, mic_boost_db=MIC_BOOST_DB, highpass_hz=80.0,
+                 noise_gate_db=None, limiter_db=-1.0, clock=None, segments=None, registry=None, taps=None):
         """
         :param source_type: "Microphone", "System Audio", "Both", "None"
-        :param device_index: Index for Microphone
-        :param system_device_index: Index for System Audio (Loopback)
+        :param device_index: Microphone: a DeviceRegistry key ("Host API: name"), a device
+                             name or a PortAudio index; None for the default input
+        :param system_device_index: System Audio (Loopback) device, same forms as device_index
+        :param sink: Optional object with write(int16 block)/close(); when set, blocks are
+                     streamed to it during capture instead of being saved to `filename`
+        :param queue_blocks: Callback blocks buffered for the writer thread before blocks are dropped
+        :param mic_volume: Microphone level in percent, applied on top of mic_boost_db
+        :param system_volume: System audio level in percent
+        :param mic_boost_db: Fixed boost for microphone input
+        :param highpass_hz: Cutoff of the microphone rumble filter, None to disable
+        :param noise_gate_db: Microphone noise gate threshold (block RMS), None to disable
+        :param limiter_db: Ceiling of the look-ahead peak limiter, None to disable
+        :param clock: SessionClock shared with the video recorder; the ADC time of the
+                      first recorded sample is marked on it so the audio can be aligned
+        :param segments: SegmentController shared with the video recorder; when enabled,
+                         the WAV output is split at the same timeline positions as the video
+        :param registry: DeviceRegistry used to resolve devices; the process-wide one by default
+        :param taps: Extra sinks (e.g. ReplayBuffer.audio) that get every block next to the
+                     output, aligned to the video timeline like a sink; never closed
+
+        The PortAudio callback only copies each block into a bounded queue. A writer
+        thread runs the DSP chain and streams PCM to the WAV file (or sink) as it
+        arrives, so memory use does not grow with the recording length.
+
+        get_stats() reports, live, the callback status flags per stream, callback
+        and block processing time histograms and the writer queue depth.
         """
         self.filename = filename
         self.samplerate = samplerate
@@ -26,11 +64,29 @@ class AudioRecorder:
         self.source_type = source_type
         self.mic_device = device_index
         self.sys_device = system_device_index
+        self.sink = sink
+        self.taps = list(taps or [])
+        self.mic_volume = mic_volume
+        self.system_volume = system_volume
+        self.mic_boost_db = mic_boost_db
+        self.highpass_hz = highpass_hz
+        self.noise_gate_db = noise_gate_db
+        self.limiter_db = limiter_db
+        self.dsp = None
+        self.mixer = None
+        self.clock = clock
+        self._first_sample_marked = False
+        self.segments = segments
+        self.registry = registry or get_registry()
         
         self.recording = False
         self.paused = False
         self._thread = None
-        self._frames = [] # Stored as list of numpy arrays
+        self._writer = None
+        self._queue = queue.Queue(maxsize=queue_blocks)
+        self.overflows = 0  # blocks dropped because the writer fell behind
+        self.samples_written = 0
+        self._reset_metrics()
         
         self.is_windows = platform.system() == "Windows"
         
@@ -39,23 +95,17 @@ class AudioRecorder:
 
     @staticmethod
     def get_devices(kind=None):
-        """Returns a list of available audio devices."""
+        """
+        Returns a list of available audio devices as dicts (see AudioDevice.as_dict),
+        from the device registry; PortAudio is only enumerated if it has not been yet.
+        :param kind: 'input', 'output' (for loopback lookups) or None for all
+        """
         if not HAS_SOUNDDEVICE:
             return []
-        try:
-            devices = sd.query_devices()
-            device_list = []
-            for i, d in enumerate(devices):
-                # Filter by kind if needed ('input' or 'output')
-                if kind == 'input' and d['max_input_channels'] > 0:
-                    device_list.append({'index': i, 'name': d['name'], 'hostapi': d['hostapi']})
-                elif kind == 'output' and d['max_output_channels'] > 0: # For loopback lookups
-                     device_list.append({'index': i, 'name': d['name'], 'hostapi': d['hostapi']})
-                elif kind is None:
-                    device_list.append(d)
-            return device_list
-        except Exception:
-            return []
+        registry = get_registry()
+        if not registry.ready:
+            registry.refresh()
+        return [device.as_dict() for device in registry.devices(kind)]
 
     def start(self):
         if self.recording:
@@ -71,21 +121,98 @@ class AudioRecorder:
 
         print(f"Starting audio recording: source={self.source_type}, mic_device={self.mic_device}, sys_device={self.sys_device}")
         
+        # No PortAudio re-init (device hotplug refresh) while our streams are open
+        self.registry.hold()
         self.recording = True
-        self._frames = []
+        self.overflows = 0
+        self.samples_written = 0
+        self._reset_metrics()
+        if self.source_type in ["Both", "Microphone + System"]:
+            # Each source gets its own chain in the mixer; only the limiter runs on the mix
+            self.dsp = build_chain(self.samplerate, self.channels, limiter_db=self.limiter_db)
+        else:
+            self.dsp = self._build_chain(is_loopback=self.source_type == "System Audio")
+        if self.clock is None:
+            self.clock = SessionClock()
+        if not self.clock.started:
+            self.clock.start()
+        self.clock.audio_latency = self.dsp.latency
+        self._first_sample_marked = False
+        if self._segmented():
+            self.segments.register("audio")
+        self._writer = threading.Thread(target=self._writer_loop, name="audio-writer")
+        self._writer.start()
         self._thread = threading.Thread(target=self._record)
         self._thread.start()
         
     def stop(self):
-        if not self.recording:
+        if self._thread is None:
             return
             
         self.recording = False
-        if self._thread and self._thread.is_alive():
+        if self._thread.is_alive():
             self._thread.join()
+        self._thread = None
         
-        print(f"Audio frames captured: {len(self._frames)}")
-        self._save_file()
+        # The writer only has the last few queued blocks left to flush
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+        self.registry.release()
+
+    def _reset_metrics(self):
+        self.stream_status = {}  # stream name -> AudioStatusCounters
+        self.callback_time = Histogram()
+        self.block_time = Histogram()
+        self.queue_depth = depth_histogram(self._queue.maxsize)
+
+    def _instrument(self, name, callback):
+        """Wraps a stream callback to count its status flags and time it; never prints."""
+        status_counters = self.stream_status.setdefault(name, AudioStatusCounters())
+        callback_time = self.callback_time
+        clock = time.perf_counter
+
+        def instrumented(indata, frames, time_info, status):
+            started = clock()
+            status_counters.record(status)
+            callback(indata, frames, time_info, status)
+            callback_time.record(clock() - started)
+        return instrumented
+
+    def get_stats(self, histograms=False):
+        """
+        Returns audio counters and timings, safe to call while recording.
+        :param histograms: include the full histograms, not just their summaries
+        """
+        def summary(histogram, **kwargs):
+            stats = histogram.as_dict(**kwargs)
+            if not histograms:
+                stats.pop("buckets")
+            return stats
+
+        stats = {
+            "status": {name: counters.as_dict() for name, counters in self.stream_status.items()},
+            "callback": summary(self.callback_time),
+            "block": summary(self.block_time),
+            "queue": summary(self.queue_depth, scale=1, unit="depth"),
+            "overflows": self.overflows,
+            "samples_written": self.samples_written,
+        }
+        if self.dsp is not None:
+            stats["dsp"] = self.dsp.as_dict()
+        if self.mixer is not None:
+            stats["mixer"] = self.mixer.as_dict()
+        return stats
+
+    def _build_chain(self, is_loopback, limiter=True):
+        """DSP for one source: loopback audio is already at line level, so it only gets volume and the limiter."""
+        limiter_db = self.limiter_db if limiter else None
+        if is_loopback:
+            return build_chain(self.samplerate, self.channels, volume=self.system_volume,
+                               limiter_db=limiter_db)
+        return build_chain(self.samplerate, self.channels, gain_db=self.mic_boost_db,
+                           volume=self.mic_volume, highpass_hz=self.highpass_hz,
+                           gate_db=self.noise_gate_db, limiter_db=limiter_db)
 
     def pause(self):
         self.paused = True
@@ -105,10 +232,7 @@ class AudioRecorder:
             elif self.source_type == "System Audio":
                 self._record_stream(self.sys_device, is_loopback=True)
             elif self.source_type in ["Both", "Microphone + System"]:
-                # For simplicity, just record from microphone for now
-                # Mixed recording is complex and often fails
-                print("Note: Recording from microphone only (mixed recording not fully supported)")
-                self._record_stream(self.mic_device, is_loopback=False)
+                self._record_mixed(self.mic_device, self.sys_device)
             else:
                 print(f"Unknown audio source type: {self.source_type}")
         except Exception as e:
@@ -117,130 +241,214 @@ class AudioRecorder:
             traceback.print_exc()
             self.recording = False
 
+    def _resolve_device(self, device):
+        """
+        (PortAudio index or None for the default, input channel count) for a
+        configured device, from the registry snapshot. Only when the registry
+        has not been enumerated yet is the single device asked directly.
+        """
+        found = self.registry.get(device) if device is not None else self.registry.default_input()
+        if found is not None:
+            print(f"Recording from: {found.key} ({found.default_samplerate:g} Hz native)")
+            return found.index, found.max_input_channels
+        if device is not None and (self.registry.ready or not isinstance(device, int)):
+            print(f"Audio device {device!r} not found, recording from the default input")
+            device = None
+        # One device lookup, not an enumeration
+        info = sd.query_devices(device, kind='input') if device is None else sd.query_devices(device)
+        print(f"Recording from: {info['name']}")
+        return device, info['max_input_channels']
+
+    def _input_stream(self, device, callback, is_loopback=False):
+        """Opens (but does not start) an InputStream on a device."""
+        index, max_channels = self._resolve_device(device)
+        return sd.InputStream(samplerate=self.samplerate,
+                              channels=min(self.channels, max_channels),
+                              device=index,
+                              callback=callback)
+
+    def _mark_first_sample(self, frames, time_info):
+        """Maps the first recorded block's ADC time onto the session clock."""
+        if self._first_sample_marked:
+            return
+        self._first_sample_marked = True
+        now = time.perf_counter()
+        try:
+            # PortAudio stream time: how long ago the first sample of this block was captured
+            age = float(time_info.currentTime) - float(time_info.inputBufferAdcTime)
+        except (AttributeError, TypeError, ValueError):
+            age = -1.0
+        if not 0.0 <= age < 1.0:
+            # Some host APIs report no ADC time; the block is at least its own length old
+            age = frames / float(self.samplerate)
+        self.clock.mark(SessionClock.AUDIO_FIRST_SAMPLE, now - age)
+
     def _record_stream(self, device, is_loopback=False):
-        def callback(indata, frames, time, status):
-            if status:
-                print(f"Audio status: {status}")
+        def callback(indata, frames, time_info, status):
             if not self.paused:
-                self._frames.append(indata.copy())
-
-        # Use device 8 (Internal Microphone) as default since it's confirmed working
-        if device is None or device == 0:
-            try:
-                # Try device 8 first (confirmed working during testing)
-                device = 8
-                print(f"Using Internal Microphone (device {device})")
-            except:
-                print("Could not set audio device")
-                return
+                self._mark_first_sample(frames, time_info)
+                self._enqueue(indata)
 
+        name = "system" if is_loopback else "mic"
         try:
-            device_info = sd.query_devices(device)
-            print(f"Recording from: {device_info['name']}")
-            
-            with sd.InputStream(samplerate=self.samplerate,
-                                channels=min(self.channels, device_info['max_input_channels']),
-                                device=device,
-                                callback=callback):
+            with self._input_stream(device, self._instrument(name, callback), is_loopback):
+                self.clock.mark(SessionClock.AUDIO_STREAM_OPEN)
                 while self.recording:
                     sd.sleep(100)
         except Exception as e:
             print(f"Audio stream error: {e}")
+            # The device may have been unplugged: PortAudio needs a re-init to see the change
+            self.registry.request_reinitialize()
             import traceback
             traceback.print_exc()
 
     def _record_mixed(self, mic_idx, sys_idx):
-        # For mixed recording, we need two streams.
-        # This is complex because streams are blocking or callback-based.
-        # We will use two separate lists and merge them later, or use non-blocking callbacks to a shared buffer.
-        
-        mic_frames = []
-        sys_frames = []
-        
-        def mic_callback(indata, frames, time, status):
-            if not self.paused:
-                mic_frames.append(indata.copy())
-                
-        def sys_callback(indata, frames, time, status):
-            if not self.paused:
-                sys_frames.append(indata.copy())
+        """
+        Records the microphone and system audio together.
+
+        Each device's callback writes into its own ring buffer. This thread
+        mixes them block by block, with the mic as the master clock and the
+        system audio resampled to follow it, and feeds the mix to the writer
+        thread. If one device cannot be opened the other is recorded alone.
+        """
+        mixer = AudioMixer(self.samplerate, self.channels)
+        self.mixer = mixer
+        recording = lambda: not self.paused
+        streams = []
+        for name, device, is_loopback in (("mic", mic_idx, False), ("system", sys_idx, True)):
+            if is_loopback and device is None:
+                print("No system audio device selected, recording microphone only")
+                continue
+            source = mixer.add_input(name, self._build_chain(is_loopback, limiter=False))
+            try:
+                callback = self._instrument(name, mixer.callback_for(source, recording, self._mark_first_sample))
+                streams.append(self._input_stream(device, callback, is_loopback))
+            except Exception as e:
+                print(f"Could not open {name} device {device}: {e}")
+                self.registry.request_reinitialize()
+                mixer.remove_input(source)
+
+        if not streams:
+            print("Mixed recording error: no audio device could be opened")
+            return
 
         try:
-            stream_mic = sd.InputStream(samplerate=self.samplerate, channels=self.channels, device=mic_idx, callback=mic_callback)
-            stream_sys = sd.InputStream(samplerate=self.samplerate, channels=self.channels, device=sys_idx, callback=sys_callback)
-            
-            with stream_mic, stream_sys:
-                while self.recording:
-                    sd.sleep(100)
-                    
-            # Post-process merge
-            self._merge_frames(mic_frames, sys_frames)
-            
+            for stream in streams:
+                stream.start()
+            self.clock.mark(SessionClock.AUDIO_STREAM_OPEN)
+            while self.recording:
+                mixer.wait()
+                block = mixer.mix()
+                while block is not None:
+                    self._enqueue(block, copy=False)
+                    block = mixer.mix()
         except Exception as e:
             print(f"Mixed recording error: {e}")
+        finally:
+            for stream in streams:
+                stream.stop()
+                stream.close()
 
-    def _merge_frames(self, frames1, frames2):
-        # Simple merge: ensure same length and add
-        # This is a naive implementation; desync might occur over long periods if clocks differ
-        len1 = sum(len(f) for f in frames1)
-        len2 = sum(len(f) for f in frames2)
-        
-        # Concatenate first
-        arr1 = np.concatenate(frames1) if frames1 else np.zeros((0, self.channels), dtype=np.float32)
-        arr2 = np.concatenate(frames2) if frames2 else np.zeros((0, self.channels), dtype=np.float32)
-        
-        # Trim to shorter
-        min_len = min(len(arr1), len(arr2))
-        if min_len == 0:
-            # Fallback if one failed
-            self._frames = [arr1] if len(arr1) > 0 else [arr2]
-            return
-
-        arr1 = arr1[:min_len]
-        arr2 = arr2[:min_len]
-        
-        # Mix (average or add and clip)
-        mixed = (arr1 + arr2) / 2
-        self._frames = [mixed]
+    def _enqueue(self, block, copy=True):
+        """Called from the audio callback (or the mixer): never blocks."""
+        try:
+            self._queue.put_nowait(block.copy() if copy else block)
+        except queue.Full:
+            self.overflows += 1
 
-    def _save_file(self):
-        if not self._frames:
-            print("Warning: No audio frames to save!")
-            return
-            
+    def _writer_loop(self):
+        """Drains the block queue into the WAV file or sink until stop() sends None."""
+        writer = self.sink
+        lead = None
+        tap_lead = None
         try:
-            # Concatenate all blocks if not already done
-            if isinstance(self._frames[0], np.ndarray):
-                recording_data = np.concatenate(self._frames, axis=0)
-            else:
-                recording_data = np.array(self._frames)
-            
-            # Check amplitude and boost if needed
-            max_amp = np.max(np.abs(recording_data))
-            print(f"Audio max amplitude before boost: {max_amp:.4f}")
-            
-            # Apply significant gain boost (compensate for low mic input)
-            gain = 50.0  # Boost audio 50x (can adjust this value)
-            recording_data = recording_data * gain
-            
-            # Clip to prevent distortion
-            recording_data = np.clip(recording_data, -1.0, 1.0)
-            
-            max_amp_after = np.max(np.abs(recording_data))
-            print(f"Audio max amplitude after boost: {max_amp_after:.4f}")
-            
-            # Scale to int16
-            if recording_data.dtype == np.float32 or recording_data.dtype == np.float64:
-                recording_data = (recording_data * 32767).astype(np.int16)
-            
-            with wave.open(self.filename, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)
-                wf.setframerate(self.samplerate)
-                wf.writeframes(recording_data.tobytes())
-            
-            import os
-            file_size = os.path.getsize(self.filename)
-            print(f"Audio saved: {self.filename} ({file_size} bytes)")
+            while True:
+                self.queue_depth.record(self._queue.qsize())
+                block = self._queue.get()
+                if block is None:
+                    break
+                started = time.perf_counter()
+                block = self.dsp.process(self._fit_channels(block))
+                pcm = self._to_pcm16(block)
+                if writer is None:
+                    # Opened on the first block so a failed stream leaves no empty file behind
+                    writer = self._open_file()
+                if lead is None:
+                    lead = self._leading_samples(writer is self.sink)
+                    tap_lead = self._leading_samples(True)
+                out, lead = self._align(pcm, lead)
+                writer.write(out)
+                self.samples_written += len(out)
+                if self.taps:
+                    out, tap_lead = self._align(pcm, tap_lead)
+                    for tap in self.taps:
+                        tap.write(out)
+                self.block_time.record(time.perf_counter() - started)
         except Exception as e:
-            print(f"Error saving audio: {e}")
+            print(f"Error writing audio: {e}")
+            # Keep consuming so stop() never blocks on a full queue
+            while self._queue.get() is not None:
+                pass
+        finally:
+            if writer is not None:
+                writer.close()
+            if self.sink is None:
+                if writer is None:
+                    print("Warning: No audio frames to save!")
+                elif self._segmented():
+                    print(f"Audio saved: {writer.index + 1} segment(s)")
+                else:
+                    print(f"Audio saved: {self.filename} ({os.path.getsize(self.filename)} bytes)")
+            if self.overflows:
+                print(f"Warning: {self.overflows} audio blocks dropped (writer too slow)")
+            for name, counters in self.stream_status.items():
+                if counters.counts["input_overflow"] or counters.counts["input_underflow"]:
+                    print(f"Warning: {name} stream reported {counters.as_dict()}")
+
+    def _segmented(self):
+        return self.sink is None and self.segments is not None and self.segments.enabled
+
+    def _open_file(self):
+        if self._segmented():
+            # Segment boundaries are on the video timeline, which the audio joins at its offset
+            return SegmentedWavWriter(self.segments, self.filename, self.samplerate, self.channels,
+                                      start=self.clock.audio_offset())
+        return StreamingWavWriter(self.filename, self.samplerate, self.channels)
+
+    def _leading_samples(self, aligned=True):
+        """
+        Samples to insert (or drop, if negative) before the first block so the
+        output starts at the video's time zero. Only sinks and taps need this
+        (`aligned`): for WAV files the offset is applied when merging.
+        """
+        if not aligned:
+            return 0
+        return int(round(self.clock.audio_offset() * self.samplerate))
+
+    def _align(self, pcm, lead):
+        """Applies what is left of a leading offset to the next block: (block, remaining lead)."""
+        if lead > 0:
+            pcm = np.concatenate((np.zeros((lead, self.channels), dtype=np.int16), pcm))
+            lead = 0
+        elif lead < 0:
+            cut = min(-lead, len(pcm))
+            pcm = pcm[cut:]
+            lead += cut
+        return pcm, lead
+
+    def _fit_channels(self, block):
+        """Returns a float32 block with exactly self.channels channels."""
+        if block.shape[1] != self.channels:
+            if block.shape[1] == 1:
+                block = np.repeat(block, self.channels, axis=1)
+            else:
+                block = block[:, :self.channels]
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        return np.ascontiguousarray(block)
+
+    def _to_pcm16(self, block):
+        """Converts one processed float block to interleaved int16."""
+        np.clip(block, -1.0, 1.0, out=block)
+        block *= 32767
+        return block.astype(np.int16)
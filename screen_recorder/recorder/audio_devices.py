@@ -0,0 +1,266 @@
+import threading
+
+try:
+    import sounddevice as sd
+except OSError:
+    sd = None
+
+
+class AudioDevice:
+    """
+    One PortAudio device as enumerated by the registry. `key` ("Host API: name")
+    identifies it across runs and hotplugs; `index` is only valid until the
+    next refresh.
+    """
+
+    def __init__(self, index, name, hostapi, max_input_channels, max_output_channels, default_samplerate, key=None):
+        self.index = index
+        self.name = name
+        self.hostapi = hostapi
+        self.max_input_channels = int(max_input_channels)
+        self.max_output_channels = int(max_output_channels)
+        self.default_samplerate = float(default_samplerate)
+        self.key = key or f"{hostapi}: {name}"
+
+    @property
+    def is_input(self):
+        return self.max_input_channels > 0
+
+    @property
+    def is_loopback(self):
+        return "loopback" in self.name.lower() or "stereo mix" in self.name.lower()
+
+    def as_dict(self):
+        return {
+            "index": self.index,
+            "name": self.name,
+            "hostapi": self.hostapi,
+            "key": self.key,
+            "max_input_channels": self.max_input_channels,
+            "max_output_channels": self.max_output_channels,
+            "default_samplerate": self.default_samplerate,
+        }
+
+    def __repr__(self):
+        return f"AudioDevice({self.index}, {self.key!r}, in={self.max_input_channels}, {self.default_samplerate:g} Hz)"
+
+
+class SoundDeviceBackend:
+    """The sounddevice calls the registry needs, so tests can replace them."""
+
+    available = sd is not None
+
+    def query_devices(self):
+        return list(sd.query_devices())
+
+    def query_hostapis(self):
+        return list(sd.query_hostapis())
+
+    def default_input(self):
+        device = sd.default.device
+        index = device[0] if isinstance(device, (list, tuple)) else device
+        return index if index is not None and index >= 0 else None
+
+    def reinitialize(self):
+        # PortAudio only sees plugged/unplugged devices after a re-init
+        sd._terminate()
+        sd._initialize()
+
+
+class DeviceRegistry:
+    """
+    Audio devices enumerated once and indexed by stable key, refreshed in
+    the background.
+
+    Enumerating takes a few ms, re-initializing PortAudio from tens to
+    hundreds of ms (and can make WASAPI/ALSA glitch), so lookups never
+    enumerate: they read the last snapshot. start() enumerates on a thread,
+    then re-reads the device list every `poll_interval` seconds, calling the
+    listeners when it changes. PortAudio only sees plugged/unplugged devices
+    after a re-init, which is done on demand only: refresh(reinitialize=True)
+    when the user asks for it, or request_reinitialize() after a stream
+    failed to open. A re-init needs every stream closed, so recorders hold()
+    the registry while their streams run and requested re-inits wait for the
+    last release().
+    """
+
+    def __init__(self, backend=None, poll_interval=5.0):
+        self.backend = backend or SoundDeviceBackend()
+        self.poll_interval = poll_interval
+        self._devices = ()  # immutable snapshot, replaced on refresh
+        self._default_input = None
+        self._ready = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._holds = 0
+        self._holds_lock = threading.Lock()
+        self._listeners = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._reinit_wanted = False
+        self._thread = None
+        self.refreshes = 0
+        self.reinits = 0
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def add_listener(self, callback):
+        """`callback(registry)` runs on the refreshing thread after each change."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Enumerates in the background and starts watching for hotplug."""
+        if self._thread is not None or not self.backend.available:
+            self._ready.set()
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="audio-devices", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def hold(self):
+        """
+        Called before streams open: no PortAudio re-init until release(). Only
+        waits if a re-init is running right now (never for an enumeration).
+        """
+        with self._holds_lock:
+            self._holds += 1
+
+    def release(self):
+        with self._holds_lock:
+            self._holds = max(0, self._holds - 1)
+            if not self._holds and self._reinit_wanted:
+                self._wake.set()
+
+    def request_reinitialize(self):
+        """
+        Asks the watcher for a PortAudio re-init (e.g. after a device failed
+        to open), done as soon as no stream is open.
+        """
+        self._reinit_wanted = True
+        self._wake.set()
+
+    def refresh(self, reinitialize=False):
+        """
+        Enumerates the devices now (on the calling thread).
+        :param reinitialize: re-init PortAudio first to pick up hotplugged devices; while a
+                             stream is open it is postponed until the last release()
+        :return: True if the device set changed
+        """
+        if not self.backend.available:
+            self._ready.set()
+            return False
+        with self._refresh_lock:
+            if reinitialize:
+                with self._holds_lock:
+                    if self._holds:
+                        self._reinit_wanted = True  # done on the last release()
+                        return False
+                    self.backend.reinitialize()
+                    self._reinit_wanted = False
+                    self.reinits += 1
+            # Streams may open again from here: enumerating does not disturb them
+            try:
+                devices = self._enumerate()
+                default_input = self.backend.default_input()
+            except Exception as e:
+                print(f"Error listing audio devices: {e}")
+                self._ready.set()
+                return False
+            changed = [d.as_dict() for d in devices] != [d.as_dict() for d in self._devices]
+            self._devices = tuple(devices)
+            self._default_input = default_input
+            self.refreshes += 1
+        self._ready.set()
+        if changed:
+            for callback in list(self._listeners):
+                try:
+                    callback(self)
+                except Exception as e:
+                    print(f"Audio device listener failed: {e}")
+        return changed
+
+    def _enumerate(self):
+        hostapis = self.backend.query_hostapis()
+        devices = []
+        seen = {}
+        for index, info in enumerate(self.backend.query_devices()):
+            hostapi_index = info.get("hostapi", 0)
+            hostapi = hostapis[hostapi_index]["name"] if 0 <= hostapi_index < len(hostapis) else str(hostapi_index)
+            key = f"{hostapi}: {info['name']}"
+            # Identical devices (two of the same USB mic) get an ordinal
+            seen[key] = seen.get(key, 0) + 1
+            if seen[key] > 1:
+                key = f"{key} #{seen[key]}"
+            devices.append(AudioDevice(index, info["name"], hostapi, info.get("max_input_channels", 0),
+                                       info.get("max_output_channels", 0), info.get("default_samplerate", 0.0),
+                                       key))
+        return devices
+
+    def _watch(self):
+        if not self.ready:
+            self.refresh()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.refresh(reinitialize=self._reinit_wanted)
+
+    def devices(self, kind=None):
+        """
+        The last enumerated devices, without touching PortAudio.
+        :param kind: "input" or "output" to filter, None for all
+        """
+        devices = self._devices
+        if kind == "input":
+            return [d for d in devices if d.max_input_channels > 0]
+        if kind == "output":
+            return [d for d in devices if d.max_output_channels > 0]
+        return list(devices)
+
+    def default_input(self):
+        """The host's default input device, if known."""
+        return self.get(self._default_input) if self._default_input is not None else None
+
+    def get(self, device):
+        """
+        Resolves a configured device: a stable key, a bare device name (first
+        match) or a PortAudio index from the current snapshot.
+        :return: AudioDevice, or None if no such device is known
+        """
+        if device is None:
+            return None
+        devices = self._devices
+        if isinstance(device, int):
+            return devices[device] if 0 <= device < len(devices) and devices[device].index == device else None
+        for candidate in devices:
+            if candidate.key == device:
+                return candidate
+        for candidate in devices:
+            if candidate.name == device:
+                return candidate
+        return None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide DeviceRegistry (not started: call start() once)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DeviceRegistry()
+        return _registry
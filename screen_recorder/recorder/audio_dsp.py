@@ -0,0 +1,222 @@
+import math
+import threading
+import time
+import numpy as np
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+class Gain:
+    """Constant gain."""
+
+    def __init__(self, gain):
+        self.gain = float(gain)
+
+    def process(self, block):
+        if self.gain != 1.0:
+            np.multiply(block, self.gain, out=block)
+        return block
+
+
+class HighPass:
+    """
+    First-order high-pass (DC/rumble removal).
+
+    The recursion y[n] = a * (y[n-1] + x[n] - x[n-1]) is evaluated in closed
+    form with a cumulative sum, in chunks short enough for a^-n to stay well
+    conditioned, so there is no per-sample Python loop.
+    """
+
+    CHUNK = 512
+
+    def __init__(self, cutoff_hz, samplerate, channels):
+        self.a = 1.0 / (1.0 + 2.0 * math.pi * cutoff_hz / samplerate)
+        n = np.arange(self.CHUNK, dtype=np.float64)
+        self._pow = (self.a ** (n + 1))[:, None]
+        self._inv = (self.a ** -n)[:, None]
+        self._x_prev = np.zeros(channels)
+        self._y_prev = np.zeros(channels)
+        self._diff = np.empty((self.CHUNK, channels))
+
+    def process(self, block):
+        for start in range(0, len(block), self.CHUNK):
+            x = block[start:start + self.CHUNK]
+            m = len(x)
+            d = self._diff[:m]
+            d[0] = x[0] - self._x_prev
+            np.subtract(x[1:], x[:-1], out=d[1:])
+            self._x_prev = x[-1].astype(np.float64)
+            d *= self._inv[:m]
+            np.cumsum(d, axis=0, out=d)
+            d += self._y_prev
+            d *= self._pow[:m]
+            self._y_prev = d[-1].copy()
+            x[:] = d
+        return block
+
+
+class NoiseGate:
+    """
+    Block-level noise gate: closes when the block RMS drops below the
+    threshold, with exponential attack/release ramps applied across each block.
+    """
+
+    def __init__(self, threshold_db, samplerate, attack_ms=5.0, release_ms=150.0, floor_db=-60.0):
+        self.threshold = db_to_gain(threshold_db)
+        self.floor = db_to_gain(floor_db)
+        self.samplerate = samplerate
+        self.attack = attack_ms / 1000.0
+        self.release = release_ms / 1000.0
+        self._gain = 1.0
+        self._steps = np.empty(0, dtype=np.float32)
+        self._ramp = np.empty(0, dtype=np.float32)
+
+    def process(self, block):
+        m = len(block)
+        rms = math.sqrt(float(np.vdot(block, block)) / block.size) if m else 0.0
+        target = 1.0 if rms >= self.threshold else self.floor
+        tau = self.attack if target > self._gain else self.release
+        new_gain = target + (self._gain - target) * math.exp(-m / (self.samplerate * tau))
+        if new_gain == 1.0 and self._gain == 1.0:
+            return block
+        if len(self._steps) != m:
+            self._steps = np.arange(1, m + 1, dtype=np.float32) / m
+            self._ramp = np.empty(m, dtype=np.float32)
+        ramp = np.multiply(self._steps, new_gain - self._gain, out=self._ramp)
+        ramp += self._gain
+        block *= ramp[:, None]
+        self._gain = new_gain
+        return block
+
+
+def _sliding_min(values, window, out):
+    """Minimum over values[i:i + window] for each i, van Herk/Gil-Werman style in O(n)."""
+    n = len(values) - window + 1
+    padded_len = -(-len(values) // window) * window
+    padded = np.full(padded_len, np.inf)
+    padded[:len(values)] = values
+    blocks = padded.reshape(-1, window)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    np.minimum(suffix[:n], prefix[window - 1:window - 1 + n], out=out)
+    return out
+
+
+class LookaheadLimiter:
+    """
+    Peak limiter with look-ahead: the output is delayed by `lookahead_ms` so
+    the gain can come down before a peak arrives. Gain reduction is the
+    sliding minimum of the required gain over the look-ahead window, and it
+    recovers linearly at `release_ms` per unit of gain.
+    """
+
+    def __init__(self, threshold_db, samplerate, channels, lookahead_ms=5.0, release_ms=80.0):
+        self.threshold = db_to_gain(threshold_db)
+        self.lookahead = max(1, int(samplerate * lookahead_ms / 1000.0))
+        self.release_rate = 1.0 / max(1.0, samplerate * release_ms / 1000.0)
+        self.channels = channels
+        self.latency = self.lookahead / samplerate
+        self._gain = 1.0
+        self._capacity = 0
+        self._buffer = np.zeros((self.lookahead, channels), dtype=np.float32)
+        self._ensure(4096)
+
+    def _ensure(self, m):
+        if m <= self._capacity:
+            return
+        self._capacity = m
+        size = self.lookahead + m
+        delayed = self._buffer[:self.lookahead].copy()
+        self._buffer = np.zeros((size, self.channels), dtype=np.float32)
+        self._buffer[:self.lookahead] = delayed
+        self._peak = np.empty(size)
+        self._window_gain = np.empty(m)
+        self._index = np.arange(m, dtype=np.float64) * self.release_rate
+
+    def process(self, block):
+        m = len(block)
+        if m == 0:
+            return block
+        self._ensure(m)
+        L = self.lookahead
+        ext = self._buffer[:L + m]
+        ext[L:] = block
+
+        peak = np.max(np.abs(ext), axis=1, out=self._peak[:L + m])
+        np.maximum(peak, self.threshold, out=peak)
+        required = np.divide(self.threshold, peak, out=peak)  # <= 1.0
+        gain = _sliding_min(required, L + 1, self._window_gain[:m])
+
+        # Limit how fast the gain may rise: g[i] = min_j<=i (g[j] + rate * (i - j))
+        index = self._index[:m]
+        gain -= index
+        gain[0] = min(gain[0], self._gain + self.release_rate)
+        np.minimum.accumulate(gain, out=gain)
+        gain += index
+        np.minimum(gain, 1.0, out=gain)
+        self._gain = float(gain[-1])
+
+        np.multiply(ext[:m], gain[:, None], out=block)
+        # Keep the last `lookahead` input samples for the next block
+        ext[:L] = ext[m:]
+        return block
+
+
+class DSPChain:
+    """
+    Runs a list of stages over each audio block in place (float32, frames x channels)
+    and tracks processing cost against the block's real-time duration.
+    """
+
+    def __init__(self, stages, samplerate):
+        self.stages = [stage for stage in stages if stage is not None]
+        self.samplerate = samplerate
+        self.blocks = 0
+        self.samples = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def latency(self):
+        return sum(getattr(stage, "latency", 0.0) for stage in self.stages)
+
+    def process(self, block):
+        started = time.perf_counter()
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        for stage in self.stages:
+            block = stage.process(block)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.blocks += 1
+            self.samples += len(block)
+            self.total_time += elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+        return block
+
+    def as_dict(self):
+        with self._lock:
+            audio_time = self.samples / self.samplerate if self.samplerate else 0.0
+            return {
+                "blocks": self.blocks,
+                "avg_ms": round(self.total_time / self.blocks * 1000, 3) if self.blocks else 0.0,
+                "max_ms": round(self.max_time * 1000, 3),
+                # Fraction of real time spent processing; must stay far below 1.0
+                "realtime_ratio": round(self.total_time / audio_time, 5) if audio_time else 0.0,
+            }
+
+
+def build_chain(samplerate, channels, gain_db=0.0, volume=100, highpass_hz=None,
+                gate_db=None, limiter_db=-1.0):
+    """Builds the standard chain: gain -> high-pass -> noise gate -> look-ahead limiter."""
+    gain = db_to_gain(gain_db) * max(0.0, float(volume)) / 100.0
+    return DSPChain([
+        Gain(gain),
+        HighPass(highpass_hz, samplerate, channels) if highpass_hz else None,
+        NoiseGate(gate_db, samplerate) if gate_db is not None else None,
+        LookaheadLimiter(limiter_db, samplerate, channels) if limiter_db is not None else None,
+    ], samplerate)
@@ -0,0 +1,258 @@
+import math
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of float32 audio frames shared between a PortAudio
+    callback (writer) and the mixer thread (reader). When full, the oldest
+    frames are overwritten.
+    """
+
+    def __init__(self, capacity, channels):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self._data = np.zeros((self.capacity, channels), dtype=np.float32)
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self.overflows = 0  # frames overwritten before they were read
+
+    @property
+    def available(self):
+        return self._count
+
+    def write(self, block):
+        """
+        Copies a block in, fitting it to the buffer's channel count
+        (mono is broadcast, extra channels are dropped).
+        """
+        if block.shape[1] > self.channels:
+            block = block[:, :self.channels]
+        n = len(block)
+        with self._lock:
+            if n > self.capacity:
+                self.overflows += n - self.capacity
+                block = block[-self.capacity:]
+                n = self.capacity
+            excess = self._count + n - self.capacity
+            if excess > 0:
+                self._start = (self._start + excess) % self.capacity
+                self._count -= excess
+                self.overflows += excess
+            end = (self._start + self._count) % self.capacity
+            first = min(n, self.capacity - end)
+            self._data[end:end + first] = block[:first]
+            if first < n:
+                self._data[:n - first] = block[first:]
+            self._count += n
+
+    def peek(self, n, out):
+        """Copies the oldest n frames into out without consuming them. Returns False if fewer are buffered."""
+        with self._lock:
+            if n > self._count:
+                return False
+            first = min(n, self.capacity - self._start)
+            out[:first] = self._data[self._start:self._start + first]
+            if first < n:
+                out[first:n] = self._data[:n - first]
+            return True
+
+    def consume(self, n):
+        with self._lock:
+            n = min(n, self._count)
+            self._start = (self._start + n) % self.capacity
+            self._count -= n
+
+    def read(self, n, out):
+        if not self.peek(n, out):
+            return False
+        self.consume(n)
+        return True
+
+
+class MixerInput:
+    """
+    One device feeding the mixer.
+
+    Inputs other than the master are read through a linear-interpolating
+    resampler whose ratio follows the ring's fill level: a device whose clock
+    runs fast fills its ring, so it is read slightly faster, and vice versa.
+    The fill level is smoothed over about a second, so the ratio tracks the
+    real clock drift (typically tens of ppm) rather than callback jitter.
+    """
+
+    def __init__(self, name, samplerate, channels, block_size, chain=None,
+                 buffer_seconds=2.0, target_latency=0.1):
+        self.name = name
+        self.samplerate = samplerate
+        self.chain = chain
+        self.ring = RingBuffer(int(samplerate * buffer_seconds), channels)
+        self.target = max(block_size * 2, int(samplerate * target_latency))
+        self.ratio = 1.0
+        self.primed = False
+        self.underruns = 0
+        self.resyncs = 0
+        self._fill = float(self.target)
+        self._phase = 0.0
+        self._prev = np.zeros(channels, dtype=np.float32)
+        self._steps = np.arange(block_size + 1, dtype=np.float64)
+        # Worst case input span for one block at the maximum ratio, plus the carried sample
+        span = int(math.ceil(block_size * (1.0 + AudioMixer.MAX_CORRECTION))) + 3
+        self._buffer = np.empty((span, channels), dtype=np.float32)
+        self._out = np.empty((block_size, channels), dtype=np.float32)
+
+    def push(self, block):
+        """Called from the PortAudio callback."""
+        self.ring.write(block)
+
+    def read_master(self, n):
+        """The master input is read 1:1; returns None until n frames are buffered."""
+        if not self.ring.read(n, self._out[:n]):
+            return None
+        return self._process(self._out[:n])
+
+    def read_resampled(self, n):
+        """
+        Returns n frames from this input at the master's rate, or None
+        (the input is left out of the mix) while the ring is (re)filling.
+        """
+        fill = self.ring.available
+        if not self.primed:
+            if fill < self.target:
+                return None
+            self.primed = True
+            self._fill = float(fill)
+        if fill > self.target * 4:
+            # Far behind (e.g. after a stall): skip ahead instead of slowly catching up
+            self.ring.consume(fill - self.target)
+            fill = self.target
+            self._fill = float(fill)
+            self.resyncs += 1
+
+        self._update_ratio(fill, n)
+        t = self._steps[:n + 1] * self.ratio
+        t += self._phase
+        consumed = int(t[n])
+        span = max(consumed, int(t[n - 1]) + 1)
+        buf = self._buffer
+        buf[0] = self._prev
+        if not self.ring.peek(span, buf[1:span + 1]):
+            self.underruns += 1
+            self.primed = False
+            return None
+        self.ring.consume(consumed)
+        self._prev = buf[consumed].copy()
+        self._phase = t[n] - consumed
+
+        # Linear interpolation between buf[i] and buf[i + 1]
+        positions = t[:n]
+        index = positions.astype(np.intp)
+        frac = (positions - index).astype(np.float32)[:, None]
+        out = self._out[:n]
+        np.subtract(buf[index + 1], buf[index], out=out)
+        out *= frac
+        out += buf[index]
+        return self._process(out)
+
+    def _update_ratio(self, fill, n):
+        # One-pole smoothing with a ~1 s time constant, then proportional control:
+        # 100 ppm of drift settles at ~1 ms above the target latency
+        alpha = min(1.0, n / float(self.samplerate))
+        self._fill += (fill - self._fill) * alpha
+        error = (self._fill - self.target) / self.samplerate
+        correction = error * AudioMixer.DRIFT_GAIN
+        correction = max(-AudioMixer.MAX_CORRECTION, min(AudioMixer.MAX_CORRECTION, correction))
+        self.ratio = 1.0 + correction
+
+    def _process(self, block):
+        if self.chain is not None:
+            block = self.chain.process(block)
+        return block
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "drift_ppm": round((self.ratio - 1.0) * 1e6, 1),
+            "buffered_ms": round(self.ring.available / self.samplerate * 1000, 1),
+            "underruns": self.underruns,
+            "overflow_frames": self.ring.overflows,
+            "resyncs": self.resyncs,
+        }
+
+
+class AudioMixer:
+    """
+    Mixes several input devices block by block.
+
+    The first input is the master clock: a block is emitted whenever it has
+    `block_size` new frames. The other inputs are resampled to the master's
+    clock and summed in. Memory is bounded by the ring sizes, independent of
+    the recording length.
+    """
+
+    # Proportional gain of the drift controller (ratio change per second of buffer error)
+    DRIFT_GAIN = 0.1
+    # Clamp on the resampling correction (0.5%)
+    MAX_CORRECTION = 0.005
+
+    def __init__(self, samplerate, channels, block_size=1024):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.block_size = block_size
+        self.inputs = []
+        self.blocks = 0
+        self._ready = threading.Event()
+        self._mix = np.empty((block_size, channels), dtype=np.float32)
+
+    def add_input(self, name, chain=None):
+        source = MixerInput(name, self.samplerate, self.channels, self.block_size, chain)
+        self.inputs.append(source)
+        return source
+
+    def remove_input(self, source):
+        self.inputs.remove(source)
+
+    def callback_for(self, source, enabled=lambda: True, on_master_block=None):
+        """
+        PortAudio callback that feeds `source`; the master also wakes the mixer.
+        :param on_master_block: Optional callable(frames, time) run for each master block
+        """
+        def callback(indata, frames, time, status):
+            if enabled():
+                is_master = bool(self.inputs) and source is self.inputs[0]
+                if is_master and on_master_block is not None:
+                    on_master_block(frames, time)
+                source.push(indata)
+                if is_master:
+                    self._ready.set()
+        return callback
+
+    def wait(self, timeout=0.1):
+        self._ready.wait(timeout)
+        self._ready.clear()
+
+    def mix(self):
+        """Returns the next mixed block (a new array), or None if the master has no full block yet."""
+        if not self.inputs:
+            return None
+        master = self.inputs[0]
+        n = self.block_size
+        block = master.read_master(n)
+        if block is None:
+            return None
+        mixed = self._mix
+        mixed[:] = block
+        for source in self.inputs[1:]:
+            other = source.read_resampled(n)
+            if other is not None:
+                mixed += other
+        self.blocks += 1
+        return mixed.copy()
+
+    def as_dict(self):
+        return {
+            "blocks": self.blocks,
+            "inputs": [source.as_dict() for source in self.inputs],
+        }
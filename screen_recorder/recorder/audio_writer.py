@@ -0,0 +1,71 @@
+import struct
+
+# RIFF sizes are 32-bit; beyond this the file is rewritten as RF64 on close
+RIFF_LIMIT = 0xFFFFFFFF
+
+# Value stored in the 32-bit size fields of an RF64 file
+RF64_PLACEHOLDER = 0xFFFFFFFF
+
+# Space reserved after "WAVE" for an RF64 ds64 chunk (riff size, data size, sample count, table length)
+DS64_SIZE = 28
+
+
+class StreamingWavWriter:
+    """
+    Writes 16-bit PCM to a WAV file block by block.
+
+    The header is written up front with placeholder sizes and patched in
+    close(). A JUNK chunk reserves room for a ds64 chunk, so recordings
+    over 4 GB are turned into RF64 in place without moving the audio data.
+    """
+
+    def __init__(self, filename, samplerate=44100, channels=2, sampwidth=2):
+        self.filename = filename
+        self.samplerate = samplerate
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.data_bytes = 0
+        self._file = open(filename, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        block_align = self.channels * self.sampwidth
+        f = self._file
+        f.write(b"RIFF" + struct.pack("<I", 0) + b"WAVE")
+        f.write(b"JUNK" + struct.pack("<I", DS64_SIZE) + b"\0" * DS64_SIZE)
+        f.write(b"fmt " + struct.pack("<IHHIIHH", 16, 1, self.channels, self.samplerate,
+                                      self.samplerate * block_align, block_align, self.sampwidth * 8))
+        f.write(b"data" + struct.pack("<I", 0))
+        self._data_offset = f.tell()
+
+    def write(self, pcm):
+        """Appends one block of interleaved int16 samples."""
+        self._file.write(pcm)
+        self.data_bytes += pcm.nbytes
+
+    def close(self):
+        if self._file is None:
+            return
+        f = self._file
+        riff_size = self._data_offset - 8 + self.data_bytes
+        if riff_size <= RIFF_LIMIT:
+            f.seek(4)
+            f.write(struct.pack("<I", riff_size))
+            f.seek(self._data_offset - 4)
+            f.write(struct.pack("<I", self.data_bytes))
+        else:
+            # RF64: 32-bit sizes become 0xFFFFFFFF and the real values live in ds64
+            samples = self.data_bytes // (self.channels * self.sampwidth)
+            f.seek(0)
+            f.write(b"RF64" + struct.pack("<I", RF64_PLACEHOLDER) + b"WAVE")
+            f.write(b"ds64" + struct.pack("<IQQQI", DS64_SIZE, riff_size, self.data_bytes, samples, 0))
+            f.seek(self._data_offset - 4)
+            f.write(struct.pack("<I", RF64_PLACEHOLDER))
+        f.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,324 @@
+import ctypes
+import os
+import platform
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import cv2
+
+# How long a click stays highlighted after the button is released, so clicks
+# shorter than a frame interval still show up at low fps
+CLICK_HOLD = 0.25
+
+# Arrow cursor outline at scale 1, hotspot at (0, 0)
+ARROW = [(0, 0), (0, 17), (4, 13), (7, 20), (10, 19), (7, 12), (12, 12)]
+CLICK_RADIUS = 12
+CLICK_COLOR = (0, 215, 255)  # BGR
+CLICK_OPACITY = 0.55
+
+
+class CursorSample(namedtuple("CursorSample", "x y buttons pressed_at sampled_at")):
+    """
+    One cursor reading in desktop coordinates. `buttons` is a bitmask
+    (1 left, 2 right) or 0 when button state is not available;
+    `pressed_at` is the perf_counter() of the last reading with a button down.
+    """
+    __slots__ = ()
+
+    def clicking(self, now, hold=CLICK_HOLD):
+        return bool(self.buttons) or (self.pressed_at is not None and now - self.pressed_at <= hold)
+
+
+def _pyautogui_position():
+    import pyautogui
+    return pyautogui.position()
+
+
+def _windows_position():
+    user32 = ctypes.windll.user32
+
+    class POINT(ctypes.Structure):
+        _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
+
+    point = POINT()
+
+    def position():
+        user32.GetCursorPos(ctypes.byref(point))
+        return point.x, point.y
+    return position
+
+
+def _xlib_position():
+    from Xlib import display
+    root = display.Display().screen().root
+
+    def position():
+        pointer = root.query_pointer()
+        return pointer.root_x, pointer.root_y
+    return position
+
+
+_position_readers = {}
+_position_lock = threading.Lock()
+
+
+def position_reader(gui=True):
+    """
+    Cursor position reader for this platform, probed on first use: GetCursorPos
+    on Windows, python-xlib on X11, else pyautogui. pyautogui imports tkinter,
+    so headless callers pass `gui=False` to leave it out.
+    :return: callable returning (x, y), or None if the cursor cannot be read
+    """
+    with _position_lock:
+        if gui not in _position_readers:
+            _position_readers[gui] = _probe_position(gui)
+        return _position_readers[gui]
+
+
+def _probe_position(gui):
+    system = platform.system()
+    candidates = []
+    if system == "Windows":
+        candidates.append(_windows_position)
+    elif system == "Linux":
+        if "DISPLAY" not in os.environ:
+            return None
+        candidates.append(_xlib_position)
+    if gui:
+        candidates.append(lambda: _pyautogui_position)
+    for probe in candidates:
+        try:
+            reader = probe()
+            reader()
+            return reader
+        except Exception:
+            continue
+    return None
+
+
+def _button_reader():
+    """Mouse button state reader for this platform, or None where it is not available."""
+    if platform.system() != "Windows":
+        return None
+    try:
+        user32 = ctypes.windll.user32
+    except (AttributeError, OSError):
+        return None
+
+    def buttons():
+        # High bit of GetAsyncKeyState: the key is down now (VK_LBUTTON 1, VK_RBUTTON 2)
+        return (1 if user32.GetAsyncKeyState(0x01) & 0x8000 else 0) | \
+               (2 if user32.GetAsyncKeyState(0x02) & 0x8000 else 0)
+    return buttons
+
+
+class CursorSampler:
+    """
+    Polls the cursor position and button state on its own thread, so the
+    capture loop never waits for the OS. The latest reading is published as
+    an immutable CursorSample in a single attribute: readers just load it,
+    no lock is taken on either side.
+
+    start() and stop() nest, so one sampler can serve several recorders.
+    :param rate: readings per second
+    :param position: callable returning (x, y); position_reader() by default
+    :param buttons: callable returning the button bitmask; the platform reader by default
+    """
+
+    def __init__(self, rate=120.0, position=None, buttons=None):
+        self.rate = float(rate)
+        self.interval = 1.0 / self.rate
+        self._position = position or position_reader() or _pyautogui_position
+        self._buttons = buttons if buttons is not None else _button_reader()
+        self._latest = None
+        self._pressed_at = None
+        self.samples = 0
+        self.errors = 0
+        self._users = 0
+        self._lock = threading.Lock()  # start/stop only
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            self._users += 1
+            if self._users > 1:
+                return
+            self._stop.clear()
+            self.sample()  # a reading is available before the first frame
+            self._thread = threading.Thread(target=self._run, name="cursor-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users:
+                return
+            self._stop.set()
+            if self._thread:
+                self._thread.join()
+                self._thread = None
+
+    def latest(self):
+        """Most recent CursorSample, or None if the cursor could not be read yet."""
+        return self._latest
+
+    def sample(self):
+        try:
+            x, y = self._position()
+            buttons = self._buttons() if self._buttons else 0
+        except Exception:
+            self.errors += 1
+            return
+        now = time.perf_counter()
+        if buttons:
+            self._pressed_at = now
+        self._latest = CursorSample(int(x), int(y), buttons, self._pressed_at, now)
+        self.samples += 1
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while True:
+            deadline += self.interval
+            delay = deadline - time.perf_counter()
+            if delay < 0:
+                deadline = time.perf_counter()  # fell behind: do not try to catch up
+                delay = 0
+            if self._stop.wait(delay):
+                break
+            self.sample()
+
+    def as_dict(self):
+        return {"rate": self.rate, "samples": self.samples, "errors": self.errors,
+                "buttons": self._buttons is not None}
+
+
+class Sprite:
+    """
+    A small BGR image with an alpha mask, premultiplied once so compositing
+    is one multiply-add per pixel over the covered region only.
+    """
+
+    def __init__(self, bgr, alpha, hotspot):
+        alpha = alpha.astype(np.uint16)[..., None]
+        self.inverse = 255 - alpha
+        self.premultiplied = bgr.astype(np.uint16) * alpha
+        self.hotspot = hotspot
+        self.height, self.width = bgr.shape[:2]
+
+    def draw(self, frame, x, y):
+        """Composites the sprite with its hotspot at (x, y); BGR or BGRA frames, clipped to the frame."""
+        left = x - self.hotspot[0]
+        top = y - self.hotspot[1]
+        fx0, fy0 = max(left, 0), max(top, 0)
+        fx1 = min(left + self.width, frame.shape[1])
+        fy1 = min(top + self.height, frame.shape[0])
+        if fx0 >= fx1 or fy0 >= fy1:
+            return
+        sx0, sy0 = fx0 - left, fy0 - top
+        sx1, sy1 = sx0 + fx1 - fx0, sy0 + fy1 - fy0
+        roi = frame[fy0:fy1, fx0:fx1, :3]
+        # roi * (255 - a) + color * a stays below 2**16
+        blended = roi * self.inverse[sy0:sy1, sx0:sx1]
+        blended += self.premultiplied[sy0:sy1, sx0:sx1]
+        blended += 127
+        blended //= 255
+        roi[...] = blended
+
+
+def _render(size, draw, supersample=4):
+    """Draws a shape at `supersample` x resolution and area-downscales it, for antialiased edges."""
+    width, height = size
+    big = (height * supersample, width * supersample)
+    bgr = np.zeros(big + (3,), dtype=np.uint8)
+    alpha = np.zeros(big, dtype=np.uint8)
+    draw(bgr, alpha, supersample)
+    bgr = cv2.resize(bgr, (width, height), interpolation=cv2.INTER_AREA)
+    alpha = cv2.resize(alpha, (width, height), interpolation=cv2.INTER_AREA)
+    return bgr, alpha
+
+
+def arrow_sprite(scale=1.0):
+    """White arrow cursor with a black outline."""
+    outline = max(1.0, scale)
+    pad = int(np.ceil(outline)) + 1
+
+    def draw(bgr, alpha, ss):
+        points = np.array([(pad + px * scale, pad + py * scale) for px, py in ARROW]) * ss
+        points = np.round(points).astype(np.int32)
+        thickness = max(1, int(round(outline * ss)))
+        cv2.fillPoly(alpha, [points], 255)
+        cv2.polylines(alpha, [points], True, 255, thickness * 2, cv2.LINE_AA)
+        cv2.fillPoly(bgr, [points], (255, 255, 255))
+        cv2.polylines(bgr, [points], True, (0, 0, 0), thickness * 2, cv2.LINE_AA)
+
+    width = int(np.ceil(max(px for px, _ in ARROW) * scale)) + 2 * pad
+    height = int(np.ceil(max(py for _, py in ARROW) * scale)) + 2 * pad
+    bgr, alpha = _render((width, height), draw)
+    return Sprite(bgr, alpha, (pad, pad))
+
+
+def click_sprite(scale=1.0):
+    """Translucent filled ring shown around the cursor while clicking."""
+    radius = max(3, int(round(CLICK_RADIUS * scale)))
+    size = 2 * radius + 3
+
+    def draw(bgr, alpha, ss):
+        center = ((size // 2) * ss + ss // 2, (size // 2) * ss + ss // 2)
+        cv2.circle(bgr, center, radius * ss, CLICK_COLOR, -1, cv2.LINE_AA)
+        cv2.circle(alpha, center, radius * ss, int(255 * CLICK_OPACITY), -1, cv2.LINE_AA)
+
+    bgr, alpha = _render((size, size), draw)
+    return Sprite(bgr, alpha, (size // 2, size // 2))
+
+
+class CursorOverlay:
+    """
+    Draws CursorSamples onto frames of one monitor. Sprites are rendered once
+    per output scale, so a frame costs two small alpha blends at most.
+    :param monitor: the captured rectangle in desktop coordinates
+    :param highlight_clicks: draw a ring under the cursor while a button is down
+    """
+
+    def __init__(self, monitor, highlight_clicks=True):
+        self.monitor = monitor
+        self.highlight_clicks = highlight_clicks
+        self._sprites = {}
+
+    def _sprites_for(self, frame_width):
+        scale = round(frame_width / self.monitor["width"], 2)
+        sprites = self._sprites.get(scale)
+        if sprites is None:
+            # Built at most once per worker per size; dict assignment is atomic
+            sprites = (arrow_sprite(scale), click_sprite(scale))
+            self._sprites[scale] = sprites
+        return sprites
+
+    def position(self, sample, frame):
+        """The sample's position on `frame`, which may be scaled from the monitor."""
+        x = int((sample.x - self.monitor["left"]) * frame.shape[1] / self.monitor["width"])
+        y = int((sample.y - self.monitor["top"]) * frame.shape[0] / self.monitor["height"])
+        return x, y
+
+    def state(self, sample, now):
+        """What the overlay would draw: frames with the same state look the same."""
+        if sample is None:
+            return None
+        return sample.x, sample.y, self.highlight_clicks and sample.clicking(now)
+
+    def draw(self, frame, sample, now):
+        """
+        :param now: perf_counter() time of the frame, for the click highlight
+        """
+        if sample is None:
+            return
+        x, y = self.position(sample, frame)
+        if not (0 <= x < frame.shape[1] and 0 <= y < frame.shape[0]):
+            return
+        arrow, click = self._sprites_for(frame.shape[1])
+        if self.highlight_clicks and sample.clicking(now):
+            click.draw(frame, x, y)
+        arrow.draw(frame, x, y)
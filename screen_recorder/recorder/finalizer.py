@@ -0,0 +1,89 @@
+import os
+import queue
+import threading
+import time
+
+
+class FinalizeJob:
+    """One session waiting to be turned into its output file."""
+
+    def __init__(self, output_path, run, cleanup=None):
+        """
+        :param output_path: File the job produces
+        :param run: callable(progress) -> bool doing the work; `progress` accepts FFmpegProgress dicts
+        :param cleanup: Optional callable(success) run after the job, e.g. to remove temp files
+        """
+        self.output_path = output_path
+        self.name = os.path.basename(output_path)
+        self.run = run
+        self.cleanup = cleanup
+        self.success = None
+        self.elapsed = None
+
+
+class FinalizeQueue:
+    """
+    Finalizes recordings one at a time on a background thread, so the UI
+    stays responsive and the next recording can start while earlier ones are
+    still being merged or encoded.
+
+    Callbacks run on the worker thread; UI code must hop back to the Tk
+    thread itself (e.g. with after()).
+    :param on_progress: callable(job, progress_dict, queued) for each ffmpeg progress update
+    :param on_done: callable(job) when a job finishes
+    """
+
+    def __init__(self, on_progress=None, on_done=None):
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self._jobs = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    @property
+    def pending(self):
+        """Jobs queued or running."""
+        with self._lock:
+            return self._pending
+
+    def submit(self, job):
+        with self._lock:
+            self._pending += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name="finalizer", daemon=True)
+                self._worker.start()
+        self._jobs.put(job)
+        return job
+
+    def wait(self):
+        """Blocks until every submitted job has finished."""
+        self._jobs.join()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            started = time.perf_counter()
+            try:
+                job.success = bool(job.run(lambda update: self._progress(job, update)))
+            except Exception as e:
+                print(f"Finalization of {job.name} failed: {e}")
+                import traceback
+                traceback.print_exc()
+                job.success = False
+            job.elapsed = time.perf_counter() - started
+            print(f"Finalized {job.name} in {job.elapsed:.1f}s (success: {job.success})")
+            try:
+                if job.cleanup:
+                    job.cleanup(job.success)
+            except Exception as e:
+                print(f"Cleanup after {job.name} failed: {e}")
+            with self._lock:
+                self._pending -= 1
+            if self.on_done:
+                self.on_done(job)
+            self._jobs.task_done()
+
+    def _progress(self, job, update):
+        if self.on_progress:
+            self.on_progress(job, update, self.pending - 1)
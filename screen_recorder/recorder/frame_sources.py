@@ -0,0 +1,211 @@
+import numpy as np
+import cv2
+import mss
+
+
+def list_monitors():
+    """
+    Monitors as reported by mss: index 0 is the virtual desktop spanning all
+    displays, 1..N are the individual displays.
+    :return: list of {"left", "top", "width", "height"} dicts
+    """
+    with mss.mss() as sct:
+        return [{key: monitor[key] for key in ("left", "top", "width", "height")} for monitor in sct.monitors]
+
+
+class FrameSource:
+    """
+    Where VideoRecorder gets its frames from.
+
+    `monitor` is the captured rectangle in desktop coordinates
+    ({"left", "top", "width", "height"}), known before capture starts; it
+    sizes the output and places the cursor. open(), grab() and close() are
+    called on the grab thread only.
+
+    grab() returns an HxWx4 BGRA uint8 array. The pipeline never writes into
+    it, but keeps it until the frame is converted, so a source must not
+    modify a buffer it has returned. It returns None once the source is
+    exhausted, which ends the recording.
+    """
+    monitor = None
+
+    def open(self):
+        pass
+
+    def grab(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MssSource(FrameSource):
+    """
+    Screen capture with mss.
+    :param monitor: mss monitor index: 1..N for one display, 0 for the virtual desktop
+    :param region: (left, top, width, height) to record instead of a whole monitor
+    """
+
+    def __init__(self, monitor=1, region=None):
+        self.monitor_index = int(monitor)
+        self.sct = None  # created in the grab thread; mss handles are not thread-safe
+
+        # Get monitor info for dimensions (temporary mss instance)
+        with mss.mss() as temp_sct:
+            if region:
+                self.monitor = {
+                    "top": int(region[1]),
+                    "left": int(region[0]),
+                    "width": int(region[2]),
+                    "height": int(region[3])
+                }
+            else:
+                monitors = temp_sct.monitors
+                if not 0 <= self.monitor_index < len(monitors):
+                    fallback = min(1, len(monitors) - 1)
+                    print(f"Monitor {self.monitor_index} not found ({len(monitors) - 1} available), "
+                          f"recording monitor {fallback}")
+                    self.monitor_index = fallback
+                monitor = monitors[self.monitor_index]
+                self.monitor = {
+                    "top": monitor["top"],
+                    "left": monitor["left"],
+                    "width": monitor["width"],
+                    "height": monitor["height"]
+                }
+
+    def open(self):
+        self.sct = mss.mss()
+
+    def grab(self):
+        img = self.sct.grab(self.monitor)
+        # Wraps the mss BGRA buffer as an HxWx4 array without copying it
+        raw = getattr(img, "raw", None)
+        if raw is None:
+            return np.asarray(img)
+        return np.frombuffer(raw, dtype=np.uint8).reshape(img.height, img.width, 4)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class SyntheticSource(FrameSource):
+    """
+    Desktop-like test content at a fixed size, for headless benchmarks and soak tests.
+      static - the same frame every time
+      typing - one character added every third frame on a text-filled page
+      video  - a quarter-screen player whose content changes every frame
+    Every grab returns a new buffer, like mss, so the copy counts as grab time.
+    """
+    PATTERNS = ("static", "typing", "video")
+
+    def __init__(self, width=1920, height=1080, pattern="typing"):
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"Unknown pattern: {pattern}")
+        self.pattern = pattern
+        self.monitor = {"top": 0, "left": 0, "width": int(width), "height": int(height)}
+        self.grabs = 0
+
+        self._base = np.full((height, width, 4), 245, dtype=np.uint8)
+        line = "def capture(frame): return encoder.write(frame)  # 0123456789 " * 4
+        for y in range(22, height, 22):
+            cv2.putText(self._base, line, (12, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (40, 40, 40, 255), 1)
+        self._cursor = (12, 22)
+
+        # Video region: a few prerendered frames, cycled
+        self._video_rect = (width // 8, height // 8, width // 2, height // 2)
+        _, _, vw, vh = self._video_rect
+        ramp = np.linspace(0, 255, vw, dtype=np.float32)
+        self._video_frames = []
+        for i in range(8):
+            frame = np.empty((vh, vw, 4), dtype=np.uint8)
+            frame[..., 0] = (ramp + i * 32) % 256
+            frame[..., 1] = np.linspace(0, 255, vh, dtype=np.uint8)[:, None]
+            frame[..., 2] = 255 - frame[..., 0]
+            frame[..., 3] = 255
+            self._video_frames.append(frame)
+
+    def grab(self):
+        self.grabs += 1
+        if self.pattern == "typing" and self.grabs % 3 == 0:
+            x, y = self._cursor
+            cv2.putText(self._base, "x", (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 30, 30, 255), 1)
+            x += 9
+            if x > self.monitor["width"] - 20:
+                x = 12
+                y = y + 22 if y + 22 < self.monitor["height"] else 22
+            self._cursor = (x, y)
+        data = self._base.copy()
+        if self.pattern == "video":
+            left, top, vw, vh = self._video_rect
+            data[top:top + vh, left:left + vw] = self._video_frames[self.grabs % len(self._video_frames)]
+        return data
+
+
+class VideoFileSource(FrameSource):
+    """
+    Replays an existing video file, one decoded frame per grab (the recorder's
+    fps paces it, not the file's).
+    :param loop: start over at the end instead of ending the recording
+    """
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self._capture = None
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise IOError(f"Could not open video file {path}")
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        capture.release()
+        self.monitor = {"top": 0, "left": 0, "width": width, "height": height}
+
+    def open(self):
+        self._capture = cv2.VideoCapture(self.path)
+
+    def grab(self):
+        ok, frame = self._capture.read()
+        if not ok and self.loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._capture.read()
+        if not ok:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+class BufferSource(FrameSource):
+    """
+    Plays frames held in memory (BGR or BGRA arrays, all the same size).
+    The arrays are returned as they are, so they must not be modified while recording.
+    :param loop: cycle through the frames instead of ending after the last one
+    """
+
+    def __init__(self, frames, loop=True):
+        if not len(frames):
+            raise ValueError("BufferSource needs at least one frame")
+        self.frames = [frame if frame.shape[2] == 4 else cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+                       for frame in frames]
+        self.loop = loop
+        height, width = self.frames[0].shape[:2]
+        self.monitor = {"top": 0, "left": 0, "width": width, "height": height}
+        self.index = 0
+
+    def open(self):
+        self.index = 0
+
+    def grab(self):
+        if self.index >= len(self.frames):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
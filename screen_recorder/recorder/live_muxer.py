@@ -0,0 +1,295 @@
+import os
+import queue
+import platform
+import subprocess
+import threading
+import collections
+
+from recorder.merger import get_ffmpeg_path
+
+IS_WINDOWS = platform.system() == "Windows"
+
+
+class _AudioPipe:
+    """
+    One-way byte pipe that ffmpeg reads audio from.
+    POSIX uses an inherited pipe fd (pipe:N), Windows a named pipe path.
+    """
+
+    def __init__(self):
+        self._file = None
+        self._read_fd = None
+        self._handle = None
+        if IS_WINDOWS:
+            import _winapi
+            self._winapi = _winapi
+            self.url = r"\\.\pipe\screen_recorder_audio_%d_%d" % (os.getpid(), id(self))
+            self._handle = _winapi.CreateNamedPipe(
+                self.url, _winapi.PIPE_ACCESS_DUPLEX, _winapi.PIPE_WAIT,
+                1, 1 << 20, 1 << 20, 0, _winapi.NULL)
+        else:
+            self._read_fd, write_fd = os.pipe()
+            self._file = os.fdopen(write_fd, "wb")
+            self.url = f"pipe:{self._read_fd}"
+
+    @property
+    def pass_fds(self):
+        return (self._read_fd,) if self._read_fd is not None else ()
+
+    def after_spawn(self):
+        # The child holds its own copy of the read end
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+
+    def connect(self):
+        """Blocks until ffmpeg has opened the pipe (Windows only)."""
+        if self._handle is not None:
+            self._winapi.ConnectNamedPipe(self._handle, False)
+
+    def write(self, data):
+        if self._handle is not None:
+            view = memoryview(data).cast("B")
+            while len(view):
+                written, _ = self._winapi.WriteFile(self._handle, view)
+                view = view[written:]
+        else:
+            self._file.write(data)
+
+    def close(self):
+        try:
+            if self._handle is not None:
+                self._winapi.CloseHandle(self._handle)
+                self._handle = None
+            elif self._file is not None:
+                self._file.close()
+                self._file = None
+        except OSError:
+            pass
+        if self._read_fd is not None:
+            os.close(self._read_fd)
+            self._read_fd = None
+
+
+class _VideoSink:
+    """cv2.VideoWriter-compatible handle that forwards frames to the muxer."""
+
+    # ffmpeg converts BGRA itself, so VideoRecorder can skip its own conversion
+    accepts_bgra = True
+
+    def __init__(self, muxer):
+        self._muxer = muxer
+
+    def isOpened(self):
+        return not self._muxer.failed
+
+    def write(self, frame):
+        self._muxer.write_video(frame)
+
+    def release(self):
+        self._muxer.close_video()
+
+
+class _AudioSink:
+    """Receives int16 PCM blocks from AudioRecorder without blocking the callback."""
+
+    def __init__(self, muxer):
+        self._muxer = muxer
+
+    def write(self, pcm):
+        self._muxer.write_audio(pcm)
+
+    def close(self):
+        self._muxer.close_audio()
+
+
+class LiveMuxer:
+    """
+    Encodes a recording in a single pass: raw frames go to ffmpeg's stdin and
+    PCM blocks through a second pipe while capture is running, so the MP4 is
+    complete as soon as both streams are closed.
+
+    ffmpeg is spawned on the first video frame so the real frame size is used.
+    Audio written before that is queued. ffmpeg reads both inputs in step, so
+    if no audio arrives within `audio_timeout` seconds of the spawn (the
+    device failed to open), the audio input is closed and the file is
+    finished without sound instead of stalling the video pipe.
+    """
+
+    def __init__(self, output_path, fps=30.0, samplerate=44100, channels=2, has_audio=True,
+                 video_args=None, audio_args=None, audio_timeout=3.0):
+        self.output_path = output_path
+        self.fps = float(fps)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.has_audio = has_audio
+        self.video_args = video_args or ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"]
+        self.audio_args = audio_args or ["-c:a", "aac", "-b:a", "192k"]
+        self.audio_timeout = audio_timeout
+
+        self.failed = False
+        self.audio_missing = False
+        self.video = _VideoSink(self)
+        self.audio = _AudioSink(self) if has_audio else None
+
+        self._proc = None
+        self._audio_pipe = None
+        self._audio_queue = queue.Queue()
+        self._audio_thread = None
+        self._stderr_thread = None
+        self._stderr_tail = collections.deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._video_closed = False
+
+    def _spawn(self, height, width, channels):
+        ffmpeg = get_ffmpeg_path()
+        if not ffmpeg:
+            print("Error: FFmpeg not found, live muxing unavailable.")
+            self.failed = True
+            return
+
+        pix_fmt = "bgra" if channels == 4 else "bgr24"
+        cmd = [ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{width}x{height}",
+               "-framerate", f"{self.fps:g}", "-thread_queue_size", "512",
+               "-probesize", "32", "-analyzeduration", "0", "-i", "pipe:0"]
+
+        if self.has_audio:
+            self._audio_pipe = _AudioPipe()
+            cmd.extend(["-f", "s16le", "-ar", str(self.samplerate), "-ac", str(self.channels),
+                        "-thread_queue_size", "1024", "-probesize", "32", "-analyzeduration", "0",
+                        "-i", self._audio_pipe.url,
+                        "-map", "0:v:0", "-map", "1:a:0"])
+
+        cmd.extend(self.video_args)
+        if self.has_audio:
+            cmd.extend(self.audio_args)
+        cmd.append(self.output_path)
+
+        startupinfo = None
+        if IS_WINDOWS:
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        print(f"Starting live mux: {' '.join(cmd)}")
+        try:
+            self._proc = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                startupinfo=startupinfo,
+                pass_fds=self._audio_pipe.pass_fds if self._audio_pipe else ())
+        except OSError as e:
+            print(f"Error starting ffmpeg: {e}")
+            self.failed = True
+            if self._audio_pipe:
+                self._audio_pipe.close()
+            return
+
+        if self._audio_pipe:
+            self._audio_pipe.after_spawn()
+            self._audio_thread = threading.Thread(target=self._audio_loop, name="mux-audio", daemon=True)
+            self._audio_thread.start()
+        self._stderr_thread = threading.Thread(target=self._stderr_loop, name="mux-stderr", daemon=True)
+        self._stderr_thread.start()
+
+    def write_video(self, frame):
+        if self.failed:
+            return
+        if self._proc is None:
+            with self._lock:
+                if self._proc is None:
+                    self._spawn(frame.shape[0], frame.shape[1], frame.shape[2] if frame.ndim == 3 else 1)
+            if self.failed:
+                return
+        try:
+            self._proc.stdin.write(frame if frame.flags.c_contiguous else frame.copy())
+        except (BrokenPipeError, OSError) as e:
+            print(f"Live mux video pipe closed: {e}")
+            self.failed = True
+
+    def write_audio(self, pcm):
+        if self.has_audio and not self.failed and not self.audio_missing:
+            self._audio_queue.put(pcm)
+
+    def _audio_loop(self):
+        try:
+            self._audio_pipe.connect()
+            try:
+                pcm = self._audio_queue.get(timeout=self.audio_timeout)
+            except queue.Empty:
+                print(f"Live mux: no audio after {self.audio_timeout:g}s, recording video only")
+                self.audio_missing = True
+                return
+            while pcm is not None:
+                self._audio_pipe.write(pcm)
+                pcm = self._audio_queue.get()
+        except (BrokenPipeError, OSError) as e:
+            print(f"Live mux audio pipe closed: {e}")
+        finally:
+            self._audio_pipe.close()
+
+    def _stderr_loop(self):
+        for line in self._proc.stderr:
+            self._stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    def close_video(self):
+        if self._video_closed:
+            return
+        self._video_closed = True
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+    def close_audio(self):
+        self._audio_queue.put(None)
+
+    def close(self, timeout=30):
+        """
+        Closes both inputs and waits for ffmpeg to finish the file.
+        :return: True if the output file was written successfully
+        """
+        self.close_audio()
+        self.close_video()
+        if self._proc is None:
+            print("Live mux: no video frames were received")
+            return False
+
+        if self._audio_thread:
+            self._audio_thread.join(timeout)
+        try:
+            returncode = self._proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            returncode = self._proc.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(1)
+
+        if returncode == 0 and os.path.exists(self.output_path) and os.path.getsize(self.output_path) > 0:
+            print(f"Successfully created: {self.output_path} ({os.path.getsize(self.output_path)} bytes)")
+            return True
+
+        print(f"Live mux failed (code {returncode}): " + "\n".join(self._stderr_tail))
+        return False
+
+
+class EncodingWriter:
+    """
+    cv2.VideoWriter-compatible writer that encodes frames with ffmpeg while
+    recording (a video-only LiveMuxer). The file is written in the quality
+    profile's codec, so merging it with the audio is a stream copy instead
+    of a second encode. release() waits until the file is complete.
+    """
+
+    def __init__(self, path, fps, video_args):
+        self.path = path
+        self._muxer = LiveMuxer(path, fps=fps, has_audio=False, video_args=video_args)
+
+    def isOpened(self):
+        return not self._muxer.failed
+
+    def write(self, frame):
+        self._muxer.write_video(frame)
+
+    def release(self):
+        return self._muxer.close()
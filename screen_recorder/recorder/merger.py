@@ -4,17 +4,35 @@ import shutil
 import platform
 import threading
 import glob
+import json
+import collections
+
+# Codecs the MP4 muxer accepts without re-encoding
+MP4_VIDEO_CODECS = {"h264", "hevc", "mpeg4", "av1"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac"}
+
+# Stream codec each ffmpeg encoder produces, to tell whether a video is already encoded as requested
+ENCODER_CODECS = {"libx264": "h264", "libx265": "hevc", "libaom-av1": "av1", "mpeg4": "mpeg4"}
+
+# Merge plans, cheapest first
+PLAN_COPY = "copy"              # remux both streams
+PLAN_COPY_VIDEO = "copy_video"  # remux video, encode audio to AAC
+PLAN_TRANSCODE = "transcode"    # re-encode everything
+
+# How often each plan was used in this process
+merge_plan_counts = {PLAN_COPY: 0, PLAN_COPY_VIDEO: 0, PLAN_TRANSCODE: 0}
+
+# ffmpeg capabilities, cached on disk per binary (path, mtime and size), in the app's temp dir
+CAPABILITY_FILE = "ffmpeg_capabilities.json"
+
+# ffprobe results kept per process, keyed by file path, size and mtime
+PROBE_CACHE_SIZE = 64
 
 def find_ffmpeg():
     """Find the ffmpeg executable path."""
-    # First check if ffmpeg is in PATH
-    try:
-        result = subprocess.run(["where", "ffmpeg"] if platform.system() == "Windows" else ["which", "ffmpeg"], 
-                                capture_output=True, text=True)
-        if result.returncode == 0:
-            return "ffmpeg"
-    except:
-        pass
+    # First check if ffmpeg is in PATH (a lookup, no process is started)
+    if shutil.which("ffmpeg"):
+        return "ffmpeg"
     
     # On Windows, check WinGet install location
     if platform.system() == "Windows":
@@ -35,8 +53,9 @@ def find_ffmpeg():
     
     return None
 
-# Cache the ffmpeg path
+# Cache the ffmpeg/ffprobe paths
 _ffmpeg_path = None
+_ffprobe_path = None
 
 def get_ffmpeg_path():
     """Get the cached ffmpeg path or find it."""
@@ -45,16 +64,172 @@ def get_ffmpeg_path():
         _ffmpeg_path = find_ffmpeg()
     return _ffmpeg_path
 
-def check_ffmpeg():
-    """Checks if ffmpeg is available."""
+def get_ffprobe_path():
+    """Returns the ffprobe executable that ships next to ffmpeg, or None."""
+    global _ffprobe_path
+    if _ffprobe_path is None:
+        ffmpeg = get_ffmpeg_path()
+        if ffmpeg is None:
+            return None
+        if ffmpeg == "ffmpeg":
+            candidate = "ffprobe"
+        else:
+            folder, name = os.path.split(ffmpeg)
+            candidate = os.path.join(folder, name.replace("ffmpeg", "ffprobe"))
+        if shutil.which(candidate) or os.path.exists(candidate):
+            _ffprobe_path = candidate
+    return _ffprobe_path
+
+class FFmpegCapabilities:
+    """What one ffmpeg build can do: version, encoders, muxers and pixel formats."""
+
+    def __init__(self, version, encoders, muxers, pix_fmts):
+        self.version = version
+        self.encoders = set(encoders)
+        self.muxers = set(muxers)
+        self.pix_fmts = set(pix_fmts)
+
+    def has_encoder(self, name):
+        return name in self.encoders
+
+    def has_muxer(self, name):
+        return name in self.muxers
+
+    def supports_pix_fmt(self, name):
+        return name in self.pix_fmts
+
+    def as_dict(self):
+        return {"version": self.version, "encoders": sorted(self.encoders), "muxers": sorted(self.muxers),
+                "pix_fmts": sorted(self.pix_fmts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["version"], data["encoders"], data["muxers"], data["pix_fmts"])
+
+def _binary_identity(ffmpeg):
+    """(absolute path, mtime_ns, size) of the ffmpeg binary, or None if it cannot be found."""
+    path = shutil.which(ffmpeg) or (ffmpeg if os.path.isfile(ffmpeg) else None)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.realpath(path), stat.st_mtime_ns, stat.st_size
+
+def _listing(ffmpeg, option, startupinfo=None):
+    """
+    Names from one of ffmpeg's -encoders/-muxers/-pix_fmts tables: the rows
+    after the dashed separator, as "FLAGS name description".
+    :return: list of (flags, name)
+    """
+    result = subprocess.run([ffmpeg, "-hide_banner", option], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            startupinfo=startupinfo, check=True)
+    rows = []
+    started = False
+    for line in result.stdout.decode("utf-8", "replace").splitlines():
+        parts = line.split()
+        if not started:
+            started = len(parts) == 1 and set(parts[0]) == {"-"}
+            continue
+        if len(parts) >= 2:
+            rows.append((parts[0], parts[1]))
+    return rows
+
+def probe_capabilities(ffmpeg):
+    """
+    Runs ffmpeg to list what it supports (four short processes).
+    :return: FFmpegCapabilities, or None if ffmpeg could not be run
+    """
+    startupinfo = None
+    if platform.system() == "Windows":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        result = subprocess.run([ffmpeg, "-hide_banner", "-version"], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, startupinfo=startupinfo, check=True)
+        first = result.stdout.decode("utf-8", "replace").split()
+        version = first[2] if len(first) > 2 and first[1] == "version" else "unknown"
+        encoders = [name for flags, name in _listing(ffmpeg, "-encoders", startupinfo)]
+        muxers = [alias for flags, name in _listing(ffmpeg, "-muxers", startupinfo) if "E" in flags
+                  for alias in name.split(",")]
+        pix_fmts = [name for flags, name in _listing(ffmpeg, "-pix_fmts", startupinfo) if "O" in flags]
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        print(f"Could not query ffmpeg capabilities: {e}")
+        return None
+    return FFmpegCapabilities(version, encoders, muxers, pix_fmts)
+
+class CapabilityCache:
+    """
+    ffmpeg capabilities on disk, one entry per binary path. An entry is
+    reused while the binary's mtime and size are unchanged, so a launch with
+    the same ffmpeg starts no ffmpeg process at all.
+    """
+
+    def __init__(self, path=None):
+        # Not relative to the working directory, so every launch finds the same file
+        self.path = path or os.path.join(get_temp_dir(), CAPABILITY_FILE)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading ffmpeg capabilities: {e}")
+            return {}
+
+    def _save(self, entries):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(entries, f, indent=4)
+        except Exception as e:
+            print(f"Error saving ffmpeg capabilities: {e}")
+
+    def get(self, ffmpeg, probe=probe_capabilities):
+        """
+        Capabilities of `ffmpeg`, probed (and stored) only when the binary is new or changed.
+        :return: FFmpegCapabilities, or None if the binary is missing or cannot run
+        """
+        identity = _binary_identity(ffmpeg)
+        if identity is None:
+            return None
+        path, mtime_ns, size = identity
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(path)
+            if entry and entry.get("mtime_ns") == mtime_ns and entry.get("size") == size:
+                try:
+                    return FFmpegCapabilities.from_dict(entry)
+                except (KeyError, TypeError):
+                    pass  # written by an older version: probe again
+            capabilities = probe(ffmpeg)
+            if capabilities is not None:
+                entries[path] = dict(capabilities.as_dict(), mtime_ns=mtime_ns, size=size)
+                self._save(entries)
+            return capabilities
+
+# Capabilities per ffmpeg binary (path, mtime and size), once per process;
+# None is kept too, so a broken ffmpeg is not probed again on every call
+_capabilities = {}
+_capabilities_lock = threading.Lock()
+
+def get_capabilities(cache=None):
+    """FFmpegCapabilities of the ffmpeg in use, or None if there is no working ffmpeg."""
     ffmpeg = get_ffmpeg_path()
     if ffmpeg is None:
-        return False
-    try:
-        subprocess.run([ffmpeg, "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+        return None
+    identity = _binary_identity(ffmpeg) or ffmpeg
+    with _capabilities_lock:
+        if identity not in _capabilities:
+            _capabilities[identity] = (cache or CapabilityCache()).get(ffmpeg)
+        return _capabilities[identity]
+
+def check_ffmpeg():
+    """Checks if ffmpeg is available (from the capability cache when the binary has not changed)."""
+    return get_capabilities() is not None
 
 def get_temp_dir():
     """Returns the temporary directory for the application."""
@@ -66,21 +241,242 @@ def get_temp_dir():
     os.makedirs(temp_dir, exist_ok=True)
     return temp_dir
 
-def merge_audio_video(video_path, audio_path, output_path, keep_temp=False):
+_probe_cache = collections.OrderedDict()
+_probe_lock = threading.Lock()
+
+def _probe_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+def probe_media(path):
+    """
+    Probes a media file with ffprobe. Results are memoized per path, size
+    and mtime, so probing an unchanged file again starts no process.
+    :return: dict with "video"/"audio" stream info (or None) and "duration", or None if probing failed
+    """
+    ffprobe = get_ffprobe_path()
+    if not ffprobe:
+        return None
+    key = _probe_key(path)
+    with _probe_lock:
+        if key in _probe_cache:
+            _probe_cache.move_to_end(key)
+            return _probe_cache[key]
+    info = _run_ffprobe(ffprobe, path)
+    if info is not None and key is not None:
+        with _probe_lock:
+            _probe_cache[key] = info
+            while len(_probe_cache) > PROBE_CACHE_SIZE:
+                _probe_cache.popitem(last=False)
+    return info
+
+def _run_ffprobe(ffprobe, path):
+    cmd = [ffprobe, "-v", "error",
+           "-show_entries", "stream=codec_type,codec_name,r_frame_rate,sample_rate,channels:format=duration",
+           "-of", "json", path]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            return None
+        data = json.loads(result.stdout)
+    except Exception as e:
+        print(f"Could not probe {path}: {e}")
+        return None
+
+    info = {"video": None, "audio": None, "duration": None}
+    for stream in data.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind in ("video", "audio") and info[kind] is None:
+            info[kind] = stream
+    try:
+        info["duration"] = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        pass
+    return info
+
+def _target_codec(video_args):
+    """Codec name of the stream `video_args` encode to, or None if they do not say."""
+    args = list(video_args or [])
+    for option in ("-c:v", "-vcodec"):
+        if option in args[:-1]:
+            encoder = args[args.index(option) + 1]
+            return ENCODER_CODECS.get(encoder, encoder)
+    return None
+
+def plan_merge(video_info, audio_info, video_args=None):
+    """
+    Picks the cheapest valid way to combine the probed inputs into an MP4.
+    With `video_args` (a quality profile), the video is only copied if it is
+    already in the codec they encode to; otherwise the profile is applied.
+    """
+    if not video_info or not video_info.get("video"):
+        return PLAN_TRANSCODE
+    video = video_info["video"]
+    if video.get("codec_name") not in MP4_VIDEO_CODECS:
+        return PLAN_TRANSCODE
+    target = _target_codec(video_args)
+    if target and video.get("codec_name") != target:
+        return PLAN_TRANSCODE
+    # A missing or zero rate means the container timing is unusable for a remux
+    if video.get("r_frame_rate") in (None, "0/0", "0/1"):
+        return PLAN_TRANSCODE
+
+    audio = audio_info.get("audio") if audio_info else None
+    if audio and audio.get("codec_name") in MP4_AUDIO_CODECS:
+        return PLAN_COPY
+    return PLAN_COPY_VIDEO
+
+def _codec_args(plan, video_info, video_args=None, has_audio=True):
+    audio_args = _aac_args() if has_audio else []
+    if plan == PLAN_TRANSCODE:
+        capabilities = get_capabilities()
+        if capabilities is not None and not capabilities.has_encoder("libx264"):
+            # ffmpeg built without x264: MPEG-4 part 2 still plays everywhere
+            print("libx264 is not available in this ffmpeg, encoding MPEG-4 instead")
+            return ["-c:v", "mpeg4", "-q:v", "3", "-pix_fmt", "yuv420p"] + audio_args
+        if video_args:
+            return list(video_args) + audio_args
+        return [
+            "-c:v", "libx264",  # Re-encode to H.264 for compatibility
+            "-preset", "fast",  # Faster encoding
+            "-crf", "23",  # Quality (lower = better, 18-28 is good range)
+        ] + audio_args
+
+    args = ["-c:v", "copy"]
+    if video_info["video"].get("codec_name") == "mpeg4":
+        # AVI-style packed B-frames are not valid in MP4
+        args.extend(["-bsf:v", "mpeg4_unpack_bframes"])
+    if plan == PLAN_COPY:
+        args.extend(["-c:a", "copy"])
+    else:
+        args.extend(audio_args)
+    return args
+
+def _aac_args():
+    return [
+        "-c:a", "aac",
+        "-b:a", "192k",  # Audio bitrate
+        "-ar", "44100",  # Audio sample rate
+        "-ac", "2",  # Stereo audio
+    ]
+
+def get_merge_plan_stats():
+    """Returns how many merges used each plan, to track the fast-path hit rate."""
+    total = sum(merge_plan_counts.values())
+    stats = dict(merge_plan_counts)
+    stats["fast_path_ratio"] = (total - merge_plan_counts[PLAN_TRANSCODE]) / total if total else 0.0
+    return stats
+
+def _audio_offset_args(audio_offset):
+    """Input options placing the audio `audio_offset` seconds into the video timeline."""
+    if audio_offset >= 0.0005:
+        return ["-itsoffset", f"{audio_offset:.3f}"]
+    if audio_offset <= -0.0005:
+        # Audio started before the video: skip its head
+        return ["-ss", f"{-audio_offset:.3f}"]
+    return []
+
+class FFmpegProgress:
+    """
+    Parses the key=value blocks ffmpeg writes with `-progress pipe:1`.
+    :param duration: Expected output duration in seconds, for percent and ETA (optional)
+    """
+
+    def __init__(self, duration=None):
+        self.duration = duration
+        self._values = {}
+
+    def feed(self, line):
+        """Consumes one line; returns a progress dict at the end of each block, else None."""
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return None
+        if key != "progress":
+            self._values[key] = value
+            return None
+        return self.snapshot(done=value == "end")
+
+    def snapshot(self, done=False):
+        values = self._values
+        out_time = None
+        for key in ("out_time_us", "out_time_ms"):  # both are microseconds
+            try:
+                out_time = int(values[key]) / 1e6
+                break
+            except (KeyError, ValueError):
+                continue
+        try:
+            fps = float(values.get("fps", 0))
+        except ValueError:
+            fps = 0.0
+        try:
+            speed = float(values.get("speed", "0").rstrip("x"))
+        except ValueError:
+            speed = 0.0
+
+        percent = eta = None
+        if self.duration and out_time is not None:
+            percent = 100.0 if done else min(100.0, max(0.0, out_time / self.duration * 100))
+            if speed > 0:
+                eta = max(0.0, (self.duration - out_time) / speed)
+        return {"out_time": out_time, "fps": fps, "speed": speed, "percent": percent, "eta": eta, "done": done}
+
+def run_ffmpeg(cmd, progress=None, duration=None, startupinfo=None):
+    """
+    Runs an ffmpeg command, optionally reporting progress while it runs.
+    :param progress: Optional callable receiving FFmpegProgress dicts
+    :param duration: Expected output duration in seconds, for percent and ETA
+    :return: subprocess.CompletedProcess with stderr captured
+    """
+    if progress is None:
+        return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+    # Drain stderr concurrently so a chatty ffmpeg never blocks on a full pipe
+    tail = collections.deque(maxlen=50)
+    drain = threading.Thread(target=lambda: tail.extend(proc.stderr), daemon=True)
+    drain.start()
+    parser = FFmpegProgress(duration)
+    for line in proc.stdout:
+        update = parser.feed(line.decode("utf-8", "replace"))
+        if update is not None:
+            progress(update)
+    returncode = proc.wait()
+    drain.join(1)
+    return subprocess.CompletedProcess(cmd, returncode, b"", b"".join(tail))
+
+def merge_audio_video(video_path, audio_path, output_path, keep_temp=False, audio_offset=0.0, progress=None,
+                      duration=None, video_args=None):
     """
     Merges audio and video files using ffmpeg.
     :param video_path: Path to the video file
     :param audio_path: Path to the audio file
     :param output_path: Path for the final output file
     :param keep_temp: Whether to keep temporary files after merge
+    :param audio_offset: Seconds from the start of the video to the first audio sample
+                         (SessionClock.audio_offset()); may be negative
+    :param progress: Optional callable receiving FFmpegProgress dicts while ffmpeg runs
+    :param duration: Recording length in seconds for progress percentages; probed if omitted
+    :param video_args: ffmpeg video encoder options for the output (EncoderProfile.video_args()).
+                       The video is re-encoded with them unless it already is in their codec;
+                       if omitted, it is only re-encoded (libx264 fast/crf 23) when it cannot be copied
     :return: True if successful, False otherwise
+
+    Without an audio file (None or missing) the video alone is remuxed or
+    re-encoded into the output.
     """
     if not os.path.exists(video_path):
         print(f"Error: Video file not found: {video_path}")
         return False
-        
-    if not os.path.exists(audio_path):
-        # If no audio file, just copy/move video to output
+    
+    has_audio = audio_path is not None and os.path.exists(audio_path)
+    ffmpeg = get_ffmpeg_path()
+    if not has_audio and not ffmpeg:
+        # If no audio file and no ffmpeg, just move the video to the output
         try:
             shutil.move(video_path, output_path)
             return True
@@ -88,53 +484,36 @@ def merge_audio_video(video_path, audio_path, output_path, keep_temp=False):
             print(f"Error moving video file: {e}")
             return False
 
-    # Get ffmpeg path
-    ffmpeg = get_ffmpeg_path()
     if not ffmpeg:
         print("Error: FFmpeg not found. Please install FFmpeg.")
         return False
 
-    # Read actual FPS from companion file if it exists
-    fps_file = video_path + ".fps"
-    actual_fps = None
-    if os.path.exists(fps_file):
-        try:
-            with open(fps_file, 'r') as f:
-                actual_fps = float(f.read().strip())
-            print(f"Using actual captured FPS: {actual_fps}")
-            os.remove(fps_file)  # Clean up
-        except:
-            pass
+    # Probe each input once and pick the cheapest plan that yields a valid MP4
+    video_info = probe_media(video_path)
+    audio_info = probe_media(audio_path) if has_audio else None
+    plan = plan_merge(video_info, audio_info, video_args)
+    print(f"Merge plan: {plan}")
 
     # Construct ffmpeg command
-    # Re-encode to H.264 for maximum compatibility
     cmd = [ffmpeg, "-y"]
     
-    # Add video input with correct framerate interpretation
-    # Use -itsscale to slow down the video if actual FPS is lower than expected
-    if actual_fps and actual_fps < 25:
-        # Calculate scale factor: if recorded at 8 fps but video says 30, we need to slow it down
-        # itsscale makes the video play slower (higher value = slower)
-        scale_factor = 30.0 / actual_fps  # e.g., 30/8 = 3.75x slower
-        cmd.extend(["-itsscale", str(scale_factor)])
-    
+    # Add video input. Frames are already placed on the nominal frame grid by
+    # their capture timestamps, so the file plays at real speed as-is.
     cmd.extend(["-i", video_path])
     
-    # Add audio input
-    cmd.extend(["-i", audio_path])
+    # Add audio input, shifted to where it was actually captured
+    if has_audio:
+        if audio_offset:
+            print(f"A/V skew: audio starts {audio_offset * 1000:.1f} ms after video")
+        cmd.extend(_audio_offset_args(audio_offset))
+        cmd.extend(["-i", audio_path])
     
     # Map both streams explicitly
+    cmd.extend(["-map", "0:v:0"])  # First video stream from first input
+    if has_audio:
+        cmd.extend(["-map", "1:a:0"])  # First audio stream from second input
+    cmd.extend(_codec_args(plan, video_info, video_args, has_audio))
     cmd.extend([
-        "-map", "0:v:0",  # First video stream from first input
-        "-map", "1:a:0",  # First audio stream from second input
-        "-c:v", "libx264",  # Re-encode to H.264 for compatibility
-        "-preset", "fast",  # Faster encoding
-        "-crf", "23",  # Quality (lower = better, 18-28 is good range)
-        "-r", "30",  # Output at 30 FPS for smooth playback
-        "-c:a", "aac",
-        "-b:a", "192k",  # Audio bitrate
-        "-ar", "44100",  # Audio sample rate
-        "-ac", "2",  # Stereo audio
         "-movflags", "+faststart",  # Enable streaming/quick playback
         output_path
     ])
@@ -148,16 +527,19 @@ def merge_audio_video(video_path, audio_path, output_path, keep_temp=False):
             startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
         
         print(f"Running FFmpeg: {' '.join(cmd)}")
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+        if duration is None and video_info:
+            duration = video_info.get("duration")
+        result = run_ffmpeg(cmd, progress, duration, startupinfo)
         
         if result.returncode == 0:
             # Verify output file exists and has content
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                print(f"Successfully created: {output_path} ({os.path.getsize(output_path)} bytes)")
+                print(f"Successfully created: {output_path} ({os.path.getsize(output_path)} bytes, plan: {plan})")
+                merge_plan_counts[plan] += 1
                 if not keep_temp:
                     if os.path.exists(video_path):
                         os.remove(video_path)
-                    if os.path.exists(audio_path):
+                    if has_audio and os.path.exists(audio_path):
                         os.remove(audio_path)
                 return True
             else:
@@ -173,6 +555,39 @@ def merge_audio_video(video_path, audio_path, output_path, keep_temp=False):
         traceback.print_exc()
         return False
 
+def concat_segments(paths, output_path):
+    """
+    Joins MP4 segments with the concat demuxer, without re-encoding.
+    :param paths: Segment files in playback order
+    :return: True if successful, False otherwise
+    """
+    ffmpeg = get_ffmpeg_path()
+    if not ffmpeg:
+        print("Error: FFmpeg not found. Please install FFmpeg.")
+        return False
+
+    list_path = os.path.splitext(output_path)[0] + "_segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [ffmpeg, "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+           "-c", "copy", "-movflags", "+faststart", output_path]
+    try:
+        print(f"Running FFmpeg: {' '.join(cmd)}")
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            print(f"FFmpeg concat failed (code {result.returncode}): {result.stderr.decode()}")
+            return False
+        return os.path.exists(output_path) and os.path.getsize(output_path) > 0
+    except Exception as e:
+        print(f"Error executing ffmpeg: {e}")
+        return False
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
 def cleanup_temp_files(folder):
     """Cleans up the temporary folder."""
     try:
@@ -183,4 +598,8 @@ def cleanup_temp_files(folder):
 
 if __name__ == "__main__":
     print(f"FFmpeg Available: {check_ffmpeg()}")
+    capabilities = get_capabilities()
+    if capabilities:
+        print(f"FFmpeg {capabilities.version}: {len(capabilities.encoders)} encoders, "
+              f"{len(capabilities.muxers)} muxers, {len(capabilities.pix_fmts)} output pixel formats")
     print(f"Temp Dir: {get_temp_dir()}")
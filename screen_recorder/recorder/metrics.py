@@ -0,0 +1,117 @@
+import bisect
+import json
+import os
+import platform
+import sys
+import threading
+
+# Latency bucket upper edges in seconds: 0.125 ms doubling up to ~4 s
+LATENCY_EDGES = [0.000125 * 2 ** i for i in range(16)]
+
+
+class Histogram:
+    """
+    Counts values into fixed buckets. record() takes a lock and a bisect,
+    so it is cheap enough for every frame and every audio block.
+    :param edges: ascending bucket upper edges; larger values go to an overflow bucket
+    """
+
+    def __init__(self, edges=LATENCY_EDGES):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        i = bisect.bisect_left(self.edges, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (the max for the overflow bucket)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q / 100.0 * self.count
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    return min(self.edges[i], self.max) if i < len(self.edges) else self.max
+            return self.max
+
+    def as_dict(self, scale=1000.0, unit="ms"):
+        """Summary and non-empty buckets; latencies are reported in ms by default."""
+        p50, p90, p99 = (self.percentile(q) for q in (50, 90, 99))
+        with self._lock:
+            buckets = {f"<={edge * scale:g}": count for edge, count in zip(self.edges, self.counts) if count}
+            if self.counts[-1]:
+                buckets[f">{self.edges[-1] * scale:g}"] = self.counts[-1]
+            return {
+                "count": self.count,
+                f"avg_{unit}": round(self.total / self.count * scale, 3) if self.count else 0.0,
+                f"p50_{unit}": round(p50 * scale, 3),
+                f"p90_{unit}": round(p90 * scale, 3),
+                f"p99_{unit}": round(p99 * scale, 3),
+                f"max_{unit}": round(self.max * scale, 3),
+                "buckets": buckets,
+            }
+
+
+def depth_histogram(maxsize):
+    """Histogram of queue depths 0..maxsize."""
+    return Histogram(range(int(maxsize) + 1))
+
+
+class AudioStatusCounters:
+    """
+    Tallies the PortAudio status flags passed to a stream callback. Meant to
+    be called from the callback itself: it only increments integers.
+    """
+    FLAGS = ("input_overflow", "input_underflow", "output_overflow", "output_underflow", "priming_output")
+
+    def __init__(self):
+        self.callbacks = 0
+        self.counts = dict.fromkeys(self.FLAGS, 0)
+
+    def record(self, status):
+        self.callbacks += 1
+        if status:
+            for flag in self.FLAGS:
+                if getattr(status, flag, False):
+                    self.counts[flag] += 1
+
+    def as_dict(self):
+        return dict(self.counts, callbacks=self.callbacks)
+
+
+def machine_info():
+    """What is needed to compare sessions recorded on different machines."""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+    }
+
+
+def write_session_metrics(path, metrics):
+    """
+    Writes one session's metrics to `path` as JSON, creating the folder if needed.
+    :return: True if successful, False otherwise
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(metrics, f, indent=4, default=str)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Error writing session metrics: {e}")
+        return False
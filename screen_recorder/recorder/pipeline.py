@@ -0,0 +1,314 @@
+import math
+import queue
+import threading
+import time
+import numpy as np
+
+from recorder.metrics import Histogram, depth_histogram
+
+# Sentinel pushed through the queues to tell a stage to shut down
+STOP = object()
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class Frame:
+    """A captured frame travelling through the pipeline."""
+    __slots__ = ("seq", "captured", "pts", "data", "pool", "cursor")
+
+    def __init__(self, seq, captured, data, pts=0.0, cursor=None):
+        self.seq = seq
+        self.captured = captured  # time.perf_counter() at grab
+        self.pts = pts  # seconds of recorded (unpaused) time since the session started
+        self.data = data
+        self.pool = None  # FramePool that owns `data`, if any
+        self.cursor = cursor  # CursorSample read at grab time, drawn by the convert stage
+
+    def release(self):
+        """Returns a pooled buffer once the frame has been written."""
+        if self.pool is not None:
+            self.pool.release(self.data)
+            self.pool = None
+
+
+class FramePool:
+    """Preallocated frame buffers recycled between the convert and encode stages."""
+
+    def __init__(self, shape, count, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.allocated = 0
+        self._free = queue.SimpleQueue()
+        for _ in range(count):
+            self._free.put(self._allocate())
+
+    def _allocate(self):
+        self.allocated += 1
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def acquire(self):
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            # Only happens if more frames are in flight than the pool was sized for
+            return self._allocate()
+
+    def release(self, buf):
+        if buf.shape == self.shape:
+            self._free.put(buf)
+
+
+class StageStats:
+    """
+    Counters and timings for one pipeline stage. Safe to read from any thread.
+    :param queue_size: capacity of the stage's output queue, to keep a histogram of its depth
+    """
+
+    def __init__(self, name, queue_size=None):
+        self.name = name
+        self.latency = Histogram()
+        self.depth = depth_histogram(queue_size) if queue_size else None
+        self.frames = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.max_queue = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed, queue_depth=None):
+        self.latency.record(elapsed)
+        if queue_depth is not None and self.depth is not None:
+            self.depth.record(queue_depth)
+        with self._lock:
+            self.frames += 1
+            self.total_time += elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+            if queue_depth is not None and queue_depth > self.max_queue:
+                self.max_queue = queue_depth
+
+    def record_drop(self, count=1):
+        with self._lock:
+            self.dropped += count
+
+    def record_duplicate(self, count=1):
+        with self._lock:
+            self.duplicated += count
+
+    def as_dict(self, histograms=False):
+        """:param histograms: include the latency (and queue depth) histograms"""
+        with self._lock:
+            avg = self.total_time / self.frames if self.frames else 0.0
+            stats = {
+                "frames": self.frames,
+                "dropped": self.dropped,
+                "duplicated": self.duplicated,
+                "avg_ms": round(avg * 1000, 3),
+                "max_ms": round(self.max_time * 1000, 3),
+                "max_queue": self.max_queue,
+            }
+        if histograms:
+            stats["latency"] = self.latency.as_dict()
+            if self.depth is not None:
+                stats["queue"] = self.depth.as_dict(scale=1, unit="depth")
+        return stats
+
+
+class FrameQueue:
+    """
+    Bounded queue between two pipeline stages.
+    :param maxsize: Maximum number of queued items
+    :param drop_policy: What put() does when the queue is full:
+        "drop_oldest" evicts the oldest queued item, "drop_newest" discards
+        the incoming item, "block" waits for space.
+    :param on_drop: Optional callback invoked with every discarded item
+    """
+
+    def __init__(self, maxsize, drop_policy=DROP_OLDEST, on_drop=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.drop_policy = drop_policy
+        self.on_drop = on_drop
+        self._queue = queue.Queue(maxsize=self.maxsize)
+
+    def put(self, item):
+        """Enqueue an item according to the drop policy. Returns False if something was dropped."""
+        if self.drop_policy == BLOCK:
+            self._queue.put(item)
+            return True
+
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        if self.drop_policy == DROP_NEWEST:
+            self._dropped(item)
+            return False
+
+        # Drop oldest: make room and retry
+        while True:
+            try:
+                old = self._queue.get_nowait()
+            except queue.Empty:
+                old = None
+            if old is STOP:
+                # Never drop a shutdown request, put it back and discard the new item
+                self._queue.put(old)
+                self._dropped(item)
+                return False
+            if old is not None:
+                self._dropped(old)
+            try:
+                self._queue.put_nowait(item)
+                return False
+            except queue.Full:
+                continue
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def close(self, consumers=1):
+        """Push one STOP sentinel per consumer, waiting for space if needed."""
+        for _ in range(consumers):
+            self._queue.put(STOP)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _dropped(self, item):
+        if self.on_drop:
+            self.on_drop(item)
+
+
+class FrameTimeline:
+    """
+    Places frames on the encoder's fixed 1/fps grid by their capture timestamp.
+
+    Raw video pipes and cv2.VideoWriter carry no per-frame timestamps, so the
+    frame index is the PTS. Gaps are filled by repeating the previous frame and
+    frames landing on an already written slot are skipped, which keeps every
+    frame within half a frame period of its real capture time for the whole
+    recording instead of stretching the file afterwards.
+    """
+
+    def __init__(self, fps):
+        self.fps = float(fps)
+        self.next_slot = 0
+
+    def slot(self, pts):
+        return int(round(pts * self.fps))
+
+    def place(self, pts):
+        """
+        :return: (repeats, copies) - how many times the previous frame must be
+                 repeated first, then how many times to write this frame
+                 (0 if its slot is already taken; the first frame also covers
+                 the slots before it)
+        """
+        slot = self.slot(pts)
+        if slot < self.next_slot:
+            return 0, 0
+        if self.next_slot == 0:
+            self.next_slot = slot + 1
+            return 0, slot + 1
+        repeats = slot - self.next_slot
+        self.next_slot = slot + 1
+        return repeats, 1
+
+    def pad(self, end_pts):
+        """Number of times the last frame must be repeated to reach end_pts."""
+        slot = self.slot(end_pts)
+        repeats = max(0, slot - self.next_slot)
+        self.next_slot += repeats
+        return repeats
+
+
+class FrameScheduler:
+    """
+    Paces the grab loop on absolute deadlines: tick n is due at
+    origin + n / fps on time.perf_counter(), so a slow grab never shifts
+    the ticks after it.
+
+    A grab that overruns its period does not trigger a burst of catch-up
+    grabs: the deadlines that already passed are skipped and the encoder's
+    FrameTimeline repeats the previous frame for their slots, which keeps
+    the output cadence exact. Late grabs and skipped ticks are counted.
+    :param late_after: fraction of a period after its deadline at which a grab counts as late
+    """
+
+    def __init__(self, fps, origin=None, late_after=0.5):
+        self.fps = float(fps)
+        self.period = 1.0 / self.fps
+        self.origin = time.perf_counter() if origin is None else origin
+        self.late_after = late_after
+        self.tick = 0
+        self.grabs = 0
+        self.late = 0
+        self.skipped = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def deadline(self):
+        return self.origin + self.tick * self.period
+
+    def wait(self, stop_event=None):
+        """Sleeps until the current tick is due (or `stop_event` is set) and returns its deadline."""
+        deadline = self.deadline()
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            if stop_event is not None:
+                stop_event.wait(remaining)
+            else:
+                time.sleep(remaining)
+        return deadline
+
+    def resync(self, now=None):
+        """Jumps to the first deadline at or after `now` without counting the ticks before it as skipped."""
+        now = time.perf_counter() if now is None else now
+        self.tick = max(self.tick, int(math.ceil((now - self.origin) * self.fps - 1e-9)))
+
+    def shift(self, seconds):
+        """Moves every remaining deadline later, e.g. by the time spent paused."""
+        self.origin += seconds
+
+    def done(self, started, now=None):
+        """
+        Records the grab for the current tick, which started at `started`,
+        and advances to the first deadline that has not passed yet.
+        :return: number of ticks skipped
+        """
+        lateness = max(0.0, started - self.deadline())
+        self.grabs += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        if lateness > self.late_after * self.period:
+            self.late += 1
+
+        now = time.perf_counter() if now is None else now
+        next_tick = max(self.tick + 1, int((now - self.origin) * self.fps) + 1)
+        skipped = next_tick - self.tick - 1
+        self.skipped += skipped
+        self.tick = next_tick
+        return skipped
+
+    def as_dict(self):
+        return {
+            "ticks": self.tick,
+            "grabs": self.grabs,
+            "late": self.late,
+            "skipped": self.skipped,
+            "avg_lateness_ms": round(self.total_lateness / self.grabs * 1000, 3) if self.grabs else 0.0,
+            "max_lateness_ms": round(self.max_lateness * 1000, 3),
+        }
+
+
+def timed(stats, started, queue_depth=None):
+    """Record the time elapsed since `started` against a stage."""
+    stats.record(time.perf_counter() - started, queue_depth)
@@ -0,0 +1,244 @@
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from recorder.merger import get_ffmpeg_path, get_temp_dir
+
+# libx264 presets, fastest first
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"]
+
+# Named quality settings: (preset, crf). "Auto" picks the preset by calibration.
+PROFILES = {
+    "Low": ("ultrafast", 28),
+    "Medium": ("veryfast", 23),
+    "High": ("fast", 20),
+}
+AUTO = "Auto"
+AUTO_CRF = 23
+
+# The encoder shares the CPU with capture and conversion, so a preset must
+# encode this much faster than real time to be picked
+HEADROOM = 1.3
+
+CALIBRATION_FILE = "encoder_calibration.json"
+
+
+class EncoderProfile:
+    """libx264 settings used while recording (live mux or capture encoding), for transcodes and replay saves."""
+
+    def __init__(self, name, preset, crf):
+        self.name = name
+        self.preset = preset
+        self.crf = int(crf)
+
+    def video_args(self):
+        return ["-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", "yuv420p"]
+
+    def as_dict(self):
+        return {"name": self.name, "preset": self.preset, "crf": self.crf}
+
+    def __repr__(self):
+        return f"EncoderProfile({self.name}: {self.preset}, crf {self.crf})"
+
+
+def calibration_key(width, height, fps):
+    return f"{width}x{height}@{float(fps):g}"
+
+
+class CalibrationCache:
+    """
+    Calibration results on disk, keyed by output size and fps.
+    Each entry: {"preset": ..., "fps": {preset: measured fps}, "downgrades": n}
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_temp_dir(), CALIBRATION_FILE)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading encoder calibration: {e}")
+            return {}
+
+    def _save(self, entries):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(entries, f, indent=4)
+        except Exception as e:
+            print(f"Error saving encoder calibration: {e}")
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key, entry):
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            self._save(entries)
+
+    def downgrade(self, key, preset):
+        """
+        Records that `preset` could not keep up at `key`; future sessions start one preset faster.
+        :return: the new preset, or None if already at the fastest
+        """
+        index = PRESETS.index(preset) if preset in PRESETS else len(PRESETS) - 1
+        if index == 0:
+            return None
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key) or {"fps": {}}
+            current = entry.get("preset", preset)
+            if current in PRESETS and PRESETS.index(current) < index:
+                return current  # already downgraded further by an earlier session
+            entry["preset"] = PRESETS[index - 1]
+            entry["downgrades"] = entry.get("downgrades", 0) + 1
+            entries[key] = entry
+            self._save(entries)
+            return entry["preset"]
+
+
+def _test_frames(width, height, count=8):
+    """Desktop-like content: small text on a flat background with a moving window."""
+    # Only needed for calibration, so importing this module stays cheap at startup
+    import numpy as np
+    import cv2
+    base = np.full((height, width, 3), 40, dtype=np.uint8)
+    line = "The quick brown fox jumps over the lazy dog 0123456789 " * 4
+    for y in range(18, height, 24):
+        cv2.putText(base, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (220, 220, 220), 1)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = width // 10 + i * width // 50
+        cv2.rectangle(frame, (x, height // 5), (x + width // 3, height * 3 // 5), (0, 120, 255), -1)
+        frames.append(frame.tobytes())
+    return frames
+
+
+def measure_preset(preset, width, height, fps, frames=None, seconds=2.0, crf=AUTO_CRF):
+    """
+    Encodes `seconds` of synthetic frames with libx264 as fast as possible.
+    :return: achieved frames per second, or 0.0 if ffmpeg failed
+    """
+    ffmpeg = get_ffmpeg_path()
+    if not ffmpeg:
+        return 0.0
+    frames = frames or _test_frames(width, height)
+    count = max(len(frames), int(seconds * fps))
+    cmd = [ffmpeg, "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+           "-framerate", f"{float(fps):g}", "-i", "pipe:0",
+           "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p", "-f", "null", "-"]
+    startupinfo = None
+    if platform.system() == "Windows":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    started = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                startupinfo=startupinfo)
+        for i in range(count):
+            proc.stdin.write(frames[i % len(frames)])
+        proc.stdin.close()
+        if proc.wait() != 0:
+            return 0.0
+    except (OSError, ValueError) as e:
+        print(f"Encoder calibration failed for {preset}: {e}")
+        return 0.0
+    return count / (time.perf_counter() - started)
+
+
+def calibrate(width, height, fps, seconds=2.0):
+    """
+    Finds the slowest (best compressing) libx264 preset that still encodes
+    width x height at `fps` with HEADROOM to spare. Presets are tried from
+    the fastest up and the search stops at the first one that falls short.
+    :return: cache entry {"preset": ..., "fps": {preset: measured fps}}
+    """
+    frames = _test_frames(width, height)
+    results = {}
+    chosen = PRESETS[0]
+    for preset in PRESETS:
+        achieved = measure_preset(preset, width, height, fps, frames, seconds)
+        results[preset] = round(achieved, 1)
+        if achieved < fps * HEADROOM:
+            break
+        chosen = preset
+    print(f"Encoder calibration {calibration_key(width, height, fps)}: {results} -> {chosen}")
+    return {"preset": chosen, "fps": results}
+
+
+def resolve_profile(quality, width, height, fps, cache=None, calibrate_missing=False):
+    """
+    EncoderProfile for the "quality" setting. For "Auto" the cached
+    calibration for this size and fps is used; on a miss the Medium preset is
+    returned, and the calibration is run first if `calibrate_missing` is set.
+    """
+    if quality in PROFILES:
+        preset, crf = PROFILES[quality]
+        return EncoderProfile(quality, preset, crf)
+    if quality != AUTO:
+        print(f"Unknown quality '{quality}', using Medium")
+        preset, crf = PROFILES["Medium"]
+        return EncoderProfile("Medium", preset, crf)
+
+    cache = cache or CalibrationCache()
+    key = calibration_key(width, height, fps)
+    entry = cache.get(key)
+    if entry is None and calibrate_missing:
+        entry = calibrate(width, height, fps)
+        cache.put(key, entry)
+    preset = entry["preset"] if entry else PROFILES["Medium"][0]
+    return EncoderProfile(AUTO, preset, AUTO_CRF)
+
+
+class EncodeWatchdog:
+    """
+    Watches a VideoRecorder's encode queue while recording. When the queue
+    stays at least `threshold` full for `patience` seconds the encoder is not
+    keeping up, and `on_backlog()` is called once.
+    """
+
+    def __init__(self, recorder, on_backlog, threshold=0.5, patience=3.0, interval=0.25):
+        self.recorder = recorder
+        self.on_backlog = on_backlog
+        self.threshold = threshold
+        self.patience = patience
+        self.interval = interval
+        self.triggered = False
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, name="encode-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _watch(self):
+        behind_since = None
+        while not self._stop.wait(self.interval):
+            backlog = self.recorder.encode_backlog()
+            self.peak = max(self.peak, backlog)
+            if backlog < self.threshold:
+                behind_since = None
+                continue
+            now = time.perf_counter()
+            if behind_since is None:
+                behind_since = now
+            elif now - behind_since >= self.patience:
+                self.triggered = True
+                self.on_backlog()
+                return
@@ -0,0 +1,300 @@
+import collections
+import os
+import platform
+import subprocess
+import threading
+import numpy as np
+import cv2
+
+from recorder.audio_writer import StreamingWavWriter
+from recorder.merger import get_ffmpeg_path
+from recorder.pipeline import FrameQueue, DROP_OLDEST, STOP
+
+
+class _VideoSink:
+    """cv2.VideoWriter-compatible handle that queues frames for the ring's JPEG encoder."""
+
+    def __init__(self, replay):
+        self._replay = replay
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self._replay._add_frame(frame)
+
+    def release(self):
+        pass  # the ring outlives the recorder so it can still be saved
+
+
+class _AudioSink:
+    """AudioRecorder sink that keeps int16 blocks in the ring."""
+
+    def __init__(self, replay):
+        self._replay = replay
+
+    def write(self, pcm):
+        self._replay._add_audio(pcm)
+
+    def close(self):
+        pass
+
+
+class ReplayBuffer:
+    """
+    Keeps the last `seconds` of a capture in memory for instant replays.
+
+    VideoRecorder writes into `.video` (frames on the fps grid) and
+    AudioRecorder into `.audio` (int16 blocks already aligned to the video
+    timeline), either as their sink or as a tap next to the recording's own
+    output. Call begin_session() before each capture that feeds the ring.
+    Frames are stored as JPEG; repeats of an unchanged frame share one
+    encoded copy. The oldest data is evicted once the span exceeds
+    `seconds` or the total size exceeds `max_bytes`.
+
+    Writing a frame only copies it into a queue of `queue_size` frames; the
+    JPEG encoding runs on the ring's own thread, so a tap never slows the
+    recording's encoder down. If that thread falls behind, the oldest
+    queued frame is dropped and the previous one is held in its slot.
+    close() stops the thread once nothing feeds the ring any more.
+
+    snapshot() only copies references under a lock, so saving never stalls
+    capture; the snapshot is encoded to MP4 later, off the capture threads.
+    """
+
+    def __init__(self, seconds=30.0, max_bytes=512 * 1024 * 1024, fps=30.0, samplerate=44100, channels=2,
+                 jpeg_quality=85, queue_size=8):
+        self.seconds = float(seconds)
+        self.max_bytes = int(max_bytes)
+        self.fps = float(fps)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.video = _VideoSink(self)
+        self.audio = _AudioSink(self)
+
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self._frames = collections.deque()  # (slot, jpeg bytes, counted)
+        self._blocks = collections.deque()  # (first sample, int16 block)
+        self._next_slot = 0
+        self._next_sample = 0
+        self._last_source = None
+        self._last_jpeg = None  # encoder thread only
+        self._ring_slot = 0  # next slot the encoder thread adds to the ring
+        self.video_bytes = 0
+        self.audio_bytes = 0
+        self.evicted_frames = 0
+        self.dropped_frames = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queued = 0  # frames handed to the encoder thread and not yet in the ring
+        self._pending = FrameQueue(queue_size, DROP_OLDEST, on_drop=self._on_drop)
+        self._worker = None
+
+    @property
+    def bytes_used(self):
+        return self.video_bytes + self.audio_bytes
+
+    def begin_session(self):
+        """
+        Lines the audio up with the video again before a new capture starts
+        feeding the ring, so replays spanning two sessions stay in sync.
+        """
+        with self._lock:
+            self._next_sample = int(round(self._next_slot / self.fps * self.samplerate))
+            self._last_source = None
+
+    def _add_frame(self, frame):
+        # The encoder repeats a held frame by passing the same buffer again; its
+        # buffers go back to a pool after writing, so anything new is copied
+        image = None if frame is self._last_source else frame.copy()
+        self._last_source = frame
+        with self._lock:
+            slot = self._next_slot
+            self._next_slot += 1
+            self._queued += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._encode_loop, name="replay-encode", daemon=True)
+                self._worker.start()
+        self._pending.put((slot, image))
+
+    def _on_drop(self, item):
+        with self._lock:
+            self._queued -= 1
+            self.dropped_frames += 1
+            self._idle.notify_all()
+
+    def _encode_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is STOP:
+                break
+            slot, image = item
+            jpeg, new = self._last_jpeg, False
+            if image is not None:
+                # BGRA frames come from recordings whose sink takes them unconverted (live mux)
+                if image.shape[2] == 4:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+                ok, encoded = cv2.imencode(".jpg", image, self._params)
+                if ok:
+                    jpeg, new = encoded.tobytes(), True
+            with self._lock:
+                if jpeg is not None:
+                    # Slots of dropped frames hold the previous frame
+                    if self._last_jpeg is not None:
+                        for gap in range(self._ring_slot, slot):
+                            self._frames.append((gap, self._last_jpeg, False))
+                    self._frames.append((slot, jpeg, new))
+                    self._ring_slot = slot + 1
+                    self._last_jpeg = jpeg
+                    if new:
+                        self.video_bytes += len(jpeg)
+                    self._evict()
+                self._queued -= 1
+                self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Waits until every frame written so far is in the ring (or was dropped).
+        :return: False if `timeout` expired first
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._queued == 0, timeout)
+
+    def close(self):
+        """Stops the encoder thread; the buffered contents can still be saved."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._pending.close()
+            worker.join()
+
+    def _add_audio(self, pcm):
+        block = np.array(pcm, dtype=np.int16, copy=True)
+        with self._lock:
+            self._blocks.append((self._next_sample, block))
+            self._next_sample += len(block)
+            self.audio_bytes += block.nbytes
+            self._evict()
+
+    def _evict(self):
+        first_slot = self._next_slot - int(round(self.seconds * self.fps))
+        while self._frames and (self._frames[0][0] < first_slot or self.bytes_used > self.max_bytes):
+            _, jpeg, counted = self._frames.popleft()
+            if counted:
+                self.video_bytes -= len(jpeg)
+            self.evicted_frames += 1
+        # Audio older than the oldest frame is never saved; the second bound
+        # caps the audio on its own while no video is arriving
+        oldest = self._frames[0][0] if self._frames else first_slot
+        first_sample = max(int(oldest / self.fps * self.samplerate),
+                           self._next_sample - int((self.seconds + 1.0) * self.samplerate))
+        while self._blocks and self._blocks[0][0] + len(self._blocks[0][1]) <= first_sample:
+            self.audio_bytes -= self._blocks.popleft()[1].nbytes
+
+    def snapshot(self, seconds=None):
+        """
+        Freezes the last `seconds` (default: all buffered) for saving.
+        :return: ReplaySnapshot, or None if nothing has been captured yet
+        """
+        with self._lock:
+            frames = list(self._frames)
+            blocks = list(self._blocks)
+        if not frames:
+            return None
+        last_slot = frames[-1][0]
+        if seconds:
+            first_slot = max(frames[0][0], last_slot + 1 - int(round(seconds * self.fps)))
+            frames = [frame for frame in frames if frame[0] >= first_slot]
+        first_slot = frames[0][0]
+
+        # Cut the audio to exactly the frames' time span, padding with silence where it is missing
+        start = int(round(first_slot / self.fps * self.samplerate))
+        end = int(round((last_slot + 1) / self.fps * self.samplerate))
+        audio = []
+        position = start
+        for first, block in blocks:
+            if first + len(block) <= position or first >= end:
+                continue
+            if first > position:
+                audio.append(np.zeros((first - position, self.channels), dtype=np.int16))
+                position = first
+            audio.append(block[position - first:end - first])
+            position = min(end, first + len(block))
+        return ReplaySnapshot([jpeg for _, jpeg, _ in frames], self.fps, audio, self.samplerate, self.channels)
+
+    def as_dict(self):
+        with self._lock:
+            frames = len(self._frames)
+            return {
+                "seconds": round(frames / self.fps, 2),
+                "frames": frames,
+                "video_mb": round(self.video_bytes / 1048576, 2),
+                "audio_mb": round(self.audio_bytes / 1048576, 2),
+                "evicted_frames": self.evicted_frames,
+                "dropped_frames": self.dropped_frames,
+            }
+
+
+class ReplaySnapshot:
+    """Frozen replay contents, written to MP4 by save()."""
+
+    def __init__(self, frames, fps, audio, samplerate, channels):
+        self.frames = frames  # JPEG bytes, one per frame slot
+        self.fps = fps
+        self.audio = audio  # int16 blocks, starting at the first frame
+        self.samplerate = samplerate
+        self.channels = channels
+
+    @property
+    def duration(self):
+        return len(self.frames) / self.fps
+
+    def save(self, output_path, video_args=None):
+        """
+        Encodes the snapshot to an MP4 (H.264 + AAC). Slow; run it off the capture threads.
+        :param video_args: ffmpeg video encoder options (EncoderProfile.video_args())
+        :return: True if successful, False otherwise
+        """
+        ffmpeg = get_ffmpeg_path()
+        if not ffmpeg:
+            print("Error: FFmpeg not found. Please install FFmpeg.")
+            return False
+
+        audio_path = None
+        if self.audio:
+            audio_path = os.path.splitext(output_path)[0] + "_replay.wav"
+            with StreamingWavWriter(audio_path, self.samplerate, self.channels) as wav:
+                for block in self.audio:
+                    wav.write(block)
+
+        cmd = [ffmpeg, "-y", "-loglevel", "error",
+               "-f", "image2pipe", "-c:v", "mjpeg", "-framerate", str(self.fps), "-i", "pipe:0"]
+        if audio_path:
+            cmd.extend(["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0",
+                        "-c:a", "aac", "-b:a", "192k"])
+        cmd.extend(video_args or ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"])
+        cmd.extend(["-movflags", "+faststart", output_path])
+
+        startupinfo = None
+        if platform.system() == "Windows":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        try:
+            print(f"Saving replay ({self.duration:.1f}s): {output_path}")
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo)
+            try:
+                for jpeg in self.frames:
+                    proc.stdin.write(jpeg)
+            except (BrokenPipeError, OSError):
+                pass  # ffmpeg exited early; its error is reported below
+            _, stderr = proc.communicate()
+            if proc.returncode != 0:
+                print(f"Replay save failed (code {proc.returncode}): {stderr.decode(errors='replace')}")
+                return False
+            return os.path.exists(output_path) and os.path.getsize(output_path) > 0
+        except Exception as e:
+            print(f"Error executing ffmpeg: {e}")
+            return False
+        finally:
+            if audio_path and os.path.exists(audio_path):
+                os.remove(audio_path)
@@ -0,0 +1,84 @@
+import numpy as np
+import cv2
+
+# Named output resolutions: the short side of the output, in pixels
+PRESETS = {
+    "2160p": 2160,
+    "4k": 2160,
+    "1440p": 1440,
+    "1080p": 1080,
+    "720p": 720,
+    "480p": 480,
+}
+
+
+def output_size(width, height, resolution):
+    """
+    Output frame size for a capture of width x height.
+
+    `resolution` is None/"Native", a preset such as "1080p" (short side of
+    the output, so portrait screens work too), a custom "1280x720" string or a
+    (width, height) tuple to fit inside. The aspect ratio is kept, the frame
+    is never upscaled and both sides are even (required by yuv420p encoders).
+    :return: (width, height)
+    """
+    scale = 1.0
+    if isinstance(resolution, str):
+        name = resolution.strip().lower()
+        if name in PRESETS:
+            scale = PRESETS[name] / min(width, height)
+        elif "x" in name:
+            box_w, box_h = (int(part) for part in name.split("x", 1))
+            scale = min(box_w / width, box_h / height)
+        elif name not in ("", "native", "original"):
+            raise ValueError(f"Unknown resolution: {resolution}")
+    elif resolution:
+        box_w, box_h = resolution
+        scale = min(box_w / width, box_h / height)
+
+    scale = min(scale, 1.0)
+    out_w = max(2, int(width * scale) // 2 * 2)
+    out_h = max(2, int(height * scale) // 2 * 2)
+    return out_w, out_h
+
+
+class Scaler:
+    """
+    Area downscaling from one frame size to another, for a single thread.
+
+    cv2's INTER_AREA is only fast for whole-number ratios (a 4K -> 1080p frame
+    takes a few ms, 4K -> 900p several times longer). Other ratios are first
+    shrunk by the largest whole factor with INTER_AREA into a reused buffer,
+    then finished with a bilinear pass of less than 2x, where bilinear does
+    not alias.
+    """
+
+    def __init__(self, src_shape, size):
+        """
+        :param src_shape: (height, width, channels) of the input frames
+        :param size: output (width, height)
+        """
+        height, width = src_shape[:2]
+        self.src_shape = tuple(src_shape)
+        self.size = tuple(size)
+        out_w, out_h = self.size
+        self.active = (out_w, out_h) != (width, height)
+
+        factor = min(width // out_w, height // out_h)
+        self.interpolation = cv2.INTER_AREA
+        self._mid = None
+        if width % out_w == 0 and height % out_h == 0 and width // out_w == height // out_h:
+            pass  # whole-number ratio: one INTER_AREA pass
+        elif factor >= 2 and width % factor == 0 and height % factor == 0:
+            shape = (height // factor, width // factor) + tuple(src_shape[2:])
+            self._mid = np.empty(shape, dtype=np.uint8)
+            self.interpolation = cv2.INTER_LINEAR
+        else:
+            self.interpolation = cv2.INTER_LINEAR if factor < 2 else cv2.INTER_AREA
+
+    def resize(self, src, dst=None):
+        """Scales `src` into `dst` (allocated if omitted) and returns it."""
+        if self._mid is not None:
+            cv2.resize(src, (self._mid.shape[1], self._mid.shape[0]), dst=self._mid, interpolation=cv2.INTER_AREA)
+            src = self._mid
+        return cv2.resize(src, self.size, dst=dst, interpolation=self.interpolation)
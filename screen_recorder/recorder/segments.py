@@ -0,0 +1,317 @@
+import bisect
+import os
+import queue
+import shutil
+import threading
+import time
+
+from recorder.audio_writer import StreamingWavWriter
+from recorder.merger import merge_audio_video, concat_segments
+
+# Tolerance when comparing timeline positions against boundaries (float rounding)
+EPSILON = 1e-6
+
+
+def segment_path(base, index):
+    """temp_video.avi -> temp_video_003.avi"""
+    root, ext = os.path.splitext(base)
+    return f"{root}_{index:03d}{ext}"
+
+
+class SegmentController:
+    """
+    Splits one recording into segments shared by the video and audio recorders.
+
+    Boundaries are positions on the session timeline (seconds of recorded
+    time), so both recorders cut at the same instant no matter how far behind
+    real time each of them is. With `seconds`, a boundary falls every N
+    seconds; with `max_bytes`, a recorder whose current file grows past the
+    limit requests one `lead` seconds ahead of the furthest recorder.
+
+    Each index is merged into its own MP4 in a background thread as soon as
+    every registered recorder has closed it. finish() only has the last
+    segment left to merge, then joins everything with the concat demuxer
+    without re-encoding.
+
+    `video_args` are the quality profile (see merge_audio_video). The video
+    recorder encodes each segment with it while recording, so merging a
+    segment only remuxes it; a segment in any other codec is re-encoded.
+    """
+
+    def __init__(self, seconds=None, max_bytes=None, lead=2.0, keep_temp=False, video_args=None):
+        self.seconds = float(seconds) if seconds else None
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self.lead = lead
+        self.keep_temp = keep_temp
+        self.video_args = video_args
+
+        self._boundaries = []
+        self._positions = {}
+        self._kinds = set()
+        self._parts = {}  # index -> {kind: (path, start)}
+        self._submitted = set()
+        self._outputs = {}  # index -> merged segment path, or None if the merge failed
+        self._jobs = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.merge_times = []
+
+    @property
+    def enabled(self):
+        return bool(self.seconds or self.max_bytes)
+
+    def register(self, kind):
+        """Called by a recorder at start; a segment is merged once every registered kind has closed it."""
+        with self._lock:
+            self._kinds.add(kind)
+
+    def _extend(self, position):
+        # Lazily generate the periodic boundaries up to one period past `position`
+        if not self.seconds:
+            return
+        last = self._boundaries[-1] if self._boundaries else 0.0
+        while last <= position + self.seconds:
+            last = (int(last / self.seconds + EPSILON) + 1) * self.seconds
+            if not self._boundaries or last > self._boundaries[-1] + EPSILON:
+                self._boundaries.append(last)
+
+    def segment_at(self, kind, position):
+        """Index of the segment that timeline position `position` (seconds) belongs to."""
+        with self._lock:
+            if position > self._positions.get(kind, float("-inf")):
+                self._positions[kind] = position
+            self._extend(position)
+            return bisect.bisect_right(self._boundaries, position + EPSILON)
+
+    def next_boundary(self, position):
+        """First boundary after `position`, or None."""
+        with self._lock:
+            self._extend(position)
+            i = bisect.bisect_right(self._boundaries, position + EPSILON)
+            return self._boundaries[i] if i < len(self._boundaries) else None
+
+    def request_split(self):
+        """Size limit reached: cut every stream `lead` seconds past the furthest recorder."""
+        with self._lock:
+            furthest = max(self._positions.values(), default=0.0)
+            cut = furthest + self.lead
+            if any(furthest + EPSILON < b <= cut + EPSILON for b in self._boundaries):
+                return  # a cut is already pending
+            bisect.insort(self._boundaries, cut)
+
+    def over_limit(self, size):
+        return self.max_bytes is not None and size >= self.max_bytes
+
+    def closed(self, kind, index, path, start):
+        """
+        A recorder finished writing segment `index`.
+        :param start: timeline position of the segment's first frame/sample
+        """
+        with self._lock:
+            self._parts.setdefault(index, {})[kind] = (path, start)
+            ready = set(self._parts[index]) >= self._kinds and index not in self._submitted
+            if ready:
+                self._submitted.add(index)
+        if ready:
+            self._submit(index)
+
+    def _submit(self, index):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name="segment-merge", daemon=True)
+            self._worker.start()
+        self._jobs.put(index)
+
+    def _work(self):
+        while True:
+            index = self._jobs.get()
+            try:
+                self._merge(index)
+            finally:
+                self._jobs.task_done()
+
+    def _merge(self, index):
+        parts = self._parts[index]
+        video = parts.get("video")
+        if video is None:
+            print(f"Segment {index}: no video, skipped")
+            self._outputs[index] = None
+            return
+        video_path, video_start = video
+        audio_path, audio_start = parts.get("audio", (None, video_start))
+        output = os.path.splitext(video_path)[0] + ".mp4"
+        started = time.perf_counter()
+        ok = merge_audio_video(video_path, audio_path or "", output, keep_temp=self.keep_temp,
+                               audio_offset=audio_start - video_start, video_args=self.video_args)
+        elapsed = time.perf_counter() - started
+        self.merge_times.append(elapsed)
+        print(f"Segment {index} merged in {elapsed:.2f}s: {output if ok else 'FAILED'}")
+        self._outputs[index] = output if ok else None
+
+    def finish(self, output_path):
+        """
+        Merges whatever is left and concatenates all segments into output_path.
+        Call after both recorders have stopped.
+        :return: True if successful, False otherwise
+        """
+        started = time.perf_counter()
+        with self._lock:
+            # The video recorders stop first, so audio can run past the last video frame
+            # into one more segment; that tail has nothing to play against and is dropped
+            last_video = max((index for index, parts in self._parts.items() if "video" in parts), default=None)
+            tail = [index for index in self._parts if last_video is not None and index > last_video]
+            for index in tail:
+                self._drop(self._parts.pop(index))
+            leftover = [index for index in sorted(self._parts) if index not in self._submitted]
+            self._submitted.update(leftover)
+        for index in leftover:
+            self._submit(index)
+        self._jobs.join()
+
+        outputs = [self._outputs.get(index) for index in sorted(self._parts)]
+        if not outputs or any(path is None for path in outputs):
+            print(f"Error: {outputs.count(None)} of {len(outputs)} segments failed to merge")
+            return False
+        if len(outputs) == 1:
+            shutil.move(outputs[0], output_path)
+            ok = True
+        else:
+            ok = concat_segments(outputs, output_path)
+            if ok and not self.keep_temp:
+                for path in outputs:
+                    os.remove(path)
+        print(f"Finalized {len(outputs)} segment(s) in {time.perf_counter() - started:.2f}s")
+        return ok
+
+    def _drop(self, parts):
+        if self.keep_temp:
+            return
+        for path, _ in parts.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "segments": len(self._parts),
+                "merged": sum(1 for path in self._outputs.values() if path),
+                "avg_merge_s": round(sum(self.merge_times) / len(self.merge_times), 3) if self.merge_times else 0.0,
+            }
+
+
+class SegmentedVideoWriter:
+    """
+    cv2.VideoWriter-compatible writer that starts a new file whenever the
+    written position crosses a segment boundary. The finished file is
+    released on a background thread (an encoding writer waits for ffmpeg to
+    flush), so frames keep flowing into the next one meanwhile.
+    :param open_writer: callable(path) returning an opened writer for one segment
+    """
+
+    def __init__(self, controller, base, fps, open_writer):
+        self.controller = controller
+        self.base = base
+        self.fps = float(fps)
+        self.frames = 0
+        self.index = 0
+        self.start = 0.0
+        self.path = segment_path(base, 0)
+        self._open = open_writer
+        self._closing = []
+        self._check_every = max(1, int(round(self.fps)))  # size checks once per second of video
+        self._out = open_writer(self.path)
+
+    def isOpened(self):
+        return self._out is not None and self._out.isOpened()
+
+    def write(self, frame):
+        position = self.frames / self.fps
+        index = self.controller.segment_at("video", position)
+        if index != self.index:
+            self._rotate(index, position)
+        elif self.controller.max_bytes and self.frames % self._check_every == 0 \
+                and self.controller.over_limit(os.path.getsize(self.path)):
+            self.controller.request_split()
+        self._out.write(frame)
+        self.frames += 1
+
+    def _rotate(self, index, position):
+        closer = threading.Thread(target=self._close, args=(self._out, self.index, self.path, self.start),
+                                  name="segment-close", daemon=True)
+        closer.start()
+        self._closing = [thread for thread in self._closing if thread.is_alive()] + [closer]
+        self.index = index
+        self.start = position
+        self.path = segment_path(self.base, index)
+        self._out = self._open(self.path)
+        if not self._out.isOpened():
+            raise IOError(f"Could not open video segment {self.path}")
+
+    def _close(self, out, index, path, start):
+        out.release()
+        self.controller.closed("video", index, path, start)
+
+    def release(self):
+        if self._out is None:
+            return
+        self._out.release()
+        self._out = None
+        # Every segment must be closed before the controller is asked to finish
+        for closer in self._closing:
+            closer.join()
+        self._closing = []
+        self.controller.closed("video", self.index, self.path, self.start)
+
+
+class SegmentedWavWriter:
+    """
+    StreamingWavWriter-compatible writer that splits blocks exactly at segment
+    boundaries, so every audio segment starts on the same timeline position
+    as its video segment.
+    :param start: timeline position of the first sample (SessionClock.audio_offset())
+    """
+
+    def __init__(self, controller, base, samplerate, channels, start=0.0):
+        self.controller = controller
+        self.base = base
+        self.samplerate = samplerate
+        self.channels = channels
+        self.origin = start
+        self.samples = 0
+        self.index = controller.segment_at("audio", start)
+        self.start = start
+        self.path = segment_path(base, self.index)
+        self._wav = StreamingWavWriter(self.path, samplerate, channels)
+
+    def write(self, pcm):
+        while len(pcm):
+            position = self.origin + self.samples / self.samplerate
+            index = self.controller.segment_at("audio", position)
+            if index != self.index:
+                self._rotate(index, position)
+            take = len(pcm)
+            boundary = self.controller.next_boundary(position)
+            if boundary is not None:
+                until = int(round((boundary - self.origin) * self.samplerate)) - self.samples
+                take = min(take, max(1, until))
+            self._wav.write(pcm[:take])
+            self.samples += take
+            pcm = pcm[take:]
+        if self.controller.over_limit(self._wav.data_bytes):
+            self.controller.request_split()
+
+    def _rotate(self, index, position):
+        self._wav.close()
+        self.controller.closed("audio", self.index, self.path, self.start)
+        self.index = index
+        self.start = position
+        self.path = segment_path(self.base, index)
+        self._wav = StreamingWavWriter(self.path, self.samplerate, self.channels)
+
+    def close(self):
+        if self._wav is None:
+            return
+        self._wav.close()
+        self._wav = None
+        self.controller.closed("audio", self.index, self.path, self.start)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class SessionClock:
+    """
+    Monotonic time reference shared by the recorders of one session.
+
+    All times are time.perf_counter() values. The origin is the session's
+    time zero: the video timeline starts there, and every other event (first
+    frame, stream opened, first audio sample at the ADC) is recorded as an
+    offset from it, so the audio can be placed exactly on the video timeline
+    instead of assuming both streams started together.
+    """
+
+    # Event names
+    VIDEO_CAPTURE_START = "video_capture_start"
+    VIDEO_FIRST_FRAME = "video_first_frame"
+    AUDIO_STREAM_OPEN = "audio_stream_open"
+    AUDIO_FIRST_SAMPLE = "audio_first_sample"
+
+    def __init__(self):
+        self.origin = None
+        self.audio_latency = 0.0  # processing delay added in front of the audio (e.g. limiter look-ahead)
+        self._events = {}
+        self._lock = threading.Lock()
+
+    @property
+    def started(self):
+        return self.origin is not None
+
+    def start(self):
+        with self._lock:
+            self.origin = time.perf_counter()
+            self._events = {}
+
+    def now(self):
+        """Seconds since the origin."""
+        return time.perf_counter() - self.origin
+
+    def mark(self, event, when=None):
+        """
+        Records the first occurrence of an event.
+        :param when: perf_counter() time of the event, defaults to now
+        :return: True if this call recorded the event
+        """
+        if when is None:
+            when = time.perf_counter()
+        with self._lock:
+            if event in self._events:
+                return False
+            self._events[event] = when
+            return True
+
+    def elapsed(self, event):
+        """Seconds from the origin to an event, or None if it has not happened."""
+        with self._lock:
+            when = self._events.get(event)
+        if when is None or self.origin is None:
+            return None
+        return when - self.origin
+
+    def audio_offset(self):
+        """
+        Where the first sample of the audio output belongs on the video
+        timeline, in seconds (positive: the audio starts after the video).
+        """
+        first = self.elapsed(self.AUDIO_FIRST_SAMPLE)
+        if first is None:
+            return 0.0
+        return first - self.audio_latency
+
+    def as_dict(self):
+        with self._lock:
+            events = dict(self._events)
+        stats = {name: round((when - self.origin) * 1000, 3) for name, when in events.items()} \
+            if self.origin is not None else {}
+        stats["audio_latency_ms"] = round(self.audio_latency * 1000, 3)
+        stats["av_skew_ms"] = round(self.audio_offset() * 1000, 3)
+        return stats
@@ -1,31 +1,105 @@
 import cv2
 import numpy as np
-import mss
+import os
 import time
 import threading
-import platform
-import os
+import heapq
+import json
 
-HAS_PYAUTOGUI = False
-try:
-    # Check for DISPLAY on Linux to avoid immediate crash on import
-    if platform.system() == "Linux" and "DISPLAY" not in os.environ:
-        raise ImportError("No DISPLAY")
-    
-    import pyautogui
-    HAS_PYAUTOGUI = True
-except (ImportError, KeyError, Exception):
-    HAS_PYAUTOGUI = False
+from recorder.change_detector import ChangeDetector
+from recorder.cursor import CursorOverlay, CursorSampler, position_reader
+from recorder.frame_sources import MssSource, list_monitors
+from recorder.live_muxer import EncodingWriter
+from recorder.merger import get_ffmpeg_path
+from recorder.session_clock import SessionClock
+from recorder.segments import SegmentedVideoWriter
+from recorder.scaling import Scaler, output_size
+from recorder.pipeline import (Frame, FramePool, FrameQueue, FrameScheduler, FrameTimeline, StageStats, STOP,
+                               DROP_OLDEST, timed)
 
 class VideoRecorder:
-    def __init__(self, filename="temp_video.avi", fps=30.0, resolution=None, region=None, codec="XVID", show_cursor=True):
+    def __init__(self, filename="temp_video.avi", fps=30.0, resolution=None, region=None, codec="XVID", show_cursor=True,
+                 capture_queue_size=4, encode_queue_size=8, convert_workers=2, drop_policy=DROP_OLDEST, sink=None,
+                 skip_unchanged=True, static_keepalive=1.0, clock=None,
+                 segments=None, monitor=1, source=None, cursor=None, cursor_rate=120.0, highlight_clicks=True,
+                 taps=None, video_args=None, stats_path=None):
+        """
+        Capture runs as a pipeline: a grab thread, `convert_workers` conversion/overlay
+        threads and one encoder thread, joined by bounded queues. The grab thread never
+        waits for the encoder; when the capture queue is full `drop_policy` decides
+        which frame is discarded. The encode queue always applies back-pressure.
+
+        With `video_args` (EncoderProfile.video_args()) and ffmpeg available,
+        the output is encoded with them while recording and written as
+        Matroska: `filename` gets the .mkv extension when recording starts,
+        and the merge only has to copy the stream. Otherwise frames go to a
+        cv2.VideoWriter with `codec`.
+
+        With `stats_path`, frame_stats() is written there as JSON when the
+        recording finishes.
+
+        `sink` replaces the cv2.VideoWriter with any object offering the same
+        write()/release()/isOpened() methods (e.g. LiveMuxer.video). A sink with
+        `accepts_bgra = True` gets the captured BGRA frames without conversion.
+        `taps` are extra sinks (e.g. ReplayBuffer.video) that get every frame
+        written to the output, on the same grid; they are never released, so
+        they can outlive the recording.
+
+        Frames are taken from the source buffer without copying and converted
+        into preallocated buffers that the encoder hands back after writing, so
+        the pipeline itself does no per-frame allocation in steady state.
+
+        With `skip_unchanged`, frames identical to the last frame that reached
+        the convert stage (and with the cursor in the same place) are not
+        converted or encoded at all; the encoder holds the previous frame
+        instead. Frames the capture queue drops never become that reference.
+        One frame is still emitted every `static_keepalive` seconds so live
+        outputs keep flowing.
+
+        `clock` is the SessionClock shared with the audio recorder. The video
+        timeline starts at its origin; without one, the recorder starts its own
+        when capture begins.
+
+        `segments` is a SegmentController shared with the audio recorder; when
+        it is enabled, the output rotates to a new file at every boundary.
+
+        `monitor` is the mss monitor index to record when no `region` is
+        given: 1..N for a single display, 0 for the whole virtual desktop.
+        To record several displays at once, run one recorder per monitor
+        with the same clock; each grabs on its own thread, so the displays
+        are captured in parallel and share one timeline.
+
+        `source` is the FrameSource to record (see frame_sources); by default
+        an MssSource for `monitor`/`region`. Everything after the grab is
+        independent of where frames come from.
+
+        `resolution` scales the output ("1080p", "720p", "1280x720", None for
+        native; see scaling.output_size). Scaling happens in the convert
+        workers, before colour conversion and the cursor overlay, so neither
+        the grab thread nor the encoder ever touches full-size frames.
+
+        The cursor is polled by a CursorSampler thread at `cursor_rate` Hz; the
+        grab thread only reads its latest sample and attaches it to the frame,
+        and the convert workers alpha-blend a cursor sprite (plus a click ring
+        with `highlight_clicks`) at that position. Pass `cursor` to share one
+        sampler between recorders.
+        """
         self.filename = filename
         self.fps = float(fps)
         self.codec = codec
         self.show_cursor = show_cursor
+        self.highlight_clicks = highlight_clicks
+        self.sink = sink
+        self.taps = list(taps or [])
+        self.video_args = video_args
+        self.live_encoding = False
+        self.stats_path = stats_path
+        self.clock = clock
+        self.segments = segments
         
         self.region = region  # (left, top, width, height)
         self.resolution = resolution
+        self.monitor_index = int(monitor)
         
         self.recording = False
         self.paused = False
@@ -33,29 +107,58 @@ class VideoRecorder:
         self.start_time = None
         self.elapsed_time = 0
         self._thread = None
-        self.sct = None  # Will be created in recording thread
+        self._workers = []
+        self._encoder = None
+
+        self.capture_queue_size = capture_queue_size
+        self.encode_queue_size = encode_queue_size
+        self.convert_workers = max(1, int(convert_workers))
+        self.drop_policy = drop_policy
+        # Per-stage timings with latency histograms; "grab", "cursor" and
+        # "write" time single calls inside the capture, convert and encode stages
+        self.stats = {
+            "grab": StageStats("grab"),
+            "capture": StageStats("capture", capture_queue_size),
+            "convert": StageStats("convert"),
+            "cursor": StageStats("cursor"),
+            "encode": StageStats("encode", encode_queue_size),
+            "write": StageStats("write"),
+        }
+        self._dropped_seqs = set()
+        self._dropped_lock = threading.Lock()
+        self._capture_queue = None
+        self._encode_queue = None
+        self._end_pts = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.scheduler = None
+
+        self.skip_unchanged = skip_unchanged
+        self.static_keepalive = static_keepalive
+        self.change_detector = ChangeDetector()
+        self.elided_frames = 0
+        self._last_emit = None
+        self._last_cursor = None
+        self._accepted_seq = -1
+        self._accept_lock = threading.Lock()
+
+        if cursor is None and show_cursor:
+            position = position_reader()
+            if position is not None:
+                cursor = CursorSampler(cursor_rate, position=position)
+        self.cursor = cursor if show_cursor else None
         
-        # Get monitor info for dimensions (temporary mss instance)
-        with mss.mss() as temp_sct:
-            if self.region:
-                self.monitor = {
-                    "top": int(self.region[1]),
-                    "left": int(self.region[0]),
-                    "width": int(self.region[2]),
-                    "height": int(self.region[3])
-                }
-            else:
-                # Full screen - monitor 1 usually
-                monitor = temp_sct.monitors[1]
-                self.monitor = {
-                    "top": monitor["top"],
-                    "left": monitor["left"],
-                    "width": monitor["width"],
-                    "height": monitor["height"]
-                }
+        if source is None:
+            source = MssSource(monitor=self.monitor_index, region=region)
+        self.source = source
+        self.monitor_index = getattr(source, "monitor_index", self.monitor_index)
+        self.monitor = source.monitor
 
         self.width = self.monitor["width"]
         self.height = self.monitor["height"]
+        # Expected size of the encoded frames (the real one comes from the first grab)
+        self.output_width, self.output_height = output_size(self.width, self.height, resolution)
+        self.cursor_overlay = CursorOverlay(self.monitor, highlight_clicks)
         
     def start(self):
         if self.recording:
@@ -63,7 +166,25 @@ class VideoRecorder:
             
         self.recording = True
         self.stop_event.clear()
-        self._thread = threading.Thread(target=self._record)
+        self._pool = None
+        self._dropped_seqs = set()
+        self._capture_queue = FrameQueue(self.capture_queue_size, self.drop_policy, on_drop=self._on_capture_drop)
+        self._encode_queue = FrameQueue(self.encode_queue_size)
+        self.live_encoding = bool(self.video_args) and self.sink is None and get_ffmpeg_path() is not None
+        if self.live_encoding:
+            self.filename = os.path.splitext(self.filename)[0] + ".mkv"
+        if self._segmented():
+            self.segments.register("video")
+
+        self._encoder = threading.Thread(target=self._encode_loop, name="video-encode")
+        self._encoder.start()
+        self._workers = [threading.Thread(target=self._convert_loop, name=f"video-convert-{i}")
+                         for i in range(self.convert_workers)]
+        for worker in self._workers:
+            worker.start()
+        if self.cursor is not None:
+            self.cursor.start()
+        self._thread = threading.Thread(target=self._record, name=f"video-capture-{self.monitor_index}")
         self._thread.start()
         
     def stop(self):
@@ -73,9 +194,19 @@ class VideoRecorder:
         self.stop_event.set()
         if self._thread and self._thread.is_alive():
             self._thread.join()
+
+        # Drain the pipeline stage by stage so every captured frame gets encoded
+        self._capture_queue.close(len(self._workers))
+        for worker in self._workers:
+            worker.join()
+        self._encode_queue.close()
+        if self._encoder:
+            self._encoder.join()
+        if self.cursor is not None:
+            self.cursor.stop()
         
         self.recording = False
-        # sct is closed inside _record thread
+        # the source is closed inside the _record thread
 
     def pause(self):
         self.paused = True
@@ -84,78 +215,331 @@ class VideoRecorder:
         self.paused = False
         
     def _record(self):
-        # Create mss instance inside the recording thread to avoid threading issues
-        self.sct = mss.mss()
-        
-        # Use XVID codec which is more reliable
-        fourcc = cv2.VideoWriter_fourcc(*'XVID')
-        out = cv2.VideoWriter(self.filename, fourcc, self.fps, (self.width, self.height))
-        
-        if not out.isOpened():
-            print(f"Error: Could not open video writer with codec {self.codec}")
-            self.sct.close()
-            return
+        """Grab thread: only captures and enqueues, never converts or encodes."""
+        # Sources open in the recording thread (mss handles are thread-bound)
+        self.source.open()
         
-        frame_time = 1.0 / self.fps
-        frame_count = 0
+        seq = 0
+        stats = self.stats["capture"]
+        grab_stats = self.stats["grab"]
         
         self.start_time = time.time()
+        if self.clock is None:
+            self.clock = SessionClock()
+        if not self.clock.started:
+            self.clock.start()
+        self.clock.mark(SessionClock.VIDEO_CAPTURE_START)
+        # Frame timestamps are monotonic and exclude paused time, like the audio stream
+        clock_start = self.clock.origin
+        paused_total = 0.0
+        pause_started = None
+        # Grabs are due on the session timeline's frame grid, shifted by any paused time
+        self.scheduler = FrameScheduler(self.fps, clock_start)
+        self.scheduler.resync()
+        self._last_emit = None
+        self._last_cursor = None
+        self._accepted_seq = -1
+        self.change_detector.reset()
+        self.elided_frames = 0
         
         try:
             while not self.stop_event.is_set():
-                loop_start = time.time()
+                if self.paused:
+                    if pause_started is None:
+                        pause_started = time.perf_counter()
+                    self.stop_event.wait(self.scheduler.period)
+                    continue
+                if pause_started is not None:
+                    paused = time.perf_counter() - pause_started
+                    paused_total += paused
+                    self.scheduler.shift(paused)
+                    pause_started = None
                 
-                if not self.paused:
-                    # Capture frame
-                    img = self.sct.grab(self.monitor)
-                    frame = np.array(img)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    
-                    # Draw cursor
-                    if self.show_cursor and HAS_PYAUTOGUI:
-                        self._draw_cursor(frame)
-
-                    out.write(frame)
+                self.scheduler.wait(self.stop_event)
+                if self.stop_event.is_set():
+                    break
+                grab_start = time.perf_counter()
+                data = self.source.grab()
+                if data is None:
+                    print("Frame source exhausted, stopping capture")
+                    self.stop_event.set()
+                    break
+                timed(grab_stats, grab_start)
+                self.clock.mark(SessionClock.VIDEO_FIRST_FRAME, grab_start)
+                pts = grab_start - clock_start - paused_total
+
+                cursor = self.cursor.latest() if self.cursor is not None else None
+
+                if self._is_unchanged(data, grab_start, cursor):
+                    # Identical to the previous frame: the encoder extends that one
+                    self.elided_frames += 1
+                    timed(stats, grab_start)
+                else:
+                    frame = Frame(seq, grab_start, data, pts, cursor)
+                    seq += 1
+                    if not self._capture_queue.put(frame):
+                        stats.record_drop()
+                    timed(stats, grab_start, self._capture_queue.qsize())
+                self.scheduler.done(grab_start)
+        finally:
+            end = pause_started if pause_started is not None else time.perf_counter()
+            self._end_pts = end - clock_start - paused_total
+            self.source.close()
+
+    def _is_unchanged(self, data, now, sample):
+        """True if `data` can be elided: same pixels and cursor as the last accepted frame."""
+        if not self.skip_unchanged:
+            return False
+        # The reference only moves in _accept(), once a frame is past the capture queue
+        changed = self.change_detector.update(data, accept=False)
+        cursor = self.cursor_overlay.state(sample, now)
+        if changed or cursor != self._last_cursor or self._last_emit is None \
+                or now - self._last_emit >= self.static_keepalive:
+            self._last_emit = now
+            return False
+        return True
+
+    def _accept(self, frame):
+        """A convert worker took `frame` (still raw): it will be encoded, so later frames are compared to it."""
+        if not self.skip_unchanged:
+            return
+        with self._accept_lock:
+            # Workers run in parallel; only a newer frame replaces the reference
+            if frame.seq > self._accepted_seq:
+                self._accepted_seq = frame.seq
+                self.change_detector.accept(frame.data)
+                self._last_cursor = self.cursor_overlay.state(frame.cursor, frame.captured)
+
+    def _on_capture_drop(self, frame):
+        # Remember dropped sequence numbers so the encoder does not wait for them
+        with self._dropped_lock:
+            self._dropped_seqs.add(frame.seq)
+
+    def _passthrough(self):
+        return getattr(self.sink, "accepts_bgra", False)
+
+    def _get_pool(self, shape):
+        with self._pool_lock:
+            if self._pool is None or self._pool.shape != shape:
+                # Enough buffers for every frame that can be in flight after conversion
+                count = self.encode_queue_size + 2 * self.convert_workers + 2
+                self._pool = FramePool(shape, count)
+            return self._pool
+
+    def _convert_loop(self):
+        """Conversion/overlay worker: scaling, BGRA -> BGR (or BGRA passthrough) plus cursor."""
+        stats = self.stats["convert"]
+        cursor_stats = self.stats["cursor"]
+        passthrough = self._passthrough()
+        draw_cursor = self.cursor is not None
+        scaler = None
+        scaled = None  # this worker's BGRA buffer at output size
+        while True:
+            frame = self._capture_queue.get()
+            if frame is STOP:
+                break
+            started = time.perf_counter()
+            self._accept(frame)
+            raw = frame.data
+            if scaler is None or scaler.src_shape != raw.shape:
+                # Sized from the frame, which can differ from the monitor size on HiDPI screens
+                scaler = Scaler(raw.shape, output_size(raw.shape[1], raw.shape[0], self.resolution))
+                scaled = None
+            width, height = scaler.size
+            if scaler.active and passthrough:
+                pool = self._get_pool((height, width, 4))
+                frame.data = scaler.resize(raw, pool.acquire())
+                frame.pool = pool
+            elif not passthrough:
+                if scaler.active:
+                    if scaled is None:
+                        scaled = np.empty((height, width, raw.shape[2]), dtype=np.uint8)
+                    raw = scaler.resize(raw, scaled)
+                pool = self._get_pool((height, width, 3))
+                frame.data = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=pool.acquire())
+                frame.pool = pool
+            elif draw_cursor:
+                # The change detector keeps the raw frame as its reference, so
+                # the overlay goes onto a pooled copy instead of the source buffer
+                pool = self._get_pool((height, width, 4))
+                frame.data = pool.acquire()
+                np.copyto(frame.data, raw)
+                frame.pool = pool
+            
+            # Draw cursor
+            if draw_cursor:
+                cursor_started = time.perf_counter()
+                self.cursor_overlay.draw(frame.data, frame.cursor, frame.captured)
+                timed(cursor_stats, cursor_started)
+
+            timed(stats, started)
+            self._encode_queue.put(frame)
+
+    def _segmented(self):
+        return self.sink is None and self.segments is not None and self.segments.enabled
+
+    def _video_writer(self, frame, path):
+        if self.live_encoding:
+            return EncodingWriter(path, self.fps, self.video_args)
+        # Use XVID codec which is more reliable
+        fourcc = cv2.VideoWriter_fourcc(*'XVID')
+        # Size comes from the first frame, which can differ from the monitor size on HiDPI screens
+        return cv2.VideoWriter(path, fourcc, self.fps, (frame.shape[1], frame.shape[0]))
+
+    def _open_writer(self, frame):
+        if self.sink is not None:
+            out = self.sink
+        elif self._segmented():
+            out = SegmentedVideoWriter(self.segments, self.filename, self.fps,
+                                       lambda path: self._video_writer(frame, path))
+        else:
+            out = self._video_writer(frame, self.filename)
+        
+        if not out.isOpened():
+            print(f"Error: Could not open video writer with codec {self.codec}")
+            return None
+        return out
+
+    def _encode_loop(self):
+        """Encoder thread: writes converted frames in capture order, placed by timestamp."""
+        out = None
+        stats = self.stats["encode"]
+        write_stats = self.stats["write"]
+        pending = []  # heap of (seq, frame) waiting for earlier frames
+        next_seq = 0
+        frame_count = 0
+        written = 0
+        timeline = FrameTimeline(self.fps)
+        last = None
+
+        def write(data, count):
+            nonlocal written
+            for _ in range(count):
+                write_started = time.perf_counter()
+                out.write(data)
+                timed(write_stats, write_started)
+                for tap in self.taps:
+                    tap.write(data)
+            written += count
+
+        def flush(final=False):
+            nonlocal next_seq, frame_count, last
+            while pending:
+                seq = pending[0][0]
+                if seq != next_seq:
+                    with self._dropped_lock:
+                        skipped = next_seq in self._dropped_seqs
+                        self._dropped_seqs.discard(next_seq)
+                    if skipped or final:
+                        next_seq += 1
+                        continue
+                    break
+                _, frame = heapq.heappop(pending)
+                next_seq = seq + 1
+                repeats, copies = timeline.place(frame.pts)
+                started = time.perf_counter()
+                if repeats:
+                    # Nothing new was captured for these slots: hold the previous frame
+                    write(last.data, repeats)
+                    stats.record_duplicate(repeats)
+                if copies:
+                    write(frame.data, copies)
                     frame_count += 1
-                    
-                # Maintain FPS - wait to match target frame time
-                process_time = time.time() - loop_start
-                wait_time = frame_time - process_time
-                if wait_time > 0:
-                    time.sleep(wait_time)
+                else:
+                    # Slot already written; keep it as the frame to repeat next
+                    stats.record_drop()
+                if last is not None:
+                    last.release()
+                last = frame
+                timed(stats, started, self._encode_queue.qsize())
+
+        try:
+            while True:
+                frame = self._encode_queue.get()
+                if frame is STOP:
+                    break
+                if out is None:
+                    out = self._open_writer(frame.data)
+                    if out is None:
+                        self.stop_event.set()
+                        # Keep draining so the converters never block on a full queue
+                        while self._encode_queue.get() is not STOP:
+                            pass
+                        return
+                heapq.heappush(pending, (frame.seq, frame))
+                flush()
+            flush(final=True)
+            # Hold the last frame until the moment capture stopped
+            if last is not None and self._end_pts is not None:
+                repeats = timeline.pad(self._end_pts)
+                write(last.data, repeats)
+                stats.record_duplicate(repeats)
         finally:
-            out.release()
-            self.sct.close()
+            if last is not None:
+                last.release()
+            if out is not None:
+                out.release()
+            elif self.sink is not None:
+                self.sink.release()
             
             # Calculate actual FPS
-            total_time = time.time() - self.start_time
+            total_time = time.time() - self.start_time if self.start_time else 0
             self.actual_fps = frame_count / total_time if total_time > 0 else self.fps
             self.frame_count = frame_count
             self.total_time = total_time
-            print(f"Video recording complete: {frame_count} frames in {total_time:.1f}s (actual FPS: {self.actual_fps:.1f})")
-            
-            # Save actual FPS to companion file for FFmpeg
-            fps_file = self.filename + ".fps"
-            with open(fps_file, 'w') as f:
-                f.write(f"{self.actual_fps:.2f}")
+            self.written_frames = written
+            print(f"Video recording complete: {frame_count} frames in {total_time:.1f}s (actual FPS: {self.actual_fps:.1f}, {written} written)")
+            if self.stats_path:
+                self._write_frame_stats()
+
+    def encode_backlog(self):
+        """Fraction of the encode queue in use (0..1), safe to call while recording."""
+        queue = self._encode_queue
+        return queue.qsize() / queue.maxsize if queue is not None else 0.0
+
+    def frame_stats(self):
+        """Cadence summary of the finished recording: what was captured, and how each output slot was filled."""
+        capture = self.stats["capture"].as_dict()
+        encode = self.stats["encode"].as_dict()
+        schedule = self.scheduler.as_dict() if self.scheduler else {}
+        return {
+            "target_fps": self.fps,
+            "actual_fps": round(getattr(self, "actual_fps", 0.0), 3),
+            "duration": round(getattr(self, "total_time", 0.0), 3),
+            "written": getattr(self, "written_frames", 0),
+            "unique": getattr(self, "frame_count", 0),
+            "duplicated": encode["duplicated"],
+            "elided": self.elided_frames,
+            "late": schedule.get("late", 0),
+            "skipped": schedule.get("skipped", 0),
+            "dropped": capture["dropped"] + encode["dropped"],
+            "max_lateness_ms": schedule.get("max_lateness_ms", 0.0),
+        }
 
-    def _draw_cursor(self, frame):
+    def _write_frame_stats(self):
+        """Writes frame_stats() to stats_path."""
         try:
-            # Get absolute cursor position
-            x, y = pyautogui.position()
-            
-            # Adjust to relative if region recording
-            rel_x = x - self.monitor["left"]
-            rel_y = y - self.monitor["top"]
-            
-            # Check bounds
-            if 0 <= rel_x < self.width and 0 <= rel_y < self.height:
-                # Draw a simple circle or arrow
-                # Simple red circle with black outline
-                cv2.circle(frame, (rel_x, rel_y), 5, (0, 0, 255), -1) 
-                cv2.circle(frame, (rel_x, rel_y), 5, (0, 0, 0), 1)
-        except Exception:
-            pass # Fail silently if cursor fetch fails
+            with open(self.stats_path, 'w') as f:
+                json.dump(self.frame_stats(), f, indent=4)
+        except OSError as e:
+            print(f"Error writing frame stats: {e}")
+
+    def get_stats(self, histograms=False):
+        """
+        Returns per-stage counters and timings, safe to call while recording.
+        :param histograms: include latency and queue depth histograms
+        """
+        stats = {name: stage.as_dict(histograms) for name, stage in self.stats.items()}
+        if self.scheduler is not None:
+            stats["schedule"] = self.scheduler.as_dict()
+        if self._pool is not None:
+            stats["pool"] = {"buffers": self._pool.allocated, "shape": list(self._pool.shape)}
+        if self.cursor is not None:
+            stats["cursor_sampler"] = self.cursor.as_dict()
+        if self.skip_unchanged:
+            stats["change"] = self.change_detector.as_dict()
+            stats["change"]["elided"] = self.elided_frames
+        return stats
 
     def get_duration(self):
         if self.start_time is None:
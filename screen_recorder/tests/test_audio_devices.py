@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.audio_devices import DeviceRegistry
+from recorder.audio_capture import AudioRecorder
+
+def _device(name, hostapi=0, inputs=2, outputs=0, rate=48000.0):
+    return {"name": name, "hostapi": hostapi, "max_input_channels": inputs, "max_output_channels": outputs,
+            "default_samplerate": rate}
+
+class FakeBackend:
+    available = True
+
+    def __init__(self, devices, default=0):
+        self.devices = devices
+        self.default = default
+        self.queries = 0
+        self.reinits = 0
+
+    def query_devices(self):
+        self.queries += 1
+        return list(self.devices)
+
+    def query_hostapis(self):
+        return [{"name": "MME"}, {"name": "Windows WASAPI"}]
+
+    def default_input(self):
+        return self.default
+
+    def reinitialize(self):
+        self.reinits += 1
+
+class TestDeviceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend([
+            _device("Microphone (USB)", rate=44100.0, inputs=1),
+            _device("Speakers", outputs=2, inputs=0),
+            _device("Microphone (USB)"),
+            _device("Stereo Mix", hostapi=1),
+        ])
+        self.registry = DeviceRegistry(self.backend, poll_interval=0.01)
+
+    def test_indexes_by_stable_key(self):
+        self.assertFalse(self.registry.ready)
+        self.assertEqual(self.registry.devices(), [])
+        self.assertTrue(self.registry.refresh())
+        keys = [d.key for d in self.registry.devices("input")]
+        self.assertEqual(keys, ["MME: Microphone (USB)", "MME: Microphone (USB) #2", "Windows WASAPI: Stereo Mix"])
+        mic = self.registry.get("MME: Microphone (USB)")
+        self.assertEqual((mic.index, mic.max_input_channels, mic.default_samplerate), (0, 1, 44100.0))
+        self.assertEqual(self.registry.get("Stereo Mix").index, 3)  # bare name
+        self.assertEqual(self.registry.get(2).key, "MME: Microphone (USB) #2")
+        self.assertIsNone(self.registry.get("MME: Headset"))
+        self.assertEqual(self.registry.default_input().key, "MME: Microphone (USB)")
+        # Lookups read the snapshot
+        self.assertEqual(self.backend.queries, 1)
+
+    def test_hotplug_notifies_and_keeps_keys(self):
+        changes = []
+        self.registry.add_listener(lambda registry: changes.append(len(registry.devices())))
+        self.registry.refresh()
+        self.assertFalse(self.registry.refresh(reinitialize=True))  # nothing changed
+        self.backend.devices = [_device("Headset")] + self.backend.devices
+        self.assertTrue(self.registry.refresh(reinitialize=True))
+        self.assertEqual(changes, [4, 5])
+        self.assertEqual(self.backend.reinits, 2)
+        # Indices moved, the key still finds the device
+        self.assertEqual(self.registry.get("Windows WASAPI: Stereo Mix").index, 4)
+
+    def test_no_reinit_while_held(self):
+        self.registry.refresh()
+        self.registry.hold()
+        self.assertFalse(self.registry.refresh(reinitialize=True))
+        self.assertEqual(self.backend.reinits, 0)
+        self.registry.release()
+        self.registry.refresh(reinitialize=True)
+        self.assertEqual(self.backend.reinits, 1)
+
+    def test_watcher_polls_without_reinitializing(self):
+        polled = threading.Event()
+        query_devices = self.backend.query_devices
+        def query():
+            if self.backend.queries >= 2:
+                polled.set()
+            return query_devices()
+        self.backend.query_devices = query
+        self.registry.start()
+        self.assertTrue(self.registry.wait_ready(2))
+        self.assertTrue(polled.wait(2))
+        self.registry.stop()
+        self.assertIsNone(self.registry._thread)
+        self.assertEqual(self.backend.reinits, 0)
+
+    def test_requested_reinit_waits_for_release(self):
+        registry = DeviceRegistry(self.backend, poll_interval=60)
+        registry.start()
+        self.assertTrue(registry.wait_ready(2))
+        registry.hold()
+        registry.request_reinitialize()
+        time.sleep(0.1)
+        self.assertEqual(self.backend.reinits, 0)
+        registry.release()
+        deadline = time.time() + 2
+        while self.backend.reinits == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        registry.stop()
+        self.assertEqual(self.backend.reinits, 1)
+
+class TestRecorderDevices(unittest.TestCase):
+    def test_resolves_configured_devices_from_registry(self):
+        registry = DeviceRegistry(FakeBackend([_device("Mic", inputs=1), _device("Line In", inputs=2)], default=1))
+        registry.refresh()
+        rec = AudioRecorder(filename="unused.wav", registry=registry)
+        self.assertEqual(rec._resolve_device("MME: Mic"), (0, 1))
+        self.assertEqual(rec._resolve_device(None), (1, 2))  # host default, not a fixed index
+
+if __name__ == '__main__':
+    unittest.main()
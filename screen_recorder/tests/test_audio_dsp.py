@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.audio_dsp import HighPass, NoiseGate, LookaheadLimiter, build_chain, db_to_gain
+
+SAMPLERATE = 44100
+
+def blocks(signal, size):
+    return [signal[i:i + size].copy() for i in range(0, len(signal), size)]
+
+class TestHighPass(unittest.TestCase):
+    def test_matches_reference_recursion(self):
+        rng = np.random.default_rng(0)
+        signal = rng.standard_normal((5000, 2)).astype(np.float32) * 0.2
+        hpf = HighPass(80.0, SAMPLERATE, 2)
+        out = np.concatenate([hpf.process(b) for b in blocks(signal, 700)])
+
+        expected = np.zeros_like(signal, dtype=np.float64)
+        x_prev = np.zeros(2)
+        y_prev = np.zeros(2)
+        for n in range(len(signal)):
+            y_prev = hpf.a * (y_prev + signal[n] - x_prev)
+            x_prev = signal[n].astype(np.float64)
+            expected[n] = y_prev
+        self.assertLess(np.abs(out - expected).max(), 1e-4)
+
+    def test_removes_dc(self):
+        hpf = HighPass(80.0, SAMPLERATE, 1)
+        out = np.concatenate([hpf.process(b) for b in blocks(np.full((SAMPLERATE, 1), 0.5, np.float32), 512)])
+        self.assertLess(abs(out[-1000:]).max(), 1e-3)
+
+class TestNoiseGate(unittest.TestCase):
+    def test_closes_on_silence_and_opens_on_signal(self):
+        gate = NoiseGate(-50.0, SAMPLERATE)
+        quiet = np.full((512, 2), 1e-5, np.float32)
+        for _ in range(50):
+            out = gate.process(quiet.copy())
+        self.assertLess(np.abs(out).max(), 1e-6)
+
+        loud = np.full((512, 2), 0.5, np.float32)
+        for _ in range(10):
+            out = gate.process(loud.copy())
+        self.assertAlmostEqual(float(out[-1, 0]), 0.5, places=3)
+
+class TestLookaheadLimiter(unittest.TestCase):
+    def test_peaks_stay_below_threshold(self):
+        rng = np.random.default_rng(1)
+        signal = (rng.standard_normal((SAMPLERATE, 2)) * 0.05).astype(np.float32)
+        signal[20000:20010] = 3.0
+        limiter = LookaheadLimiter(-1.0, SAMPLERATE, 2)
+        out = np.concatenate([limiter.process(b) for b in blocks(signal, 700)])
+        self.assertLessEqual(np.abs(out).max(), db_to_gain(-1.0) + 1e-6)
+
+    def test_quiet_signal_is_only_delayed(self):
+        rng = np.random.default_rng(2)
+        signal = (rng.standard_normal((10000, 2)) * 0.05).astype(np.float32)
+        limiter = LookaheadLimiter(-1.0, SAMPLERATE, 2)
+        out = np.concatenate([limiter.process(b) for b in blocks(signal, 700)])
+        delay = limiter.lookahead
+        np.testing.assert_array_equal(out[delay:], signal[:-delay])
+        self.assertAlmostEqual(limiter.latency, delay / SAMPLERATE)
+
+class TestDSPChain(unittest.TestCase):
+    def test_chain_applies_volume_and_reports_cost(self):
+        chain = build_chain(SAMPLERATE, 2, gain_db=0.0, volume=50, limiter_db=None)
+        block = np.full((1024, 2), 0.4, np.float32)
+        out = chain.process(block)
+        self.assertTrue(np.allclose(out, 0.2))
+
+        stats = chain.as_dict()
+        self.assertEqual(stats["blocks"], 1)
+        self.assertLess(stats["realtime_ratio"], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.audio_mixer import RingBuffer, AudioMixer
+
+SAMPLERATE = 44100
+
+class TestRingBuffer(unittest.TestCase):
+    def test_wraps_and_fits_channels(self):
+        ring = RingBuffer(10, 2)
+        out = np.empty((10, 2), dtype=np.float32)
+        for start in range(0, 30, 6):
+            ring.write(np.arange(start, start + 6, dtype=np.float32)[:, None])  # mono
+            self.assertTrue(ring.read(6, out[:6]))
+            np.testing.assert_array_equal(out[:6, 0], np.arange(start, start + 6))
+            np.testing.assert_array_equal(out[:6, 1], out[:6, 0])
+        self.assertFalse(ring.read(1, out))
+
+    def test_overflow_drops_oldest(self):
+        ring = RingBuffer(4, 1)
+        ring.write(np.arange(6, dtype=np.float32)[:, None])
+        out = np.empty((4, 1), dtype=np.float32)
+        self.assertTrue(ring.read(4, out))
+        np.testing.assert_array_equal(out[:, 0], [2, 3, 4, 5])
+        self.assertEqual(ring.overflows, 2)
+
+class TestAudioMixer(unittest.TestCase):
+    def run_mixer(self, drift, seconds, freq=1.3):
+        """Master pushes silence, the second input a sine sampled by a clock running `drift` times faster."""
+        mixer = AudioMixer(SAMPLERATE, 1)
+        master = mixer.add_input("mic")
+        other = mixer.add_input("system")
+        produced = 0
+        out = []
+        for step in range(int(seconds * SAMPLERATE / 512)):
+            master.push(np.zeros((512, 1), np.float32))
+            target = int((step + 1) * 512 * drift)
+            index = np.arange(produced, target)
+            other.push(np.sin(2 * np.pi * freq * index / (SAMPLERATE * drift)).astype(np.float32)[:, None])
+            produced = target
+            block = mixer.mix()
+            while block is not None:
+                out.append(block[:, 0])
+                block = mixer.mix()
+        return mixer, other, np.concatenate(out)
+
+    def delay_at(self, signal, second, freq=1.3):
+        start = int(second * SAMPLERATE)
+        segment = signal[start:start + 8000]
+        t = np.arange(start, start + 8000) / SAMPLERATE
+        delays = np.arange(0, 20000, 10)
+        errors = [np.abs(segment - np.sin(2 * np.pi * freq * (t - d / SAMPLERATE))).max() for d in delays]
+        return delays[int(np.argmin(errors))], min(errors)
+
+    def test_tracks_clock_drift(self):
+        mixer, other, signal = self.run_mixer(1.0002, 90)
+        self.assertAlmostEqual(other.as_dict()["drift_ppm"], 200, delta=5)
+        self.assertEqual(other.underruns, 0)
+        self.assertEqual(other.resyncs, 0)
+
+        # Once locked, the resampled input keeps a constant delay and stays clean
+        early, _ = self.delay_at(signal, 45)
+        late, error = self.delay_at(signal, 85)
+        self.assertLessEqual(abs(late - early), 10)
+        self.assertLess(error, 0.01)
+
+    def test_no_blocks_until_master_has_data(self):
+        mixer = AudioMixer(SAMPLERATE, 2, block_size=256)
+        master = mixer.add_input("mic")
+        self.assertIsNone(mixer.mix())
+        master.push(np.ones((300, 2), np.float32))
+        block = mixer.mix()
+        self.assertEqual(block.shape, (256, 2))
+        self.assertIsNone(mixer.mix())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+import struct
+import tempfile
+import wave
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder import audio_writer
+from recorder.audio_writer import StreamingWavWriter
+
+class TestStreamingWavWriter(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_blocks_are_readable_as_wav(self):
+        blocks = [np.full((100, 2), i, dtype=np.int16) for i in range(5)]
+        with StreamingWavWriter(self.path, samplerate=48000, channels=2) as writer:
+            for block in blocks:
+                writer.write(block)
+
+        with wave.open(self.path, 'rb') as wf:
+            self.assertEqual(wf.getnchannels(), 2)
+            self.assertEqual(wf.getframerate(), 48000)
+            self.assertEqual(wf.getnframes(), 500)
+            data = np.frombuffer(wf.readframes(500), dtype=np.int16).reshape(-1, 2)
+        np.testing.assert_array_equal(data, np.concatenate(blocks))
+
+    def test_rf64_when_over_limit(self):
+        original = audio_writer.RIFF_LIMIT
+        audio_writer.RIFF_LIMIT = 100
+        try:
+            writer = StreamingWavWriter(self.path, channels=1)
+            writer.write(np.zeros(200, dtype=np.int16))
+            writer.close()
+        finally:
+            audio_writer.RIFF_LIMIT = original
+
+        with open(self.path, 'rb') as f:
+            header = f.read(48)
+        self.assertEqual(header[:4], b"RF64")
+        self.assertEqual(header[12:16], b"ds64")
+        riff_size, data_size, samples = struct.unpack("<QQQ", header[20:44])
+        self.assertEqual(data_size, 400)
+        self.assertEqual(samples, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.change_detector import ChangeDetector
+
+class TestChangeDetector(unittest.TestCase):
+    def setUp(self):
+        self.frame = np.zeros((90, 160, 4), dtype=np.uint8)
+
+    def test_first_frame_is_changed(self):
+        detector = ChangeDetector(tiles=(4, 3))
+        self.assertEqual(detector.update(self.frame), 12)
+
+    def test_identical_frames(self):
+        detector = ChangeDetector(tiles=(4, 3))
+        detector.update(self.frame)
+        self.assertEqual(detector.update(self.frame.copy()), 0)
+        self.assertEqual(detector.as_dict()["unchanged"], 1)
+
+    def test_changed_tile_count(self):
+        detector = ChangeDetector(tiles=(4, 3), row_stride=1)
+        detector.update(self.frame)
+        changed = self.frame.copy()
+        changed[0:30, 0:40] = 255  # top-left tile only
+        self.assertEqual(detector.update(changed), 1)
+
+    def test_single_changed_row_is_found_at_once(self):
+        detector = ChangeDetector(tiles=(4, 3), row_stride=8)
+        detector.update(self.frame)
+        changed = self.frame.copy()
+        changed[45, 80:82] = 255  # a caret-sized change between the sampled rows
+        self.assertEqual(detector.update(changed), 1)
+        self.assertEqual(detector.update(changed.copy()), 0)
+        self.assertEqual(detector.as_dict()["full_checks"], 2)
+
+    def test_reference_moves_only_when_accepted(self):
+        detector = ChangeDetector(tiles=(4, 3))
+        detector.accept(self.frame)
+        changed = self.frame.copy()
+        changed[0:30, 0:40] = 255
+        self.assertEqual(detector.update(changed, accept=False), 1)
+        self.assertEqual(detector.update(changed.copy(), accept=False), 1)
+        detector.accept(changed)
+        self.assertEqual(detector.update(changed.copy(), accept=False), 0)
+
+if __name__ == '__main__':
+    unittest.main()
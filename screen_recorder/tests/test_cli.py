@@ -0,0 +1,91 @@
+import unittest
+import argparse
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cli import StopSignal, build_parser, main, make_source, parse_region
+from recorder.frame_sources import SyntheticSource
+
+class TestArguments(unittest.TestCase):
+    def test_parse_region(self):
+        self.assertEqual(parse_region("10,20,640,480"), (10, 20, 640, 480))
+        self.assertEqual(parse_region("640x480+10+20"), (10, 20, 640, 480))
+        for bad in ("10,20,640", "a,b,c,d", "0,0,0,480"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_region(bad)
+
+    def test_record_defaults(self):
+        args = build_parser().parse_args(["record", "--region", "0,0,320,240", "--duration", "5"])
+        self.assertEqual(args.region, (0, 0, 320, 240))
+        self.assertEqual(args.duration, 5.0)
+        self.assertEqual(args.fps, 30.0)
+        self.assertEqual(args.audio, "None")
+        self.assertEqual(args.source, "screen")
+
+    def test_make_source(self):
+        self.assertIsNone(make_source("screen"))
+        source = make_source("synthetic:320x240:static")
+        self.assertIsInstance(source, SyntheticSource)
+        self.assertEqual((source.monitor["width"], source.monitor["height"]), (320, 240))
+        self.assertEqual(source.pattern, "static")
+        with self.assertRaises(ValueError):
+            make_source("webcam")
+
+class TestStopSignal(unittest.TestCase):
+    def test_signal_sets_event_and_handlers_are_restored(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        stop = StopSignal()
+        stop.install()
+        try:
+            os.kill(os.getpid(), signal.SIGTERM)
+            self.assertTrue(stop.event.wait(1))
+            self.assertEqual(stop.received, "SIGTERM")
+        finally:
+            stop.restore()
+        self.assertEqual(signal.getsignal(signal.SIGTERM), previous)
+
+class TestRecord(unittest.TestCase):
+    def test_synthetic_recording_prints_stats_json(self):
+        folder = tempfile.mkdtemp()
+        out = os.path.join(folder, "out.mp4")
+        stats_path = os.path.join(folder, "stats.json")
+        stdout = io.StringIO()
+        with patch('recorder.merger.get_ffmpeg_path', return_value=None), \
+             patch('recorder.video_capture.get_ffmpeg_path', return_value=None), \
+             patch('sys.stdout', stdout), patch('sys.stderr', io.StringIO()):
+            code = main(["record", "--source", "synthetic:160x120:typing", "--fps", "10",
+                         "--duration", "0.5", "--out", out, "--stats", stats_path])
+
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.exists(out))
+        # stdout carries only the stats line
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        stats = json.loads(lines[0])
+        self.assertTrue(stats["success"])
+        self.assertEqual(stats["output"], out)
+        self.assertEqual(stats["stop_reason"], "duration")
+        self.assertEqual(stats["settings"]["size"], [160, 120])
+        self.assertGreater(stats["video"]["frames"]["written"], 0)
+        self.assertIsNone(stats["audio"])
+        with open(stats_path) as f:
+            self.assertEqual(json.load(f)["output"], out)
+
+    def test_no_gui_imports(self):
+        # With a (dead) X display set, the recorder modules must not reach for pyautogui either
+        code = ("import sys, cli, recorder.video_capture; "
+                "print(any(m in sys.modules for m in ('tkinter', 'pyautogui', 'pystray', 'PIL', 'keyboard')))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.join(os.path.dirname(__file__), '..'),
+                                env=dict(os.environ, DISPLAY=":99"))
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import time
+import numpy as np
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder import cursor
+from recorder.cursor import CursorOverlay, CursorSample, CursorSampler, arrow_sprite, click_sprite
+from recorder.frame_sources import BufferSource
+from recorder.video_capture import VideoRecorder
+
+class CollectingWriter:
+    def __init__(self):
+        self.frames = []
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.frames.append(frame.copy())
+
+    def release(self):
+        pass
+
+class TestCursorSampler(unittest.TestCase):
+    def test_samples_on_its_own_thread(self):
+        positions = iter(range(100000))
+        sampler = CursorSampler(rate=200, position=lambda: (next(positions), 5), buttons=lambda: 0)
+        sampler.start()
+        first = sampler.latest()
+        self.assertIsNotNone(first)  # available right after start
+        time.sleep(0.1)
+        sampler.stop()
+        latest = sampler.latest()
+        self.assertGreater(latest.x, first.x)
+        self.assertGreater(sampler.samples, 5)
+        self.assertFalse(sampler._thread)
+
+    def test_start_and_stop_nest(self):
+        sampler = CursorSampler(rate=100, position=lambda: (0, 0), buttons=lambda: 0)
+        sampler.start()
+        sampler.start()
+        sampler.stop()
+        self.assertTrue(sampler._thread.is_alive())
+        sampler.stop()
+        self.assertIsNone(sampler._thread)
+
+    def test_click_is_held_after_release(self):
+        state = {"buttons": 1}
+        sampler = CursorSampler(position=lambda: (1, 2), buttons=lambda: state["buttons"])
+        sampler.sample()
+        self.assertTrue(sampler.latest().clicking(time.perf_counter()))
+        state["buttons"] = 0
+        sampler.sample()
+        sample = sampler.latest()
+        self.assertTrue(sample.clicking(sample.sampled_at))
+        self.assertFalse(sample.clicking(sample.sampled_at + 1.0))
+
+    def test_errors_keep_previous_sample(self):
+        calls = {"n": 0}
+        def position():
+            calls["n"] += 1
+            if calls["n"] > 1:
+                raise OSError("no display")
+            return (3, 4)
+        sampler = CursorSampler(position=position, buttons=None)
+        sampler.sample()
+        sampler.sample()
+        self.assertEqual((sampler.latest().x, sampler.latest().y), (3, 4))
+        self.assertEqual(sampler.errors, 1)
+
+class TestPositionReader(unittest.TestCase):
+    def setUp(self):
+        cursor._position_readers.clear()
+        self.addCleanup(cursor._position_readers.clear)
+
+    @patch('platform.system', return_value="Linux")
+    def test_no_display(self, mock_system):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(cursor.position_reader())
+
+    @patch('platform.system', return_value="Darwin")
+    def test_pyautogui_only_for_gui_callers(self, mock_system):
+        with patch('recorder.cursor._pyautogui_position', return_value=(3, 4)):
+            self.assertIsNone(cursor.position_reader(gui=False))
+            self.assertEqual(cursor.position_reader()(), (3, 4))
+
+class TestSprites(unittest.TestCase):
+    def test_arrow_blends_over_roi_only(self):
+        frame = np.full((40, 40, 4), 100, dtype=np.uint8)
+        sprite = arrow_sprite()
+        sprite.draw(frame, 10, 10)
+        self.assertTrue((frame[:8, :, :3] == 100).all())  # above the sprite
+        self.assertTrue((frame[..., 3] == 100).all())  # alpha channel untouched
+        self.assertTrue((frame[18, 12, :3] == 255).any())  # white body
+        self.assertTrue((frame[25:28, 10:12, :3] < 100).any())  # dark outline
+
+    def test_clipped_at_frame_edges(self):
+        frame = np.zeros((20, 20, 3), dtype=np.uint8)
+        arrow_sprite(2.0).draw(frame, 15, 15)
+        click_sprite().draw(frame, 0, 0)
+        arrow_sprite().draw(frame, -50, -50)  # fully outside
+        self.assertTrue(frame.any())
+
+class TestCursorOverlay(unittest.TestCase):
+    def test_maps_onto_scaled_frames(self):
+        overlay = CursorOverlay({"top": 100, "left": -1920, "width": 1920, "height": 1080})
+        sample = CursorSample(-960, 640, 0, None, 0.0)
+        small = np.zeros((540, 960, 3), dtype=np.uint8)
+        self.assertEqual(overlay.position(sample, small), (480, 270))
+        overlay.draw(small, sample, 0.0)
+        self.assertTrue(small[270:285, 480:490].any())
+        self.assertFalse(small[:200].any())
+
+    def test_click_highlight_changes_state(self):
+        overlay = CursorOverlay({"top": 0, "left": 0, "width": 100, "height": 100})
+        sample = CursorSample(50, 50, 0, 10.0, 10.0)
+        self.assertNotEqual(overlay.state(sample, 10.1), overlay.state(sample, 20.0))
+        plain = np.zeros((100, 100, 3), dtype=np.uint8)
+        clicked = plain.copy()
+        overlay.draw(plain, sample, 20.0)
+        overlay.draw(clicked, sample, 10.1)
+        self.assertGreater(np.count_nonzero(clicked), np.count_nonzero(plain))
+        CursorOverlay(overlay.monitor, highlight_clicks=False).draw(plain, sample, 10.1)
+        self.assertIsNone(overlay.state(None, 0.0))
+
+class TestRecorderCursor(unittest.TestCase):
+    def test_cursor_sample_from_grab_time_is_drawn(self):
+        frames = [np.zeros((60, 80, 3), dtype=np.uint8) for _ in range(6)]
+        sampler = CursorSampler(rate=200, position=lambda: (40, 30), buttons=lambda: 0)
+        sink = CollectingWriter()
+        rec = VideoRecorder(fps=30, show_cursor=True, cursor=sampler, sink=sink,
+                            source=BufferSource(frames, loop=False))
+        rec.start()
+        deadline = time.time() + 5
+        while not rec.stop_event.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        rec.stop()
+        self.assertIsNone(sampler._thread)
+        self.assertTrue(sink.frames)
+        for frame in sink.frames:
+            self.assertTrue(frame[32:45, 41:45].any())
+            self.assertFalse(frame[:25].any())
+        self.assertIn("cursor_sampler", rec.get_stats())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.finalizer import FinalizeJob, FinalizeQueue
+
+class TestFinalizeQueue(unittest.TestCase):
+    def test_jobs_run_in_order_off_the_caller_thread(self):
+        order = []
+        updates = []
+        done = []
+        caller = threading.current_thread()
+
+        def make_run(name):
+            def run(progress):
+                self.assertIsNot(threading.current_thread(), caller)
+                progress({"percent": 50.0})
+                order.append(name)
+                return True
+            return run
+
+        finalizer = FinalizeQueue(on_progress=lambda job, update, queued: updates.append((job.name, update["percent"])),
+                                  on_done=done.append)
+        for name in ("a.mp4", "b.mp4", "c.mp4"):
+            finalizer.submit(FinalizeJob(os.path.join("out", name), make_run(name)))
+        finalizer.wait()
+
+        self.assertEqual(order, ["a.mp4", "b.mp4", "c.mp4"])
+        self.assertEqual(updates[0], ("a.mp4", 50.0))
+        self.assertTrue(all(job.success for job in done))
+        self.assertEqual(finalizer.pending, 0)
+
+    def test_failing_job_still_cleans_up(self):
+        cleaned = []
+
+        def run(progress):
+            raise RuntimeError("ffmpeg exploded")
+
+        finalizer = FinalizeQueue()
+        job = finalizer.submit(FinalizeJob("out.mp4", run, cleanup=cleaned.append))
+        finalizer.submit(FinalizeJob("next.mp4", lambda progress: True))
+        finalizer.wait()
+
+        self.assertFalse(job.success)
+        self.assertEqual(cleaned, [False])
+        self.assertEqual(finalizer.pending, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import time
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.frame_sources import BufferSource, SyntheticSource, VideoFileSource
+from recorder.video_capture import VideoRecorder
+
+class CollectingWriter:
+    def __init__(self):
+        self.frames = []
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.frames.append(frame.copy())
+
+    def release(self):
+        pass
+
+class TestSyntheticSource(unittest.TestCase):
+    def test_patterns(self):
+        static = SyntheticSource(320, 240, "static")
+        self.assertEqual(static.monitor, {"top": 0, "left": 0, "width": 320, "height": 240})
+        first = static.grab()
+        self.assertEqual(first.shape, (240, 320, 4))
+        self.assertTrue(np.array_equal(first, static.grab()))
+
+        typing = SyntheticSource(320, 240, "typing")
+        frames = [typing.grab() for _ in range(3)]
+        self.assertTrue(np.array_equal(frames[0], frames[1]))
+        self.assertFalse(np.array_equal(frames[1], frames[2]))
+
+        video = SyntheticSource(320, 240, "video")
+        self.assertFalse(np.array_equal(video.grab(), video.grab()))
+        self.assertEqual(video.grabs, 2)
+
+        with self.assertRaises(ValueError):
+            SyntheticSource(320, 240, "noise")
+
+class TestBufferSource(unittest.TestCase):
+    def test_loop_and_exhaustion(self):
+        frames = [np.full((8, 8, 3), i, dtype=np.uint8) for i in range(2)]
+        looped = BufferSource(frames)
+        looped.open()
+        self.assertEqual([looped.grab()[0, 0, 0] for _ in range(5)], [0, 1, 0, 1, 0])
+        self.assertEqual(looped.grab().shape, (8, 8, 4))
+
+        once = BufferSource(frames, loop=False)
+        once.open()
+        once.grab(), once.grab()
+        self.assertIsNone(once.grab())
+
+    def test_recording_ends_when_source_is_exhausted(self):
+        frames = [np.full((64, 96, 3), i * 20, dtype=np.uint8) for i in range(10)]
+        sink = CollectingWriter()
+        rec = VideoRecorder(fps=30, show_cursor=False, sink=sink, source=BufferSource(frames, loop=False))
+        self.assertEqual((rec.width, rec.height), (96, 64))
+        rec.start()
+        deadline = time.time() + 5
+        while not rec.stop_event.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(rec.stop_event.is_set())
+        rec.stop()
+        # The timeline may repeat a frame to hold the fps grid, but every frame arrives in order
+        values = [int(frame[0, 0, 0]) for frame in sink.frames]
+        distinct = [v for i, v in enumerate(values) if i == 0 or v != values[i - 1]]
+        self.assertEqual(distinct, [i * 20 for i in range(10)])
+
+class TestVideoFileSource(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "clip.avi")
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for i in range(3):
+            writer.write(np.full((48, 64, 3), 60 * i, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_reads_frames_as_bgra(self):
+        source = VideoFileSource(self.path)
+        self.assertEqual((source.monitor["width"], source.monitor["height"]), (64, 48))
+        source.open()
+        try:
+            frames = [source.grab() for _ in range(3)]
+            self.assertEqual(frames[0].shape, (48, 64, 4))
+            self.assertLess(abs(int(frames[2][0, 0, 0]) - 120), 8)
+            self.assertIsNone(source.grab())
+        finally:
+            source.close()
+
+    def test_loop(self):
+        source = VideoFileSource(self.path, loop=True)
+        source.open()
+        try:
+            frames = [source.grab() for _ in range(4)]
+            self.assertIsNotNone(frames[3])
+            self.assertLess(int(frames[3][0, 0, 0]), 8)
+        finally:
+            source.close()
+
+    def test_missing_file(self):
+        with self.assertRaises(IOError):
+            VideoFileSource(os.path.join(self.folder, "missing.avi"))
+
+if __name__ == '__main__':
+    unittest.main()
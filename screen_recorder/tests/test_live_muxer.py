@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.live_muxer import LiveMuxer
+
+class TestLiveMuxer(unittest.TestCase):
+    @patch('recorder.live_muxer.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('subprocess.Popen')
+    def test_spawns_on_first_frame(self, mock_popen, mock_path):
+        proc = mock_popen.return_value
+        proc.stderr = []
+        proc.wait.return_value = 0
+
+        muxer = LiveMuxer("out.mp4", fps=30, has_audio=False)
+        mock_popen.assert_not_called()
+
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        muxer.video.write(frame)
+        muxer.video.write(frame)
+
+        args = mock_popen.call_args[0][0]
+        self.assertIn("rawvideo", args)
+        self.assertIn("1280x720", args)
+        self.assertIn("bgr24", args)
+        self.assertEqual(args[-1], "out.mp4")
+        self.assertEqual(proc.stdin.write.call_count, 2)
+
+        with patch('os.path.exists', return_value=True), patch('os.path.getsize', return_value=100):
+            self.assertTrue(muxer.close())
+        proc.stdin.close.assert_called()
+
+    @patch('recorder.live_muxer.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('subprocess.Popen')
+    def test_audio_input_is_mapped(self, mock_popen, mock_path):
+        proc = mock_popen.return_value
+        proc.stderr = []
+        proc.wait.return_value = 1
+
+        muxer = LiveMuxer("out.mp4", fps=30, samplerate=48000, channels=2, has_audio=True)
+        muxer.audio.write(np.zeros((256, 2), dtype=np.int16))
+        muxer.video.write(np.zeros((4, 4, 4), dtype=np.uint8))
+
+        args = mock_popen.call_args[0][0]
+        self.assertIn("s16le", args)
+        self.assertIn("bgra", args)
+        self.assertIn("1:a:0", args)
+        self.assertFalse(muxer.close())
+
+    @patch('recorder.live_muxer.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('subprocess.Popen')
+    def test_audio_input_is_closed_when_no_audio_arrives(self, mock_popen, mock_path):
+        proc = mock_popen.return_value
+        proc.stderr = []
+        proc.wait.return_value = 0
+
+        muxer = LiveMuxer("out.mp4", fps=30, has_audio=True, audio_timeout=0.1)
+        muxer.video.write(np.zeros((4, 4, 3), dtype=np.uint8))
+        # Without waiting for close(): ffmpeg gets EOF on the audio input and can keep reading video
+        muxer._audio_thread.join(2)
+        self.assertFalse(muxer._audio_thread.is_alive())
+        self.assertTrue(muxer.audio_missing)
+        self.assertIsNone(muxer._audio_pipe._file)
+
+        # Late audio is dropped instead of piling up
+        muxer.audio.write(np.zeros((256, 2), dtype=np.int16))
+        self.assertTrue(muxer._audio_queue.empty())
+        with patch('os.path.exists', return_value=True), patch('os.path.getsize', return_value=100):
+            self.assertTrue(muxer.close())
+
+    def test_close_without_frames(self):
+        muxer = LiveMuxer("out.mp4", has_audio=False)
+        self.assertFalse(muxer.close())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,29 +2,63 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 import sys
+import shutil
+import subprocess
+import tempfile
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from recorder.merger import check_ffmpeg, merge_audio_video
+from recorder import merger
+from recorder.merger import (check_ffmpeg, get_temp_dir, merge_audio_video, plan_merge, probe_media, probe_capabilities,
+                             CapabilityCache, FFmpegCapabilities, FFmpegProgress, _codec_args,
+                             PLAN_COPY, PLAN_COPY_VIDEO, PLAN_TRANSCODE)
+
+def _capabilities(encoders=("libx264", "mpeg4", "aac")):
+    return FFmpegCapabilities("7.0", encoders, ["mp4", "matroska"], ["yuv420p"])
 
 class TestMerger(unittest.TestCase):
-    @patch('subprocess.run')
-    def test_check_ffmpeg(self, mock_run):
-        mock_run.return_value.returncode = 0
+    def setUp(self):
+        merger._capabilities.clear()
+
+    def tearDown(self):
+        merger._capabilities.clear()
+
+    @patch('recorder.merger.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.merger.CapabilityCache.get')
+    def test_check_ffmpeg(self, mock_get, mock_path):
+        mock_get.return_value = _capabilities()
+        self.assertTrue(check_ffmpeg())
         self.assertTrue(check_ffmpeg())
+        self.assertEqual(mock_get.call_count, 1)  # once per process
         
-        mock_run.side_effect = FileNotFoundError
+        # A broken ffmpeg is not probed again either
+        merger._capabilities.clear()
+        mock_get.reset_mock()
+        mock_get.return_value = None
+        self.assertFalse(check_ffmpeg())
         self.assertFalse(check_ffmpeg())
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_cache_is_not_in_the_working_directory(self):
+        self.assertEqual(os.path.dirname(CapabilityCache().path), get_temp_dir())
         
+    @patch('recorder.merger.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.merger.probe_media')
     @patch('subprocess.run')
+    @patch('os.path.getsize', return_value=1024)
     @patch('os.path.exists')
     @patch('os.remove')
-    def test_merge_audio_video(self, mock_remove, mock_exists, mock_run):
-        # Setup
+    def test_merge_audio_video(self, mock_remove, mock_exists, mock_getsize, mock_run, mock_probe, mock_path):
+        # Setup: an H.264 temp file, encoded with the profile while recording
+        mock_probe.side_effect = [
+            {"video": {"codec_name": "h264", "r_frame_rate": "30/1"}, "audio": None, "duration": 5.0},
+            {"video": None, "audio": {"codec_name": "pcm_s16le"}, "duration": 5.0},
+        ]
         mock_exists.return_value = True # Files exist
         mock_run.return_value.returncode = 0 # Success
         
         # Run
-        result = merge_audio_video("vid.avi", "aud.wav", "out.mp4", keep_temp=False)
+        result = merge_audio_video("vid.mkv", "aud.wav", "out.mp4", keep_temp=False,
+                                   video_args=["-c:v", "libx264", "-preset", "veryfast", "-crf", "23"])
         
         # Verify
         self.assertTrue(result)
@@ -32,10 +66,177 @@ class TestMerger(unittest.TestCase):
         args = mock_run.call_args[0][0]
         self.assertEqual(args[0], "ffmpeg")
         self.assertIn("-c:v", args)
-        self.assertIn("copy", args)
+        self.assertEqual(args[args.index("-c:v") + 1], "copy")
+        self.assertNotIn("libx264", args)
         
         # Verify cleanup
         self.assertEqual(mock_remove.call_count, 2) # Video and Audio removed
 
+    def test_plan_merge(self):
+        mpeg4 = {"video": {"codec_name": "mpeg4", "r_frame_rate": "30/1"}, "audio": None}
+        wav = {"video": None, "audio": {"codec_name": "pcm_s16le"}}
+        aac = {"video": None, "audio": {"codec_name": "aac"}}
+        self.assertEqual(plan_merge(mpeg4, aac), PLAN_COPY)
+        self.assertEqual(plan_merge(mpeg4, wav), PLAN_COPY_VIDEO)
+        self.assertEqual(plan_merge({"video": {"codec_name": "rawvideo", "r_frame_rate": "30/1"}}, wav), PLAN_TRANSCODE)
+        self.assertEqual(plan_merge(None, wav), PLAN_TRANSCODE)
+
+    def test_plan_merge_applies_quality_profile(self):
+        mpeg4 = {"video": {"codec_name": "mpeg4", "r_frame_rate": "30/1"}, "audio": None}
+        h264 = {"video": {"codec_name": "h264", "r_frame_rate": "30/1"}, "audio": None}
+        aac = {"video": None, "audio": {"codec_name": "aac"}}
+        profile = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23"]
+        # The XVID temp file is re-encoded with the profile; H.264 input already matches it
+        self.assertEqual(plan_merge(mpeg4, aac, profile), PLAN_TRANSCODE)
+        self.assertEqual(plan_merge(h264, aac, profile), PLAN_COPY)
+        self.assertEqual(plan_merge(mpeg4, aac, ["-preset", "fast"]), PLAN_COPY)
+
+    @patch('recorder.merger.get_capabilities', return_value=None)
+    @patch('recorder.merger.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.merger.probe_media')
+    @patch('subprocess.run')
+    @patch('os.path.getsize', return_value=1024)
+    @patch('os.remove')
+    def test_merge_video_only(self, mock_remove, mock_getsize, mock_run, mock_probe, mock_path, mock_capabilities):
+        mock_probe.return_value = {"video": {"codec_name": "mpeg4", "r_frame_rate": "30/1"}, "audio": None,
+                                   "duration": 5.0}
+        mock_run.return_value.returncode = 0
+        with patch('os.path.exists', side_effect=lambda path: path != "aud.wav"):
+            self.assertTrue(merge_audio_video("vid.avi", "aud.wav", "out.mp4", keep_temp=True,
+                                              video_args=["-c:v", "libx264", "-crf", "23"]))
+        args = mock_run.call_args[0][0]
+        self.assertNotIn("aud.wav", args)
+        self.assertNotIn("-c:a", args)
+        self.assertEqual(args[args.index("-c:v") + 1], "libx264")
+
+    @patch('recorder.merger.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.merger.probe_media')
+    @patch('subprocess.run')
+    @patch('os.path.getsize', return_value=1024)
+    @patch('os.path.exists', return_value=True)
+    @patch('os.remove')
+    def test_merge_copies_compatible_video(self, mock_remove, mock_exists, mock_getsize, mock_run, mock_probe, mock_path):
+        mock_probe.side_effect = [
+            {"video": {"codec_name": "mpeg4", "r_frame_rate": "30/1"}, "audio": None, "duration": 5.0},
+            {"video": None, "audio": {"codec_name": "pcm_s16le"}, "duration": 5.0},
+        ]
+        mock_run.return_value.returncode = 0
+
+        self.assertTrue(merge_audio_video("vid.avi", "aud.wav", "out.mp4", keep_temp=True))
+        args = mock_run.call_args[0][0]
+        self.assertEqual(args[args.index("-c:v") + 1], "copy")
+        self.assertEqual(args[args.index("-c:a") + 1], "aac")
+        self.assertNotIn("libx264", args)
+
+    @patch('recorder.merger.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.merger.probe_media', return_value=None)
+    @patch('subprocess.run')
+    @patch('os.path.getsize', return_value=1024)
+    @patch('os.path.exists', return_value=True)
+    @patch('os.remove')
+    def test_merge_applies_audio_offset(self, mock_remove, mock_exists, mock_getsize, mock_run, mock_probe, mock_path):
+        mock_run.return_value.returncode = 0
+
+        self.assertTrue(merge_audio_video("vid.avi", "aud.wav", "out.mp4", keep_temp=True, audio_offset=0.0425))
+        args = mock_run.call_args[0][0]
+        # The offset applies to the audio input only
+        self.assertEqual(args[args.index("-itsoffset") + 1], "0.043")
+        self.assertEqual(args[args.index("-itsoffset") + 3], "aud.wav")
+
+        self.assertTrue(merge_audio_video("vid.avi", "aud.wav", "out.mp4", keep_temp=True, audio_offset=-0.2))
+        args = mock_run.call_args[0][0]
+        self.assertEqual(args[args.index("-ss") + 1:args.index("-ss") + 4], ["0.200", "-i", "aud.wav"])
+
+    @patch('recorder.merger.get_capabilities', return_value=_capabilities(encoders=("mpeg4", "aac")))
+    def test_transcode_without_libx264(self, mock_capabilities):
+        args = _codec_args(PLAN_TRANSCODE, None, ["-c:v", "libx264", "-preset", "veryfast"])
+        self.assertEqual(args[args.index("-c:v") + 1], "mpeg4")
+        mock_capabilities.return_value = _capabilities()
+        args = _codec_args(PLAN_TRANSCODE, None, ["-c:v", "libx264", "-preset", "veryfast"])
+        self.assertEqual(args[:4], ["-c:v", "libx264", "-preset", "veryfast"])
+
+    @patch('recorder.merger.get_ffprobe_path', return_value="ffprobe")
+    @patch('recorder.merger._run_ffprobe')
+    def test_probe_results_are_memoized(self, mock_probe, mock_ffprobe):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, "temp_video.avi")
+            with open(path, "wb") as f:
+                f.write(b"x" * 10)
+            mock_probe.return_value = {"video": {"codec_name": "mpeg4"}, "audio": None, "duration": 1.0}
+            self.assertEqual(probe_media(path), probe_media(path))
+            self.assertEqual(mock_probe.call_count, 1)
+
+            # A file that changed is probed again
+            with open(path, "ab") as f:
+                f.write(b"more")
+            probe_media(path)
+            self.assertEqual(mock_probe.call_count, 2)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_progress_parsing(self):
+        parser = FFmpegProgress(duration=10.0)
+        block = ["frame=120", "fps=240.5", "out_time_us=4000000", "speed=2.00x"]
+        for line in block:
+            self.assertIsNone(parser.feed(line))
+        update = parser.feed("progress=continue")
+        self.assertAlmostEqual(update["percent"], 40.0)
+        self.assertAlmostEqual(update["fps"], 240.5)
+        self.assertAlmostEqual(update["eta"], 3.0)
+        self.assertFalse(update["done"])
+        self.assertEqual(parser.feed("progress=end")["percent"], 100.0)
+
+class TestCapabilities(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.binary = os.path.join(self.folder, "ffmpeg")
+        with open(self.binary, "wb") as f:
+            f.write(b"build 1")
+        self.cache = CapabilityCache(os.path.join(self.folder, "caps.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_cache_is_keyed_by_binary(self):
+        probe = MagicMock(return_value=_capabilities())
+        first = self.cache.get(self.binary, probe)
+        self.assertTrue(first.has_encoder("libx264"))
+        # Same binary: answered from disk, even by a new cache instance
+        again = CapabilityCache(self.cache.path).get(self.binary, probe)
+        self.assertEqual(again.as_dict(), first.as_dict())
+        self.assertEqual(probe.call_count, 1)
+
+        # Replaced binary: probed again
+        with open(self.binary, "wb") as f:
+            f.write(b"build 2, larger")
+        self.cache.get(self.binary, probe)
+        self.assertEqual(probe.call_count, 2)
+
+    def test_failed_probe_is_not_stored(self):
+        probe = MagicMock(return_value=None)
+        self.assertIsNone(self.cache.get(self.binary, probe))
+        self.assertIsNone(self.cache.get(self.binary, probe))
+        self.assertEqual(probe.call_count, 2)
+        self.assertIsNone(self.cache.get(os.path.join(self.folder, "missing"), probe))
+
+    @patch('subprocess.run')
+    def test_probe_parses_listings(self, mock_run):
+        outputs = {
+            "-version": "ffmpeg version 7.0.2-static https://johnvansickle.com/ffmpeg/\n",
+            "-encoders": "Encoders:\n V..... = Video\n ------\n V....D libx264     H.264\n A....D aac   AAC\n",
+            "-muxers": "Formats:\n .E. = Muxing supported\n ---\n  E  mp4   MP4\n D   wav_in  x\n  E  matroska,webm  MKV\n",
+            "-pix_fmts": "Pixel formats:\nFLAGS NAME\n-----\nIO... yuv420p  3 12\nI.... pal8in 1 8\n",
+        }
+        mock_run.side_effect = lambda cmd, **kwargs: subprocess.CompletedProcess(cmd, 0, outputs[cmd[-1]].encode())
+        capabilities = probe_capabilities("ffmpeg")
+        self.assertEqual(capabilities.version, "7.0.2-static")
+        self.assertEqual(capabilities.encoders, {"libx264", "aac"})
+        self.assertEqual(capabilities.muxers, {"mp4", "matroska", "webm"})
+        self.assertEqual(capabilities.pix_fmts, {"yuv420p"})
+
+        mock_run.side_effect = FileNotFoundError
+        self.assertIsNone(probe_capabilities("ffmpeg"))
+
 if __name__ == '__main__':
     unittest.main()
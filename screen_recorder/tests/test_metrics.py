@@ -0,0 +1,82 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.metrics import AudioStatusCounters, Histogram, depth_histogram, write_session_metrics
+from recorder.audio_capture import AudioRecorder
+
+class FakeStatus:
+    def __init__(self, **flags):
+        self.__dict__.update(flags)
+
+    def __bool__(self):
+        return any(self.__dict__.values())
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles_and_buckets(self):
+        histogram = Histogram()
+        for _ in range(90):
+            histogram.record(0.003)  # 2-4 ms bucket
+        for _ in range(10):
+            histogram.record(0.030)  # 16-32 ms bucket
+        stats = histogram.as_dict()
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["p50_ms"], 4.0)
+        self.assertEqual(stats["p99_ms"], 30.0)  # capped at the max seen
+        self.assertEqual(stats["max_ms"], 30.0)
+        self.assertEqual(stats["buckets"], {"<=4": 90, "<=32": 10})
+
+    def test_overflow_and_depths(self):
+        histogram = Histogram()
+        histogram.record(10.0)
+        self.assertEqual(histogram.as_dict()["buckets"], {">4096": 1})
+
+        depths = depth_histogram(4)
+        for depth in (0, 0, 1, 4):
+            depths.record(depth)
+        stats = depths.as_dict(scale=1, unit="depth")
+        self.assertEqual(stats["buckets"], {"<=0": 2, "<=1": 1, "<=4": 1})
+        self.assertEqual(stats["max_depth"], 4)
+
+class TestAudioMetrics(unittest.TestCase):
+    def test_status_counters(self):
+        counters = AudioStatusCounters()
+        counters.record(FakeStatus())
+        counters.record(FakeStatus(input_overflow=True))
+        counters.record(FakeStatus(input_overflow=True, input_underflow=True))
+        stats = counters.as_dict()
+        self.assertEqual(stats["callbacks"], 3)
+        self.assertEqual(stats["input_overflow"], 2)
+        self.assertEqual(stats["input_underflow"], 1)
+
+    def test_instrumented_callback(self):
+        recorder = AudioRecorder()
+        seen = []
+        callback = recorder._instrument("mic", lambda indata, frames, t, status: seen.append(frames))
+        block = np.zeros((512, 2), dtype=np.float32)
+        callback(block, 512, None, FakeStatus(input_overflow=True))
+        callback(block, 512, None, FakeStatus())
+        self.assertEqual(seen, [512, 512])
+        stats = recorder.get_stats()
+        self.assertEqual(stats["status"]["mic"]["input_overflow"], 1)
+        self.assertEqual(stats["callback"]["count"], 2)
+        self.assertNotIn("buckets", stats["callback"])
+
+class TestSessionMetrics(unittest.TestCase):
+    def test_write_creates_folder(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, "metrics", "session.json")
+            self.assertTrue(write_session_metrics(path, {"video": [{"frames": 3}]}))
+            with open(path) as f:
+                self.assertEqual(json.load(f), {"video": [{"frames": 3}]})
+        finally:
+            shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.pipeline import Frame, FramePool, FrameQueue, FrameScheduler, FrameTimeline, StageStats, STOP
+
+class TestFrameQueue(unittest.TestCase):
+    def test_drop_oldest(self):
+        dropped = []
+        q = FrameQueue(2, "drop_oldest", on_drop=dropped.append)
+        self.assertTrue(q.put(1))
+        self.assertTrue(q.put(2))
+        self.assertFalse(q.put(3))
+        self.assertEqual(dropped, [1])
+        self.assertEqual([q.get(), q.get()], [2, 3])
+
+    def test_drop_newest(self):
+        dropped = []
+        q = FrameQueue(1, "drop_newest", on_drop=dropped.append)
+        q.put(1)
+        self.assertFalse(q.put(2))
+        self.assertEqual(dropped, [2])
+        self.assertEqual(q.get(), 1)
+
+    def test_stop_is_never_dropped(self):
+        q = FrameQueue(1, "drop_oldest")
+        q.close()
+        q.put(1)
+        self.assertIs(q.get(), STOP)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            FrameQueue(1, "sometimes")
+
+class TestStageStats(unittest.TestCase):
+    def test_record(self):
+        stats = StageStats("encode")
+        stats.record(0.010, queue_depth=3)
+        stats.record(0.020, queue_depth=1)
+        stats.record_drop()
+        d = stats.as_dict()
+        self.assertEqual(d["frames"], 2)
+        self.assertEqual(d["dropped"], 1)
+        self.assertEqual(d["max_queue"], 3)
+        self.assertAlmostEqual(d["avg_ms"], 15.0)
+
+class TestFramePool(unittest.TestCase):
+    def test_buffers_are_recycled(self):
+        pool = FramePool((4, 4, 3), 2)
+        first = pool.acquire()
+        frame = Frame(0, 0.0, first)
+        frame.pool = pool
+        frame.release()
+        pool.acquire()
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.allocated, 2)
+
+    def test_grows_when_exhausted(self):
+        pool = FramePool((4, 4, 3), 1)
+        pool.acquire()
+        pool.acquire()
+        self.assertEqual(pool.allocated, 2)
+
+class TestFrameTimeline(unittest.TestCase):
+    def test_gaps_repeat_previous_frame(self):
+        timeline = FrameTimeline(10)
+        self.assertEqual(timeline.place(0.0), (0, 1))
+        self.assertEqual(timeline.place(0.1), (0, 1))
+        # 300 ms stall: slots 2 and 3 hold the previous frame
+        self.assertEqual(timeline.place(0.4), (2, 1))
+
+    def test_frames_in_same_slot_are_skipped(self):
+        timeline = FrameTimeline(10)
+        timeline.place(0.0)
+        self.assertEqual(timeline.place(0.04), (0, 0))
+
+    def test_first_frame_covers_startup(self):
+        timeline = FrameTimeline(10)
+        self.assertEqual(timeline.place(0.2), (0, 3))
+
+    def test_pad_to_end(self):
+        timeline = FrameTimeline(10)
+        timeline.place(0.0)
+        self.assertEqual(timeline.pad(0.5), 4)
+        self.assertEqual(timeline.pad(0.5), 0)
+
+class TestFrameScheduler(unittest.TestCase):
+    def test_deadlines_are_absolute(self):
+        scheduler = FrameScheduler(10, origin=100.0)
+        # Grabs that finish early keep the grid; no drift accumulates
+        for tick in range(5):
+            self.assertAlmostEqual(scheduler.deadline(), 100.0 + tick * 0.1)
+            self.assertEqual(scheduler.done(scheduler.deadline() + 0.001, now=scheduler.deadline() + 0.02), 0)
+        self.assertEqual(scheduler.late, 0)
+
+    def test_slow_grab_skips_passed_deadlines(self):
+        scheduler = FrameScheduler(10, origin=100.0)
+        scheduler.done(100.0, now=100.0)
+        # Tick 1 grab starts late and takes 0.25 s: ticks 2, 3 and 4 have passed
+        self.assertEqual(scheduler.done(100.16, now=100.41), 3)
+        self.assertAlmostEqual(scheduler.deadline(), 100.5)
+        self.assertEqual(scheduler.as_dict()["skipped"], 3)
+        self.assertEqual(scheduler.late, 1)
+        self.assertAlmostEqual(scheduler.max_lateness, 0.06)
+
+    def test_resync_and_shift_do_not_count_skips(self):
+        scheduler = FrameScheduler(10, origin=100.0)
+        scheduler.resync(now=100.35)
+        self.assertAlmostEqual(scheduler.deadline(), 100.4)
+        scheduler.shift(2.0)  # paused for 2 s
+        self.assertAlmostEqual(scheduler.deadline(), 102.4)
+        self.assertEqual(scheduler.skipped, 0)
+
+if __name__ == '__main__':
+    unittest.main()
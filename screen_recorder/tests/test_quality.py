@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.quality import (AUTO, CalibrationCache, EncodeWatchdog, calibrate, calibration_key,
+                              resolve_profile)
+from recorder.merger import get_temp_dir
+
+class TestQualityProfiles(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = CalibrationCache(os.path.join(self.folder, "calibration.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_named_profiles(self):
+        profile = resolve_profile("High", 1920, 1080, 30)
+        self.assertEqual((profile.preset, profile.crf), ("fast", 20))
+        self.assertEqual(profile.video_args()[:6], ["-c:v", "libx264", "-preset", "fast", "-crf", "20"])
+        self.assertEqual(resolve_profile("Bogus", 1920, 1080, 30).name, "Medium")
+
+    def test_default_cache_is_not_in_the_working_directory(self):
+        self.assertEqual(os.path.dirname(CalibrationCache().path), get_temp_dir())
+
+    @patch('recorder.quality.measure_preset')
+    def test_calibration_picks_slowest_preset_with_headroom(self, mock_measure):
+        speeds = {"ultrafast": 120, "superfast": 90, "veryfast": 60, "faster": 35, "fast": 30, "medium": 20}
+        mock_measure.side_effect = lambda preset, *args: speeds[preset]
+        entry = calibrate(1920, 1080, 30)
+        self.assertEqual(entry["preset"], "veryfast")
+        # Stops at the first preset that is too slow
+        self.assertNotIn("fast", entry["fps"])
+
+    @patch('recorder.quality.calibrate', return_value={"preset": "faster", "fps": {}})
+    def test_auto_uses_cache_and_calibrates_once(self, mock_calibrate):
+        # Miss without calibration: Medium's preset
+        self.assertEqual(resolve_profile(AUTO, 1280, 720, 30, self.cache).preset, "veryfast")
+        mock_calibrate.assert_not_called()
+
+        self.assertEqual(resolve_profile(AUTO, 1280, 720, 30, self.cache, calibrate_missing=True).preset, "faster")
+        self.assertEqual(resolve_profile(AUTO, 1280, 720, 30, self.cache, calibrate_missing=True).preset, "faster")
+        self.assertEqual(mock_calibrate.call_count, 1)
+
+    def test_downgrade_steps_to_faster_preset(self):
+        key = calibration_key(1920, 1080, 60)
+        self.cache.put(key, {"preset": "fast", "fps": {}})
+        self.assertEqual(self.cache.downgrade(key, "fast"), "faster")
+        # A second report from a session that still ran "fast" does not skip a step
+        self.assertEqual(self.cache.downgrade(key, "fast"), "faster")
+        self.assertEqual(self.cache.get(key)["downgrades"], 1)
+        self.assertIsNone(self.cache.downgrade(key, "ultrafast"))
+
+class FakeRecorder:
+    def __init__(self):
+        self.backlog = 0.0
+
+    def encode_backlog(self):
+        return self.backlog
+
+class TestEncodeWatchdog(unittest.TestCase):
+    def test_triggers_only_on_sustained_backlog(self):
+        recorder = FakeRecorder()
+        calls = []
+        watchdog = EncodeWatchdog(recorder, lambda: calls.append(1), patience=0.1, interval=0.01)
+        watchdog.start()
+        recorder.backlog = 0.9
+        time.sleep(0.05)
+        recorder.backlog = 0.1  # recovered before the patience ran out
+        time.sleep(0.05)
+        self.assertEqual(calls, [])
+        recorder.backlog = 0.75
+        time.sleep(0.3)
+        watchdog.stop()
+        self.assertEqual(calls, [1])
+        self.assertTrue(watchdog.triggered)
+
+if __name__ == '__main__':
+    unittest.main()
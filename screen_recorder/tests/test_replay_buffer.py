@@ -0,0 +1,178 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.audio_capture import AudioRecorder
+from recorder.frame_sources import BufferSource
+from recorder.replay_buffer import ReplayBuffer
+from recorder.session_clock import SessionClock
+from recorder.video_capture import VideoRecorder
+
+def frame(value):
+    return np.full((36, 64, 3), value, dtype=np.uint8)
+
+class TestReplayBuffer(unittest.TestCase):
+    def test_keeps_only_the_last_seconds(self):
+        replay = ReplayBuffer(seconds=1.0, fps=10, samplerate=100, channels=1, queue_size=64)
+        for i in range(35):
+            replay.video.write(frame(i))
+            replay.audio.write(np.full((10, 1), i, dtype=np.int16))
+
+        replay.flush()
+        snapshot = replay.snapshot()
+        self.assertEqual(len(snapshot.frames), 10)
+        self.assertAlmostEqual(snapshot.duration, 1.0)
+        # Audio is cut to exactly the frames' span (slots 25..34 -> samples 250..350)
+        audio = np.concatenate(snapshot.audio)
+        self.assertEqual(len(audio), 100)
+        self.assertEqual(audio[0, 0], 25)
+        self.assertEqual(audio[-1, 0], 34)
+
+    def test_repeated_frames_share_one_encoding(self):
+        replay = ReplayBuffer(seconds=10.0, fps=10, samplerate=100, channels=1, queue_size=64)
+        held = frame(128)
+        replay.video.write(held)
+        replay.flush()
+        size = replay.video_bytes
+        for _ in range(5):
+            replay.video.write(held)
+        replay.flush()
+        self.assertEqual(replay.video_bytes, size)
+        snapshot = replay.snapshot()
+        self.assertEqual(len(snapshot.frames), 6)
+        self.assertTrue(all(jpeg is snapshot.frames[0] for jpeg in snapshot.frames))
+
+    def test_memory_cap_evicts_oldest(self):
+        replay = ReplayBuffer(seconds=100.0, max_bytes=20000, fps=10, samplerate=100, channels=1, queue_size=64)
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            replay.video.write(rng.integers(0, 255, (36, 64, 3), dtype=np.uint8))
+        replay.flush()
+        self.assertLessEqual(replay.bytes_used, 20000)
+        self.assertGreater(replay.evicted_frames, 0)
+
+    def test_snapshot_pads_missing_audio_and_limits_length(self):
+        replay = ReplayBuffer(seconds=10.0, fps=10, samplerate=100, channels=1, queue_size=64)
+        for i in range(20):
+            replay.video.write(frame(i))
+        replay.flush()
+        self.assertIsNone(ReplayBuffer().snapshot())
+
+        # Audio that starts late is padded with silence at the front
+        replay._next_sample = 150
+        replay.audio.write(np.ones((50, 1), dtype=np.int16))
+        snapshot = replay.snapshot(seconds=1.0)
+        self.assertEqual(len(snapshot.frames), 10)
+        audio = np.concatenate(snapshot.audio)
+        self.assertEqual(len(audio), 100)
+        self.assertEqual(int(audio[:50].sum()), 0)
+        self.assertEqual(int(audio[50:].sum()), 50)
+
+    def test_sessions_are_realigned(self):
+        replay = ReplayBuffer(seconds=10.0, fps=10, samplerate=100, channels=1, queue_size=64)
+        for i in range(10):
+            replay.video.write(frame(i))
+        replay.audio.write(np.ones((40, 1), dtype=np.int16))  # first session's audio ended early
+        replay.begin_session()
+        replay.video.write(frame(200))
+        replay.audio.write(np.full((10, 1), 2, dtype=np.int16))
+        replay.flush()
+        audio = np.concatenate(replay.snapshot().audio)
+        self.assertEqual(len(audio), 110)
+        self.assertEqual(int(audio[40:100].sum()), 0)  # the gap is silence
+        self.assertEqual(int(audio[100:].sum()), 20)  # new audio lines up with slot 10
+
+    def test_bgra_frames(self):
+        replay = ReplayBuffer(seconds=10.0, fps=10)
+        replay.video.write(np.full((36, 64, 4), 90, dtype=np.uint8))
+        replay.flush()
+        self.assertEqual(len(replay.snapshot().frames), 1)
+
+    def test_slow_encoder_does_not_block_the_tap(self):
+        replay = ReplayBuffer(seconds=10.0, fps=10, queue_size=2)
+        self.addCleanup(replay.close)
+        encode = cv2.imencode
+
+        def slow_encode(*args):
+            time.sleep(0.05)
+            return encode(*args)
+
+        with patch('recorder.replay_buffer.cv2.imencode', side_effect=slow_encode):
+            replay.video.write(frame(0))
+            replay.flush()
+            started = time.perf_counter()
+            for i in range(1, 20):
+                replay.video.write(frame(i))
+            # Writing only copies the frame; twenty encodes would take a second
+            self.assertLess(time.perf_counter() - started, 0.5)
+            self.assertTrue(replay.flush(5))
+        self.assertGreater(replay.dropped_frames, 0)
+        # Dropped frames' slots hold the previous frame, so the timeline is intact
+        snapshot = replay.snapshot()
+        self.assertEqual(len(snapshot.frames), 20)
+        self.assertEqual(cv2.imdecode(np.frombuffer(snapshot.frames[-1], np.uint8), cv2.IMREAD_COLOR)[0, 0, 0], 19)
+
+class CollectingWriter:
+    def __init__(self):
+        self.frames = []
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        self.frames.append(frame.copy())
+
+    def release(self):
+        pass
+
+class CollectingAudio:
+    def __init__(self):
+        self.blocks = []
+
+    def write(self, pcm):
+        self.blocks.append(pcm)
+
+class TestRecorderTaps(unittest.TestCase):
+    def test_video_tap_gets_every_written_frame(self):
+        replay = ReplayBuffer(seconds=10.0, fps=30)
+        sink = CollectingWriter()
+        frames = [np.full((36, 64, 3), i * 20, dtype=np.uint8) for i in range(5)]
+        rec = VideoRecorder(fps=30, show_cursor=False, sink=sink, source=BufferSource(frames, loop=False),
+                            taps=[replay.video])
+        rec.start()
+        deadline = time.time() + 5
+        while not rec.stop_event.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        rec.stop()
+        replay.flush()
+        self.assertEqual(len(replay.snapshot().frames), len(sink.frames))
+
+    def test_audio_tap_is_aligned_to_the_video(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        tap = CollectingAudio()
+        rec = AudioRecorder(filename=os.path.join(folder, "audio.wav"), samplerate=1000, channels=1, taps=[tap])
+        rec.clock = SessionClock()
+        rec.clock.start()
+        rec.clock.mark(SessionClock.AUDIO_FIRST_SAMPLE, rec.clock.origin + 0.05)
+        rec.dsp = rec._build_chain(is_loopback=True, limiter=False)
+        for _ in range(3):
+            rec._queue.put(np.full((100, 1), 0.5, dtype=np.float32))
+        rec._queue.put(None)
+        rec._writer_loop()
+        # The WAV file is shifted when merging; the tap gets the 50 ms of leading silence itself
+        self.assertEqual(rec.samples_written, 300)
+        audio = np.concatenate(tap.blocks)
+        self.assertEqual(len(audio), 350)
+        self.assertFalse(audio[:50].any())
+        self.assertTrue(audio[50:].all())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.scaling import Scaler, output_size
+
+class TestOutputSize(unittest.TestCase):
+    def test_presets_keep_aspect_and_never_upscale(self):
+        self.assertEqual(output_size(3840, 2160, "1080p"), (1920, 1080))
+        self.assertEqual(output_size(3440, 1440, "1080p"), (2580, 1080))
+        self.assertEqual(output_size(1440, 2560, "720p"), (720, 1280))  # portrait: short side
+        self.assertEqual(output_size(1280, 720, "1080p"), (1280, 720))
+        self.assertEqual(output_size(1920, 1080, None), (1920, 1080))
+        self.assertEqual(output_size(1920, 1080, "Native"), (1920, 1080))
+
+    def test_custom_box_and_even_sides(self):
+        self.assertEqual(output_size(2560, 1600, "1280x720"), (1152, 720))
+        self.assertEqual(output_size(2560, 1440, (1000, 1000)), (1000, 562))
+        self.assertEqual(output_size(1365, 767, None), (1364, 766))
+        with self.assertRaises(ValueError):
+            output_size(1920, 1080, "huge")
+
+class TestScaler(unittest.TestCase):
+    def check(self, src_size, out_size):
+        src = np.zeros((src_size[1], src_size[0], 4), dtype=np.uint8)
+        src[:, :src_size[0] // 2] = 200
+        scaler = Scaler(src.shape, out_size)
+        dst = np.empty((out_size[1], out_size[0], 4), dtype=np.uint8)
+        result = scaler.resize(src, dst)
+        self.assertIs(result, dst)
+        # Flat areas stay flat, the edge stays in the middle
+        self.assertTrue((dst[:, :out_size[0] // 2 - 2] == 200).all())
+        self.assertTrue((dst[:, out_size[0] // 2 + 2:] == 0).all())
+        return scaler
+
+    def test_whole_ratio_uses_single_area_pass(self):
+        scaler = self.check((3840, 2160), (1920, 1080))
+        self.assertIsNone(scaler._mid)
+
+    def test_fractional_ratio_is_prescaled(self):
+        scaler = self.check((3840, 2160), (1600, 900))
+        self.assertEqual(scaler._mid.shape, (1080, 1920, 4))
+        self.check((2560, 1440), (1920, 1080))
+
+    def test_native_size_is_inactive(self):
+        self.assertFalse(Scaler((1080, 1920, 4), (1920, 1080)).active)
+
+if __name__ == '__main__':
+    unittest.main()
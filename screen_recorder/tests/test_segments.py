@@ -0,0 +1,160 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import wave
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.segments import SegmentController, SegmentedVideoWriter, SegmentedWavWriter, segment_path
+
+class TestSegmentController(unittest.TestCase):
+    def test_periodic_boundaries(self):
+        controller = SegmentController(seconds=2)
+        self.assertEqual(controller.segment_at("video", 0.0), 0)
+        self.assertEqual(controller.segment_at("video", 1.999), 0)
+        self.assertEqual(controller.segment_at("video", 2.0), 1)
+        self.assertEqual(controller.segment_at("video", 9.5), 4)
+        self.assertAlmostEqual(controller.next_boundary(4.0), 6.0)
+
+    def test_size_split_lands_ahead_of_furthest_recorder(self):
+        controller = SegmentController(max_bytes=1000, lead=2.0)
+        self.assertIsNone(controller.next_boundary(0.0))
+        controller.segment_at("video", 3.0)
+        controller.segment_at("audio", 4.0)
+        controller.request_split()
+        controller.request_split()  # already pending, ignored
+        self.assertAlmostEqual(controller.next_boundary(3.0), 6.0)
+        self.assertEqual(controller.segment_at("video", 6.0), 1)
+        self.assertIsNone(controller.next_boundary(6.0))
+
+    def test_segment_path(self):
+        self.assertEqual(segment_path(os.path.join("tmp", "temp_video.avi"), 3),
+                         os.path.join("tmp", "temp_video_003.avi"))
+
+    @patch('recorder.segments.concat_segments', return_value=True)
+    @patch('recorder.segments.merge_audio_video', return_value=True)
+    def test_finish_merges_pairs_and_concatenates_in_order(self, mock_merge, mock_concat):
+        controller = SegmentController(seconds=1, keep_temp=True)
+        controller.register("video")
+        controller.register("audio")
+        controller.closed("video", 0, "v_000.avi", 0.0)
+        controller.closed("audio", 0, "a_000.wav", 0.04)
+        controller.closed("video", 1, "v_001.avi", 1.0)
+        controller.closed("audio", 1, "a_001.wav", 1.0)
+        controller.closed("video", 2, "v_002.avi", 2.0)  # audio never closed: merged at finish
+
+        self.assertTrue(controller.finish("out.mp4"))
+        self.assertEqual(mock_merge.call_count, 3)
+        first = mock_merge.call_args_list[0]
+        self.assertEqual(first[0][:3], ("v_000.avi", "a_000.wav", "v_000.mp4"))
+        self.assertAlmostEqual(first[1]["audio_offset"], 0.04)
+        mock_concat.assert_called_once_with(["v_000.mp4", "v_001.mp4", "v_002.mp4"], "out.mp4")
+
+class TestSegmentedWriters(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    @patch('recorder.segments.merge_audio_video', return_value=True)
+    def test_audio_splits_exactly_at_boundaries(self, mock_merge):
+        controller = SegmentController(seconds=1)
+        controller.register("audio")
+        base = os.path.join(self.folder, "a.wav")
+        # Audio joins the timeline 0.25 s in
+        writer = SegmentedWavWriter(controller, base, samplerate=1000, channels=1, start=0.25)
+        for i in range(10):
+            writer.write(np.full((300, 1), i, dtype=np.int16))
+        writer.close()
+        controller._jobs.join()
+
+        lengths = []
+        for index in range(4):
+            with wave.open(segment_path(base, index), 'rb') as wf:
+                lengths.append(wf.getnframes())
+        self.assertEqual(lengths, [750, 1000, 1000, 250])
+        starts = [controller._parts[index]["audio"][1] for index in range(4)]
+        self.assertEqual(starts, [0.25, 1.0, 2.0, 3.0])
+
+    @patch('recorder.segments.merge_audio_video', return_value=True)
+    def test_video_rotates_on_frame_position(self, mock_merge):
+        controller = SegmentController(seconds=1)
+        controller.register("video")
+        opened = []
+
+        def open_writer(path):
+            writer = MagicMock()
+            writer.isOpened.return_value = True
+            opened.append((path, writer))
+            return writer
+
+        writer = SegmentedVideoWriter(controller, "v.avi", 10, open_writer)
+        for _ in range(25):
+            writer.write("frame")
+        writer.release()
+
+        self.assertEqual([path for path, _ in opened], ["v_000.avi", "v_001.avi", "v_002.avi"])
+        self.assertEqual([w.write.call_count for _, w in opened], [10, 10, 5])
+
+    @patch('recorder.segments.merge_audio_video', return_value=True)
+    def test_rotation_does_not_wait_for_the_closed_segment(self, mock_merge):
+        controller = SegmentController(seconds=1)
+        controller.register("video")
+        flushed = threading.Event()
+        opened = []
+
+        def open_writer(path):
+            writer = MagicMock()
+            writer.isOpened.return_value = True
+            # An encoding writer only returns once ffmpeg has finished the file
+            writer.release.side_effect = lambda: flushed.wait(5)
+            opened.append(writer)
+            return writer
+
+        writer = SegmentedVideoWriter(controller, "v.avi", 10, open_writer)
+        started = time.perf_counter()
+        for _ in range(15):
+            writer.write("frame")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(opened[1].write.call_count, 5)
+        self.assertNotIn(0, controller._parts)
+
+        flushed.set()
+        writer.release()
+        self.assertEqual(set(controller._parts), {0, 1})
+
+    @patch('recorder.segments.shutil.move')
+    @patch('recorder.segments.merge_audio_video', return_value=True)
+    def test_audio_past_the_last_video_segment_is_dropped(self, mock_merge, mock_move):
+        # The video recorder stops first: 59 frames at 30 fps, 2.1 s of audio, 2 s segments
+        controller = SegmentController(seconds=2)
+        controller.register("video")
+        controller.register("audio")
+
+        def open_writer(path):
+            writer = MagicMock()
+            writer.isOpened.return_value = True
+            return writer
+
+        video = SegmentedVideoWriter(controller, os.path.join(self.folder, "v.avi"), 30, open_writer)
+        audio_base = os.path.join(self.folder, "a.wav")
+        audio = SegmentedWavWriter(controller, audio_base, samplerate=1000, channels=1)
+        for _ in range(59):
+            video.write("frame")
+        video.release()
+        audio.write(np.zeros((2100, 1), dtype=np.int16))
+        audio.close()
+
+        self.assertTrue(controller.finish(os.path.join(self.folder, "out.mp4")))
+        self.assertEqual(mock_merge.call_count, 1)
+        self.assertEqual(controller.as_dict()["segments"], 1)
+        self.assertFalse(os.path.exists(segment_path(audio_base, 1)))
+
+if __name__ == '__main__':
+    unittest.main()
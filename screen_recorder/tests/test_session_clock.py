@@ -0,0 +1,38 @@
+import unittest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.session_clock import SessionClock
+
+class TestSessionClock(unittest.TestCase):
+    def test_events_are_relative_to_origin(self):
+        clock = SessionClock()
+        clock.start()
+        self.assertTrue(clock.mark(SessionClock.VIDEO_FIRST_FRAME, clock.origin + 0.010))
+        # Only the first occurrence counts
+        self.assertFalse(clock.mark(SessionClock.VIDEO_FIRST_FRAME, clock.origin + 0.5))
+        self.assertAlmostEqual(clock.elapsed(SessionClock.VIDEO_FIRST_FRAME), 0.010)
+        self.assertIsNone(clock.elapsed(SessionClock.AUDIO_FIRST_SAMPLE))
+
+    def test_audio_offset_accounts_for_processing_latency(self):
+        clock = SessionClock()
+        clock.start()
+        self.assertEqual(clock.audio_offset(), 0.0)
+        clock.audio_latency = 0.005
+        clock.mark(SessionClock.AUDIO_FIRST_SAMPLE, clock.origin + 0.045)
+        self.assertAlmostEqual(clock.audio_offset(), 0.040)
+        self.assertAlmostEqual(clock.as_dict()["av_skew_ms"], 40.0)
+
+    def test_restart_clears_events(self):
+        clock = SessionClock()
+        clock.start()
+        clock.mark(SessionClock.AUDIO_STREAM_OPEN)
+        time.sleep(0.001)
+        clock.start()
+        self.assertIsNone(clock.elapsed(SessionClock.AUDIO_STREAM_OPEN))
+        self.assertGreaterEqual(clock.now(), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
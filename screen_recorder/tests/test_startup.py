@@ -0,0 +1,46 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.startup import REPORT_ENV, StartupTimer, report_target
+
+class TestReportTarget(unittest.TestCase):
+    def test_flag_and_environment(self):
+        self.assertEqual(report_target([], {}), (False, None))
+        self.assertEqual(report_target(["--startup-report"], {}), (True, None))
+        self.assertEqual(report_target(["--startup-report=out.json"], {}), (True, "out.json"))
+        self.assertEqual(report_target([], {REPORT_ENV: "1"}), (True, None))
+        self.assertEqual(report_target([], {REPORT_ENV: "start.json"}), (True, "start.json"))
+        self.assertEqual(report_target([], {REPORT_ENV: "0"}), (False, None))
+
+class TestStartupTimer(unittest.TestCase):
+    def test_marks_are_relative_to_launch_and_ordered(self):
+        timer = StartupTimer(origin=time.perf_counter() - 0.5)
+        timer.mark("window_shown")
+        timer.mark("audio_probed")
+        marks = timer.as_dict()
+        self.assertEqual(list(marks), ["window_shown", "audio_probed"])
+        self.assertGreaterEqual(marks["window_shown"], 500.0)
+
+    def test_report_only_when_enabled(self):
+        path = os.path.join(tempfile.mkdtemp(), "startup.json")
+        timer = StartupTimer(path=path)
+        timer.mark("imports")
+        timer.report()
+        self.assertFalse(os.path.exists(path))
+
+        timer.enabled = True
+        with patch('builtins.print') as mock_print:
+            timer.report()
+        mock_print.assert_called()
+        with open(path) as f:
+            self.assertIn("imports", json.load(f)["marks_ms"])
+        os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
 import unittest
 from unittest.mock import MagicMock, patch
 import os
+import json
+import shutil
 import sys
+import tempfile
 import time
 import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recorder.frame_sources import BufferSource
+from recorder.pipeline import Frame
 from recorder.video_capture import VideoRecorder
 
 class TestVideoRecorder(unittest.TestCase):
@@ -58,5 +63,108 @@ class TestVideoRecorder(unittest.TestCase):
         mock_video_writer.return_value.write.assert_called()
         mock_video_writer.return_value.release.assert_called()
 
+    @patch('cv2.VideoWriter')
+    def test_frame_stats_are_written_when_asked(self, mock_video_writer):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        filename = os.path.join(folder, "video.avi")
+        stats_path = os.path.join(folder, "frames.json")
+        frames = [np.full((48, 64, 3), i * 40, dtype=np.uint8) for i in range(4)]
+        rec = VideoRecorder(filename=filename, fps=30, show_cursor=False, source=BufferSource(frames, loop=False),
+                            stats_path=stats_path)
+        rec.start()
+        deadline = time.time() + 5
+        while not rec.stop_event.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        rec.stop()
+
+        with open(stats_path) as f:
+            stats = json.load(f)
+        self.assertEqual(stats, json.loads(json.dumps(rec.frame_stats())))
+        self.assertGreater(stats["written"], 0)
+        self.assertEqual(os.listdir(folder), ["frames.json"])  # nothing next to the (mocked) video
+
+    def test_dropped_changed_frame_does_not_become_the_reference(self):
+        old = np.zeros((48, 64, 4), dtype=np.uint8)
+        new = old.copy()
+        new[20, 30] = 255
+        rec = VideoRecorder(fps=30, show_cursor=False, source=BufferSource([old]), static_keepalive=60)
+        self.assertFalse(rec._is_unchanged(old, 0.0, None))
+        rec._accept(Frame(0, 0.0, old))
+        self.assertTrue(rec._is_unchanged(old.copy(), 0.1, None))
+        # The changed frame is queued, then evicted by the drop-oldest capture queue
+        self.assertFalse(rec._is_unchanged(new, 0.2, None))
+        # So the same content must still be emitted until a frame carrying it is converted
+        self.assertFalse(rec._is_unchanged(new.copy(), 0.3, None))
+        rec._accept(Frame(2, 0.3, new))
+        self.assertTrue(rec._is_unchanged(new.copy(), 0.4, None))
+        # A slower worker finishing an older frame does not move the reference back
+        rec._accept(Frame(1, 0.2, old))
+        self.assertTrue(rec._is_unchanged(new.copy(), 0.5, None))
+
+    @patch('recorder.video_capture.get_ffmpeg_path', return_value="ffmpeg")
+    @patch('recorder.video_capture.EncodingWriter')
+    def test_profile_is_encoded_while_recording(self, mock_writer, mock_path):
+        frames = [np.zeros((48, 64, 3), dtype=np.uint8)]
+        profile = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23"]
+        rec = VideoRecorder(filename=os.path.join("tmp", "temp_video.avi"), fps=30, show_cursor=False,
+                            source=BufferSource(frames, loop=False), video_args=profile)
+        rec.start()
+        deadline = time.time() + 5
+        while not rec.stop_event.is_set() and time.time() < deadline:
+            time.sleep(0.05)
+        rec.stop()
+
+        # The temp file is already in the profile's codec, so the merge can copy it
+        self.assertTrue(rec.live_encoding)
+        self.assertEqual(rec.filename, os.path.join("tmp", "temp_video.mkv"))
+        mock_writer.assert_called_once_with(rec.filename, 30.0, profile)
+        mock_writer.return_value.write.assert_called()
+        mock_writer.return_value.release.assert_called_once()
+
+    @patch('mss.mss')
+    def test_monitor_selection(self, mock_mss):
+        mock_sct = MagicMock()
+        mock_mss.return_value.__enter__.return_value = mock_sct
+        mock_sct.monitors = [
+            {"top": 0, "left": -1280, "width": 3200, "height": 1080},  # virtual desktop
+            {"top": 0, "left": 0, "width": 1920, "height": 1080},
+            {"top": 56, "left": -1280, "width": 1280, "height": 1024},
+        ]
+
+        rec = VideoRecorder(monitor=2)
+        self.assertEqual(rec.monitor, {"top": 56, "left": -1280, "width": 1280, "height": 1024})
+
+        rec = VideoRecorder(monitor=0)
+        self.assertEqual((rec.width, rec.height), (3200, 1080))
+        self.assertEqual(rec.monitor["left"], -1280)
+
+        # Unplugged display: fall back to the primary one
+        rec = VideoRecorder(monitor=5)
+        self.assertEqual(rec.monitor_index, 1)
+        self.assertEqual(rec.width, 1920)
+
+    @patch('mss.mss')
+    def test_frames_are_scaled_before_encoding(self, mock_mss):
+        mock_sct = MagicMock()
+        mock_mss.return_value = mock_sct
+        mock_mss.return_value.__enter__.return_value = mock_sct
+        mock_sct.monitors = [
+            {"top": 0, "left": 0, "width": 3840, "height": 2160},
+            {"top": 0, "left": 0, "width": 3840, "height": 2160},
+        ]
+        mock_sct.grab.return_value = np.zeros((2160, 3840, 4), dtype=np.uint8)
+        sink = MagicMock()
+        sink.accepts_bgra = False
+        sink.isOpened.return_value = True
+
+        rec = VideoRecorder(fps=30, resolution="720p", sink=sink, show_cursor=False)
+        rec.start()
+        time.sleep(0.3)
+        rec.stop()
+
+        shapes = {call[0][0].shape for call in sink.write.call_args_list}
+        self.assertEqual(shapes, {(720, 1280, 3)})
+
 if __name__ == '__main__':
     unittest.main()
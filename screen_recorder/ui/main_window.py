@@ -12,19 +12,20 @@ import webbrowser
 # Ensure local package is found
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.config import load_config, save_config
-from recorder.audio_capture import AudioRecorder
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
 class MainWindow(ctk.CTk):
-    def __init__(self, start_callback=None, stop_callback=None, pause_callback=None, resume_callback=None, config=None):
+    def __init__(self, start_callback=None, stop_callback=None, pause_callback=None, resume_callback=None, config=None,
+                 refresh_devices_callback=None):
         super().__init__()
         
         self.start_callback = start_callback
         self.stop_callback = stop_callback
         self.pause_callback = pause_callback
         self.resume_callback = resume_callback
+        self.refresh_devices_callback = refresh_devices_callback
         self.config = config if config else {}
         
         self.title("Screen Recorder Pro")
@@ -107,6 +108,10 @@ class MainWindow(ctk.CTk):
         self.chk_cursor.pack(anchor="w", padx=10, pady=5)
         if self.config.get("show_cursor"): self.chk_cursor.select()
 
+        self.chk_clicks = ctk.CTkCheckBox(self.tab_general, text="Highlight Clicks", onvalue=True, offvalue=False, text_color="white")
+        self.chk_clicks.pack(anchor="w", padx=10, pady=5)
+        if self.config.get("highlight_clicks"): self.chk_clicks.select()
+
         self.chk_countdown = ctk.CTkCheckBox(self.tab_general, text="Show Countdown (3s)", onvalue=True, offvalue=False, text_color="white")
         self.chk_countdown.pack(anchor="w", padx=10, pady=5)
         if self.config.get("show_countdown"): self.chk_countdown.select()
@@ -122,6 +127,44 @@ class MainWindow(ctk.CTk):
         self.codec_option.grid(row=1, column=1, sticky="w", padx=10, pady=10)
         self.codec_option.set(self.config.get("codec", "MP4V"))
 
+        ctk.CTkLabel(self.tab_video, text="Resolution:", text_color="white").grid(row=3, column=0, sticky="w", padx=10, pady=10)
+        self.resolution_option = ctk.CTkOptionMenu(self.tab_video, values=["Native", "2160p", "1440p", "1080p", "720p", "480p"])
+        self.resolution_option.grid(row=3, column=1, sticky="w", padx=10, pady=10)
+        self.resolution_option.set(self.config.get("resolution") or "Native")
+
+        ctk.CTkLabel(self.tab_video, text="Quality:", text_color="white").grid(row=4, column=0, sticky="w", padx=10, pady=10)
+        self.quality_option = ctk.CTkOptionMenu(self.tab_video, values=["Low", "Medium", "High", "Auto"])
+        self.quality_option.grid(row=4, column=1, sticky="w", padx=10, pady=10)
+        self.quality_option.set(self.config.get("quality", "Medium"))
+
+        ctk.CTkLabel(self.tab_video, text="Monitor:", text_color="white").grid(row=2, column=0, sticky="w", padx=10, pady=10)
+        # Placeholder until set_monitors() is called with the probed displays
+        self.monitor_names = self._monitor_names(None)
+        self.monitor_option = ctk.CTkOptionMenu(self.tab_video, values=list(self.monitor_names))
+        self.monitor_option.grid(row=2, column=1, sticky="w", padx=10, pady=10)
+        selected = [name for name, index in self.monitor_names.items() if index == self.config.get("monitor", 1)]
+        self.monitor_option.set(selected[0] if selected else list(self.monitor_names)[0])
+
+    def _monitor_names(self, monitors):
+        """Display name -> mss monitor index; 0 spans every display."""
+        if not monitors:
+            index = self.config.get("monitor", 1)
+            return {"All Monitors" if index == 0 else f"Monitor {index}": index}
+        names = {}
+        for index, monitor in enumerate(monitors[1:], start=1):
+            names[f"Monitor {index} ({monitor['width']}x{monitor['height']})"] = index
+        if len(monitors) > 2:
+            names["All Monitors"] = 0
+        return names or {"Monitor 1": 1}
+
+    def set_monitors(self, monitors):
+        """Fills the monitor menu from list_monitors(), keeping the current choice."""
+        current = self.monitor_names.get(self.monitor_option.get(), self.config.get("monitor", 1))
+        self.monitor_names = self._monitor_names(monitors)
+        self.monitor_option.configure(values=list(self.monitor_names))
+        selected = [name for name, index in self.monitor_names.items() if index == current]
+        self.monitor_option.set(selected[0] if selected else list(self.monitor_names)[0])
+
     def _setup_audio_tab(self):
         # Audio Source Type
         ctk.CTkLabel(self.tab_audio, text="Audio Source Mode:", font=ctk.CTkFont(weight="bold"), text_color="white").pack(anchor="w", padx=10, pady=(10, 5))
@@ -133,30 +176,46 @@ class MainWindow(ctk.CTk):
         
         # Microphone Device Selection
         ctk.CTkLabel(self.tab_audio, text="Microphone Device:", text_color="white").pack(anchor="w", padx=10, pady=(10, 5))
-        self.mic_device_option = ctk.CTkOptionMenu(self.tab_audio, values=["Default"])
+        self.mic_device_option = ctk.CTkOptionMenu(self.tab_audio, values=[self.config.get("mic_device") or "Default"])
         self.mic_device_option.pack(anchor="w", padx=10, pady=5)
         
         # System Device Selection (For loopback)
         ctk.CTkLabel(self.tab_audio, text="System Device (Loopback):", text_color="white").pack(anchor="w", padx=10, pady=(10, 5))
-        self.sys_device_option = ctk.CTkOptionMenu(self.tab_audio, values=["Default"])
+        self.sys_device_option = ctk.CTkOptionMenu(self.tab_audio, values=[self.config.get("system_device") or "Default"])
         self.sys_device_option.pack(anchor="w", padx=10, pady=5)
         
-        # Populate Devices
-        self.populate_audio_devices()
+        # Plugged-in devices only show up after PortAudio is re-initialized, which is done on request
+        self.btn_refresh_devices = ctk.CTkButton(self.tab_audio, text="Refresh Devices", width=120,
+                                                 command=self.on_refresh_devices)
+        self.btn_refresh_devices.pack(anchor="w", padx=10, pady=(10, 5))
+        
+        # Devices are filled in by populate_audio_devices() once enumerated; until
+        # then the saved devices (or the defaults) are shown
         self.on_audio_source_change(self.audio_source_type.get())
 
-    def populate_audio_devices(self):
-        # Get devices from AudioRecorder
-        input_devices = AudioRecorder.get_devices(kind='input')
+    def populate_audio_devices(self, input_devices=None, all_devices=None):
+        """
+        Fills the device menus from the device registry's lists (as returned by
+        AudioRecorder.get_devices), which the app hands over once enumerated and
+        again after a hotplug. Without them the registry is asked here.
+        Devices are shown and saved by their stable "Host API: name" key, so
+        the selection survives index changes; the current choice is kept.
+        """
+        if input_devices is None or all_devices is None:
+            from recorder.audio_capture import AudioRecorder
+            input_devices = AudioRecorder.get_devices(kind='input')
+            all_devices = AudioRecorder.get_devices()
+        
+        previous_mic = self._selected_device(self.mic_device_option) or self.config.get("mic_device")
+        previous_sys = self._selected_device(self.sys_device_option) or self.config.get("system_device")
         
-        # Format for display: "Index: Name (HostAPI)"
-        self.mic_device_names = [f"{d['index']}: {d['name']}" for d in input_devices]
+        self.mic_device_names = [d['key'] for d in input_devices]
         if not self.mic_device_names:
             self.mic_device_names = ["No Input Devices Found"]
             
         self.mic_device_option.configure(values=self.mic_device_names)
         if self.mic_device_names:
-            self.mic_device_option.set(self.mic_device_names[0])
+            self.mic_device_option.set(previous_mic if previous_mic in self.mic_device_names else self.mic_device_names[0])
             
         # For System audio, on Windows, we usually look for Loopback devices. 
         # Since we can't easily filter 'loopback' without checking the name or specific hostapi flags which sd might not expose easily without stream init,
@@ -164,8 +223,7 @@ class MainWindow(ctk.CTk):
         # For simplicity, we list all devices and let user choose the one that says "Loopback" or "Stereo Mix" if available,
         # OR we just list all devices.
         # Actually, sounddevice query_devices returns everything.
-        all_devices = AudioRecorder.get_devices()
-        self.sys_device_names = [f"{d['index']}: {d['name']}" for d in all_devices if d['max_input_channels'] > 0 or 'Loopback' in d['name']]
+        self.sys_device_names = [d['key'] for d in all_devices if d['max_input_channels'] > 0 or 'Loopback' in d['name']]
         # Ideally we want WASAPI loopback, which appears as input in some contexts or needs special init.
         
         if not self.sys_device_names:
@@ -173,7 +231,11 @@ class MainWindow(ctk.CTk):
              
         self.sys_device_option.configure(values=self.sys_device_names)
         if self.sys_device_names:
-            self.sys_device_option.set(self.sys_device_names[0])
+            self.sys_device_option.set(previous_sys if previous_sys in self.sys_device_names else self.sys_device_names[0])
+
+    def on_refresh_devices(self):
+        if self.refresh_devices_callback:
+            self.refresh_devices_callback()
 
     def on_audio_source_change(self, choice):
         # Enable/Disable dropdowns based on mode
@@ -190,22 +252,14 @@ class MainWindow(ctk.CTk):
             self.mic_device_option.configure(state="disabled")
             self.sys_device_option.configure(state="disabled")
 
-    def get_selected_audio_indices(self):
-        mic_idx = None
-        sys_idx = None
-        
-        try:
-            mic_val = self.mic_device_option.get()
-            if ":" in mic_val:
-                mic_idx = int(mic_val.split(":")[0])
-                
-            sys_val = self.sys_device_option.get()
-            if ":" in sys_val:
-                sys_idx = int(sys_val.split(":")[0])
-        except:
-            pass
-            
-        return mic_idx, sys_idx
+    def _selected_device(self, option):
+        """Device key chosen in a device menu, or None for the placeholders."""
+        value = option.get()
+        return value if ":" in value else None
+
+    def get_selected_audio_devices(self):
+        """(mic, system) device keys for AudioRecorder; None records from the default device."""
+        return self._selected_device(self.mic_device_option), self._selected_device(self.sys_device_option)
 
     def browse_folder(self):
         folder = filedialog.askdirectory()
@@ -250,10 +304,16 @@ class MainWindow(ctk.CTk):
         self.config["save_path"] = self.path_entry.get()
         self.config["fps"] = int(self.fps_option.get())
         self.config["codec"] = self.codec_option.get()
+        self.config["resolution"] = self.resolution_option.get()
+        self.config["quality"] = self.quality_option.get()
+        self.config["monitor"] = self.monitor_names.get(self.monitor_option.get(), 1)
         self.config["show_cursor"] = bool(self.chk_cursor.get())
+        self.config["highlight_clicks"] = bool(self.chk_clicks.get())
         self.config["show_countdown"] = bool(self.chk_countdown.get())
         self.config["audio_source"] = self.audio_source_type.get()
-        # Note: We don't save device indices persistently as IDs might change between reboots/unplugs
+        # Devices are saved by name, not index: indices change between reboots/unplugs
+        self.config["mic_device"] = self._selected_device(self.mic_device_option)
+        self.config["system_device"] = self._selected_device(self.sys_device_option)
         save_config(self.config)
 
     def set_recording_state(self, is_recording):
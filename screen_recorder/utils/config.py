@@ -7,17 +7,40 @@ CONFIG_FILE = "config.json"
 DEFAULT_CONFIG = {
     "save_path": os.path.join(os.path.expanduser("~"), "Videos"),
     "resolution": "1080p",
+    "monitor": 1,
+    "extra_monitors": [],
     "fps": 30,
     "quality": "Medium",
     "codec": "MP4V",
     "audio_source": "Microphone + System",
+    "mic_device": None,
+    "system_device": None,
+    "audio_device_poll": 5.0,
     "mic_volume": 80,
     "system_volume": 100,
+    "mic_boost_db": 34.0,
+    "highpass_hz": 80.0,
+    "noise_gate_db": None,
+    "limiter_db": -1.0,
     "show_cursor": True,
+    "highlight_clicks": True,
+    "cursor_rate": 120,
     "show_countdown": True,
     "minimize_to_tray": False,
     "auto_merge": True,
-    "filename_prefix": "ScreenRecord"
+    "filename_prefix": "ScreenRecord",
+    "capture_queue_size": 4,
+    "encode_queue_size": 8,
+    "convert_workers": 2,
+    "drop_policy": "drop_oldest",
+    "live_mux": False,
+    "skip_unchanged": True,
+    "segment_seconds": 0,
+    "segment_mb": 0,
+    "replay_buffer": False,
+    "replay_seconds": 30,
+    "replay_max_mb": 512,
+    "metrics_dir": ""
 }
 
 def load_config():
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+import time
+
+REPORT_FLAG = "--startup-report"
+REPORT_ENV = "SCREEN_RECORDER_STARTUP_REPORT"
+
+
+def report_target(argv=None, environ=None):
+    """
+    Whether a startup report was asked for, with `--startup-report[=path.json]`
+    or the SCREEN_RECORDER_STARTUP_REPORT environment variable ("1" or a path).
+    :return: (enabled, json path or None)
+    """
+    argv = argv if argv is not None else []
+    environ = environ if environ is not None else os.environ
+    for arg in argv:
+        if arg == REPORT_FLAG:
+            return True, None
+        if arg.startswith(REPORT_FLAG + "="):
+            return True, arg.split("=", 1)[1] or None
+    value = environ.get(REPORT_ENV, "")
+    if value and value != "0":
+        return True, None if value == "1" else value
+    return False, None
+
+
+class StartupTimer:
+    """
+    Named milestones since the process started, for tracking how long the
+    window takes to appear and when the background probes are done.
+    :param origin: perf_counter() time the process started (taken at the top of main.py)
+    :param enabled: print the report when report() is called
+    :param path: also write the report there as JSON
+    """
+
+    def __init__(self, origin=None, enabled=False, path=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.enabled = enabled
+        self.path = path
+        self._marks = []
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        with self._lock:
+            self._marks.append((name, time.perf_counter()))
+
+    def as_dict(self):
+        """Milliseconds from process start to each milestone, in the order they happened."""
+        with self._lock:
+            marks = sorted(self._marks, key=lambda mark: mark[1])
+        return {name: round((when - self.origin) * 1000, 1) for name, when in marks}
+
+    def report(self):
+        if not self.enabled:
+            return
+        marks = self.as_dict()
+        print("Startup timing (ms since launch):")
+        for name, ms in marks.items():
+            print(f"  {name:<20} {ms:8.1f}")
+        if self.path:
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump({"marks_ms": marks}, f, indent=4)
+            except OSError as e:
+                print(f"Error writing startup report: {e}")